@@ -0,0 +1,48 @@
+---
+- hosts: all
+
+  pre_tasks:
+    - include_vars: ../vars/credentials.yml
+
+  tasks:
+    - name: Set Playbook Facts
+      set_fact:
+        auth_state_file: state.json
+
+    - name: Login to QAD
+      aux_auth:
+        state: present
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        username: "{{ aux.username }}"
+        password: "{{ aux.password }}"
+
+    - name: Delete test customers
+      aux_browse_delete:
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        view_meta_uri: com.qad.erp.base.customerV2s
+        key_field: customer_code
+        key_label: Customer
+        keys:
+          - 2JOE001
+          - 2JOE002
+      register: customers_deleted
+
+    - name: Delete test customers again
+      aux_browse_delete:
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        view_meta_uri: com.qad.erp.base.customerV2s
+        key_field: customer_code
+        key_label: Customer
+        keys:
+          - 2JOE001
+          - 2JOE002
+      register: customers_deleted_again
+
+    - name: Assert all tasks
+      assert:
+        that:
+          - customers_deleted.not_deleted | length == 0
+          - customers_deleted_again.changed == False
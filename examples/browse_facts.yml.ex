@@ -0,0 +1,46 @@
+---
+- hosts: all
+
+  pre_tasks:
+    - include_vars: ../vars/credentials.yml
+
+  tasks:
+    - name: Set Playbook Facts
+      set_fact:
+        auth_state_file: state.json
+
+    - name: Login to QAD
+      aux_auth:
+        state: present
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        username: "{{ aux.username }}"
+        password: "{{ aux.password }}"
+
+    - name: Export all customers
+      aux_browse_facts:
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        view_meta_uri: com.qad.erp.base.customerV2s
+        output_path: customers.ndjson
+      register: customers_export
+
+    - name: Export Sydney suppliers as csv
+      aux_browse_facts:
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        view_meta_uri: com.qad.erp.base.supplierV2s
+        output_path: suppliers.csv
+        output_format: csv
+        filters:
+          - field: City
+            operator: equals
+            value: Sydney
+      register: suppliers_export
+
+    - name: Assert all tasks
+      assert:
+        that:
+          - customers_export.rows > 0
+          - customers_export.changed == False
+          - "'supplierCode' in suppliers_export.columns"
@@ -0,0 +1,60 @@
+# Load test definition for tools/aux_load.py
+# {user} and {iteration} are substituted in input_fields so every
+# virtual user creates/edits its own records
+---
+qad_server: qadhostname.domain
+state_file: state.json
+headless: True
+# browser launch profile, default or lean (see tools/browser_memory.py)
+browser_profile: default
+# number of concurrent virtual users (one browser process each)
+users: 30
+# seconds over which virtual users are started
+ramp_up: 60
+# seconds to keep running once all users are started
+duration: 600
+# seconds to pause between iterations, min/max
+think_time: [2, 5]
+
+scenarios:
+  - module: aux_customers
+    weight: 3
+    delete: True
+    input_fields:
+      main:
+        customer_code: "LT{user:02d}{iteration:03d}"
+        address:
+          business_relation_name: "Load test customer {user}"
+          address_search_name: "Load test customer {user}"
+          city: Sydney
+        accounting_profile:
+          invoice_control_gl_profile_code: 10101-CRPAUS-A
+          credit_note_control_gl_profile_code: 10101-CRPAUS-A
+          pre_payment_control_gl_profile_code: 10101-CRPAUS-A
+          sales_account_gl_profile_code: 20202-CRPAUS-SA
+        payment:
+          credit_terms_code: AP07
+          invoice_status_code: AP-INITIAL
+        tax:
+          tax_zone: 10
+
+  - module: aux_suppliers
+    weight: 1
+    delete: True
+    input_fields:
+      main:
+        supplier_code: "LS{user:02d}{iteration:03d}"
+        address:
+          business_relation_name: "Load test supplier {user}"
+          address_search_name: "Load test supplier {user}"
+          city: Sydney
+        accounting_profile:
+          invoice_control_gl_profile_code: 10111-CRPAUS-A
+          credit_note_control_gl_profile_code: 10111-CRPAUS-A
+          pre_payment_control_gl_profile_code: 10111-CRPAUS-A
+          purchase_account_gl_profile_code: 20202-CRPAUS-PA
+        payment:
+          credit_terms_code: AP07
+          invoice_status_code: AP-INITIAL
+      tax:
+        tax_zone: 10
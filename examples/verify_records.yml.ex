@@ -0,0 +1,43 @@
+---
+- hosts: all
+
+  pre_tasks:
+    - include_vars: ../vars/credentials.yml
+
+  tasks:
+    - name: Set Playbook Facts
+      set_fact:
+        auth_state_file: state.json
+
+    - name: Login to QAD
+      aux_auth:
+        state: present
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        username: "{{ aux.username }}"
+        password: "{{ aux.password }}"
+
+    - name: Verify loaded customers
+      aux_verify_records:
+        qad_server: "{{ aux.hostname }}"
+        state_file: "{{ auth_state_file }}"
+        view_meta_uri: com.qad.erp.base.customerV2s
+        key_field: customer_code
+        key_label: Customer
+        records:
+          - customer_code: 2JOE001
+            business_relation_name: Joes customer
+            city: Sydney
+          - customer_code: 2JOE002
+            business_relation_name: Joes other customer
+            city: Melbourne
+        fail_on_mismatch: False
+      register: verified_customers
+
+    - name: Assert all tasks
+      assert:
+        that:
+          - verified_customers.checked == 2
+          - verified_customers.missing | length == 0
+          - verified_customers.mismatched | length == 0
+          - verified_customers.changed == False
@@ -7,8 +7,8 @@ from __future__ import absolute_import, division, print_function
 import os
 
 from ansible.module_utils.basic import AnsibleModule
-from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
-from playwright.sync_api import sync_playwright
+from ansible.module_utils.shared_utils import AuxSession
+from ansible.module_utils.timeouts import TimeoutPolicy, timed_login_required
 
 __metaclass__ = type
 
@@ -38,6 +38,12 @@ options:
         required: false
         type: bool
         default: True
+    browser_profile:
+        description: browser launch profile, lean runs one renderer process without GPU, a small viewport and a capped JS heap to fit more forks on a runner
+        required: false
+        type: str
+        choices: default, lean
+        default: default
     username:
         description: Authentication username
         required: false
@@ -77,6 +83,11 @@ message:
     type: str
     returned: always
     sample: 'Logged in as my_username'
+browser:
+    description: Peak resident memory of the task (python, playwright driver and browser), stale browsers reaped before it started and browser processes left running after it that had to be killed
+    type: dict
+    returned: once the browser has been started
+    sample: {"peak_rss_bytes": 412368896, "reaped": 0, "leaked": 0}
 """
 
 
@@ -87,6 +98,7 @@ def run_module():
         state=dict(type="str", required=True, choices=["present", "absent"]),
         qad_server=dict(type="str", required=True),
         headless=dict(type="bool", required=False, default=True),
+        browser_profile=dict(type="str", required=False, default="default", choices=["default", "lean"]),
         username=dict(type="str"),
         password=dict(type="str"),
     )
@@ -107,72 +119,64 @@ def run_module():
     # Check if state file exists
     state_file_exists = os.path.exists(module.params["state_file"])
 
-    playwright = sync_playwright().start()
-    timeout = 10
-
-    # Initiate browser
-    browser = playwright.chromium.launch(headless=module.params["headless"])
-    # Initiate page differently depending on existance of state file
-    if not state_file_exists:
-        page = browser.new_page()
-    else:
-        context = browser.new_context(
-            storage_state=module.params["state_file"])
-        page = context.new_page()
-
-    # If we want to be logged in
-    if module.params["state"] == "present":
-        # Check if state file has been passed through
-        home_url = f"http://{module.params['qad_server']}:22010/qad-central/#/view/webshell/home"
-        page_response = page.goto(home_url)
-
-        # If we get to the home page, we can assume we are logged in.
-        if page_response is not None and "login.jsp" not in page_response.url:
-            result["message"] = "Already logged in - sent to home screen"
-            module.exit_json(**result)
-
-        # Here we should be at the login screen
-        page.locator("[name=username]").fill(module.params["username"])
-        page.locator("[name=password]").fill(module.params["password"])
-        page.locator("[id=logInBtn]").click()
-        try:
-            page.wait_for_url("**/qad-central/#/view/webshell/home",
-                              timeout=timeout * 1000)
-        except PlaywrightTimeoutError:
-            result["message"] = "Error: Timeout Error"
-            module.fail_json(
-                msg=
-                f"QAD Took too long to load after logging in (> {timeout}s)",
-                **result,
+    timeouts = TimeoutPolicy(module.params["qad_server"])
+
+    # Initiate browser, with the state file's cookies if we have one. The
+    # browser is closed before we exit, so its report covers the whole task
+    error = None
+    with AuxSession(module.params["headless"], module.params["state_file"], profile=module.params["browser_profile"]) as session:
+        page = session.page
+
+        # If we want to be logged in
+        if module.params["state"] == "present":
+            # Check if state file has been passed through
+            home_url = f"http://{module.params['qad_server']}:22010/qad-central/#/view/webshell/home"
+            page_response = page.goto(home_url)
+
+            # If we get to the home page, we can assume we are logged in.
+            if page_response is not None and "login.jsp" not in page_response.url:
+                result["message"] = "Already logged in - sent to home screen"
+            else:
+                # Here we should be at the login screen
+                page.locator("[name=username]").fill(module.params["username"])
+                page.locator("[name=password]").fill(module.params["password"])
+                page.locator("[id=logInBtn]").click()
+                # playwright is only imported once we have a browser to drive
+                from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+                try:
+                    with timeouts.timed("login") as timeout:
+                        page.wait_for_url("**/qad-central/#/view/webshell/home",
+                                          timeout=timeout)
+                except PlaywrightTimeoutError:
+                    result["message"] = "Error: Timeout Error"
+                    error = f"QAD Took too long to load after logging in (> {timeout / 1000:.0f}s)"
+                else:
+                    timeouts.save()
+                    session.context.storage_state(path=module.params["state_file"])
+
+                    result["message"] = f"logged in as user {module.params['username']}"
+                    result["changed"] = True
+
+        # If we want to be logged out
+        else:
+            page.goto(
+                f"http://{module.params['qad_server']}:22010/qad-central/#/view/webshell/home"
             )
-        context = browser.contexts[0]
-        context.storage_state(path=module.params["state_file"])
-
-        result["message"] = f"logged in as user {module.params['username']}"
-        result["changed"] = True
-        module.exit_json(**result)
-
-    # If we want to be logged out
-    else:
-        page.goto(
-            f"http://{module.params['qad_server']}:22010/qad-central/#/view/webshell/home"
-        )
-        try:
-            page.wait_for_url(
-                "**/qad-central/resources/login.jsp*",
-                timeout=1 * 1000,
-            )
-            result["message"] = "Already logged out - Sent to login screen"
-            module.exit_json(**result)
-        except PlaywrightTimeoutError:
-            page.locator("[id=kMenuUserInfo_wrapper]").click()
-            page.locator("[data-id=logoutMenuItem]").click()
-            if state_file_exists:
-                os.remove(module.params["state_file"])
-            result["message"] = "Logged out of QAD"
-            result["changed"] = True
-            module.exit_json(**result)
-
+            if timed_login_required(page, timeouts):
+                timeouts.save()
+                result["message"] = "Already logged out - Sent to login screen"
+            else:
+                page.locator("[id=kMenuUserInfo_wrapper]").click()
+                page.locator("[data-id=logoutMenuItem]").click()
+                if state_file_exists:
+                    os.remove(module.params["state_file"])
+                result["message"] = "Logged out of QAD"
+                result["changed"] = True
+    result["browser"] = session.report()
+
+    if error:
+        module.fail_json(msg=error, **result)
     module.exit_json(**result)
 
 
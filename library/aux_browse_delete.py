@@ -0,0 +1,296 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2018, Terry Jones <terry.jones@example.org>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import absolute_import, division, print_function
+
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.shared_utils import (AuxOperationError, AuxSession,
+                                               CircuitBreaker,
+                                               CircuitOpenError,
+                                               advsearch_for_object,
+                                               bulk_delete_browse_rows,
+                                               error_summary,
+                                               find_browse_keys,
+                                               is_transient,
+                                               iter_browse_rows,
+                                               retry_read,
+                                               retry_transient,
+                                               to_camel_case)
+from ansible.module_utils.timeouts import TimeoutPolicy, timed_login_required
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: aux_browse_delete
+
+short_description: Bulk delete records from a QAD AUX browse
+description: This module makes many records absent by selecting the matching rows in a qad aux browse grid and deleting them in batches, instead of opening and deleting each record. Useful for teardown of test records
+
+options:
+    state_file:
+        description: Authentication state file path to check auth cookies
+        required: true
+        type: str
+    qad_server:
+        description: QAD server name to delete records on
+        required: true
+        type: str
+    headless:
+        description: run playwright browser in headless mode
+        required: false
+        type: bool
+        default: True
+    browser_profile:
+        description: browser launch profile, lean runs one renderer process without GPU, a small viewport and a capped JS heap to fit more forks on a runner
+        required: false
+        type: str
+        choices: default, lean
+        default: default
+    view_meta_uri:
+        description: browse to delete from, as used in the hybridbrowse url (eg com.qad.erp.base.customerV2s)
+        required: true
+        type: str
+    key_field:
+        description: snake_case name of the key column of the browse (eg customer_code)
+        required: true
+        type: str
+    key_label:
+        description: label of the key field in the advanced search field list (eg Customer)
+        required: true
+        type: str
+    keys:
+        description: keys of the records to delete
+        required: false
+        type: list
+        elements: str
+    filters:
+        description: advanced search conditions matching the records to delete (all conditions must match)
+        required: false
+        type: list
+        elements: dict
+            field:
+                description: field label as shown in the advanced search field list
+                required: true
+                type: str
+            operator:
+                description: operator label as shown in the advanced search operator list
+                required: true
+                type: str
+            value:
+                description: value to compare against
+                required: true
+                type: str
+    batch_size:
+        description: number of rows selected and deleted together, lowered to the browse grid page size if a batch does not fit on one page
+        required: false
+        type: int
+        default: 25
+    operator:
+        description: advanced search operator that matches a list of key values
+        required: false
+        type: str
+        default: in
+    separator:
+        description: separator between key values for operator
+        required: false
+        type: str
+        default: ","
+    case_sensitive_words:
+        description: words that are not title cased when converting key_field to camelCase (see convert_dict_to_camel_case)
+        required: false
+        type: list
+        elements: str
+        default: ["GL"]
+
+author:
+    - Bernard Gray (bernard_gray@debortoli.com.au)
+"""
+
+EXAMPLES = r"""
+# Teardown the customers created by a test run
+- name: Delete test customers
+  aux_browse_delete:
+    qad_server: qad-test
+    state_file: state.json
+    view_meta_uri: com.qad.erp.base.customerV2s
+    key_field: customer_code
+    key_label: Customer
+    keys:
+      - 2JOE001
+      - 2JOE002
+
+# ... or everything matching a search
+- name: Delete test suppliers
+  aux_browse_delete:
+    qad_server: qad-test
+    state_file: state.json
+    view_meta_uri: com.qad.erp.base.supplierV2s
+    key_field: supplier_code
+    key_label: Supplier
+    filters:
+      - field: Supplier
+        operator: begins with
+        value: 2JOE
+"""
+
+RETURN = r"""
+message:
+    description: Output status message
+    type: str
+    returned: always
+    sample: '25 records deleted'
+deleted:
+    description: Keys of the records deleted (or that would be deleted in check mode)
+    type: list
+    returned: always
+    sample: ["2JOE001", "2JOE002"]
+not_deleted:
+    description: Requested keys still found in the browse after deleting, whether or not their rows were selected. When the task fails part way, the keys not yet deleted
+    type: list
+    returned: always
+    sample: []
+browser:
+    description: Peak resident memory of the task (python, playwright driver and browser), stale browsers reaped before it started and browser processes left running after it that had to be killed
+    type: dict
+    returned: once the browser has been started
+    sample: {"peak_rss_bytes": 412368896, "reaped": 0, "leaked": 0}
+"""
+
+
+def run_module():
+    # Define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        state_file=dict(type="str", required=True),
+        qad_server=dict(type="str", required=True),
+        headless=dict(type="bool", required=False, default=True),
+        browser_profile=dict(type="str", required=False, default="default", choices=["default", "lean"]),
+        view_meta_uri=dict(type="str", required=True),
+        key_field=dict(type="str", required=True),
+        key_label=dict(type="str", required=True),
+        keys=dict(type="list", required=False, elements="str"),
+        filters=dict(
+            type="list",
+            required=False,
+            elements="dict",
+            options=dict(
+                field=dict(type="str", required=True),
+                operator=dict(type="str", required=True),
+                value=dict(type="str", required=True),
+            ),
+        ),
+        batch_size=dict(type="int", required=False, default=25),
+        operator=dict(type="str", required=False, default="in"),
+        separator=dict(type="str", required=False, default=","),
+        case_sensitive_words=dict(type="list", required=False, elements="str", default=["GL"]),
+    )
+
+    # Define response object
+    result = dict(changed=False, message="", deleted=[], not_deleted=[])
+
+    # Initiate ansible object
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_one_of=[("keys", "filters")],
+        mutually_exclusive=[("keys", "filters")],
+    )
+
+    # common variables
+    # define url we need to access
+    view_meta_uri = module.params["view_meta_uri"].replace("urn:view:meta:", "")
+    item_url = f"http://{module.params['qad_server']}:22010/qad-central/#/view/qraview/hybridbrowse?viewMetaUri=urn:view:meta:{view_meta_uri}"
+    key_name = to_camel_case(module.params["key_field"], module.params["case_sensitive_words"])
+
+    # Check if state file exists
+    state_file_exists = os.path.exists(module.params["state_file"])
+    if not state_file_exists:
+        module.fail_json(msg="Authentication state file does not exist!", **result)
+
+    # A server whose circuit breaker is open is not contacted, we fail at once with the reason
+    breaker = CircuitBreaker(module.params["qad_server"])
+    try:
+        breaker.check()
+    except CircuitOpenError as exc:
+        module.fail_json(msg=str(exc), **result)
+
+    # The browser is always closed before we exit, whatever happens
+    with AuxSession(module.params["headless"], module.params["state_file"], profile=module.params["browser_profile"]) as session:
+        page = session.page
+        page.goto(item_url)
+
+        # If we are sent to the login screen we are not logged in
+        timeouts = TimeoutPolicy(module.params["qad_server"])
+        if timed_login_required(page, timeouts):
+            timeouts.save()
+            module.fail_json(msg="No current logged in user", **result)
+
+        def filter_keys() -> list[str]:
+            advsearch_for_object(page, module.params["filters"])
+            return [row[key_name] for row in iter_browse_rows(page) if row.get(key_name)]
+
+        def reload() -> None:
+            page.goto(item_url)
+
+        # Searches only read, transient failures are retried from a reloaded browse. The
+        # delete is only counted by the breaker, a retry would not report the keys already deleted,
+        # when it fails the batches deleted so far are still returned
+        try:
+            # Resolve filters to the keys they match, so rows are deleted by key
+            if module.params["filters"]:
+                keys = retry_read(filter_keys, breaker, reload)
+            else:
+                keys = list(dict.fromkeys(module.params["keys"]))
+
+            if module.check_mode:
+                result["deleted"] = retry_read(
+                    lambda: find_browse_keys(
+                        page,
+                        module.params["key_label"],
+                        key_name,
+                        keys,
+                        module.params["operator"],
+                        module.params["separator"],
+                    ),
+                    breaker,
+                    reload,
+                ) if keys else []
+            elif keys:
+                retry_transient(
+                    lambda: bulk_delete_browse_rows(
+                        page,
+                        module.params["key_label"],
+                        key_name,
+                        keys,
+                        module.params["batch_size"],
+                        module.params["operator"],
+                        module.params["separator"],
+                        result=result,
+                    ),
+                    breaker,
+                    attempts=1,
+                )
+        except AuxOperationError as exc:
+            module.fail_json(msg=str(exc), **result)
+        except Exception as exc:
+            if not is_transient(exc):
+                raise
+            module.fail_json(msg=f"AUX did not respond in time: {error_summary(exc)}", **result)
+    result["browser"] = session.report()
+
+    result["changed"] = len(result["deleted"]) > 0
+    result["message"] = f"{len(result['deleted'])} records deleted"
+    if result["not_deleted"]:
+        module.fail_json(msg=f"Records could not be deleted: {', '.join(result['not_deleted'])}", **result)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2018, Terry Jones <terry.jones@example.org>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import absolute_import, division, print_function
+
+import csv
+import json
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.shared_utils import (AuxOperationError, AuxSession,
+                                               CircuitBreaker,
+                                               CircuitOpenError,
+                                               advsearch_for_object,
+                                               iter_browse_rows,
+                                               quicksearch_for_object,
+                                               retry_read)
+from ansible.module_utils.timeouts import TimeoutPolicy, timed_login_required
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: aux_browse_facts
+
+short_description: Export the rows of a QAD AUX browse to a file
+description: This module reads every page of a qad aux browse grid and streams the rows to a ndjson or csv file, without keeping the whole browse in memory
+
+options:
+    state_file:
+        description: Authentication state file path to check auth cookies
+        required: true
+        type: str
+    qad_server:
+        description: QAD server name to read the browse from
+        required: true
+        type: str
+    headless:
+        description: run playwright browser in headless mode
+        required: false
+        type: bool
+        default: True
+    browser_profile:
+        description: browser launch profile, lean runs one renderer process without GPU, a small viewport and a capped JS heap to fit more forks on a runner
+        required: false
+        type: str
+        choices: default, lean
+        default: default
+    view_meta_uri:
+        description: browse to read, as used in the hybridbrowse url (eg com.qad.erp.base.customerV2s)
+        required: true
+        type: str
+    output_path:
+        description: file to write the rows to
+        required: true
+        type: str
+    output_format:
+        description: ndjson writes one json object per row, csv writes a header row from the grid columns
+        required: false
+        type: str
+        choices: ndjson, csv
+        default: ndjson
+    quicksearch:
+        description: quicksearch bar value to filter the browse with, all rows are read when neither this nor filters is set
+        required: false
+        type: str
+    filters:
+        description: advanced search conditions to filter the browse with (all conditions must match)
+        required: false
+        type: list
+        elements: dict
+            field:
+                description: field label as shown in the advanced search field list
+                required: true
+                type: str
+            operator:
+                description: operator label as shown in the advanced search operator list
+                required: true
+                type: str
+            value:
+                description: value to compare against
+                required: true
+                type: str
+    max_rows:
+        description: stop after this many rows
+        required: false
+        type: int
+
+author:
+    - Bernard Gray (bernard_gray@debortoli.com.au)
+"""
+
+EXAMPLES = r"""
+# Export all customers in Sydney
+- name: Export customers
+  aux_browse_facts:
+    qad_server: qad-test
+    state_file: state.json
+    view_meta_uri: com.qad.erp.base.customerV2s
+    output_path: customers.ndjson
+    filters:
+      - field: City
+        operator: equals
+        value: Sydney
+  register: customers_export
+
+# Export the first 1000 suppliers as csv
+- name: Export suppliers
+  aux_browse_facts:
+    qad_server: qad-test
+    state_file: state.json
+    view_meta_uri: com.qad.erp.base.supplierV2s
+    output_path: suppliers.csv
+    output_format: csv
+    max_rows: 1000
+"""
+
+RETURN = r"""
+message:
+    description: Output status message
+    type: str
+    returned: always
+    sample: '2314 rows written to customers.ndjson'
+rows:
+    description: Number of rows written (read only, in check mode)
+    type: int
+    returned: always
+    sample: 2314
+columns:
+    description: Grid column field names found in the browse
+    type: list
+    returned: always
+    sample: ["customerCode", "businessRelationName", "city"]
+output_path:
+    description: File the rows were written to, in check mode it is not written
+    type: str
+    returned: always
+    sample: customers.ndjson
+browser:
+    description: Peak resident memory of the task (python, playwright driver and browser), stale browsers reaped before it started and browser processes left running after it that had to be killed
+    type: dict
+    returned: once the browser has been started
+    sample: {"peak_rss_bytes": 412368896, "reaped": 0, "leaked": 0}
+"""
+
+
+def run_module():
+    # Define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        state_file=dict(type="str", required=True),
+        qad_server=dict(type="str", required=True),
+        headless=dict(type="bool", required=False, default=True),
+        browser_profile=dict(type="str", required=False, default="default", choices=["default", "lean"]),
+        view_meta_uri=dict(type="str", required=True),
+        output_path=dict(type="str", required=True),
+        output_format=dict(type="str", required=False, default="ndjson", choices=["ndjson", "csv"]),
+        quicksearch=dict(type="str", required=False),
+        filters=dict(
+            type="list",
+            required=False,
+            elements="dict",
+            options=dict(
+                field=dict(type="str", required=True),
+                operator=dict(type="str", required=True),
+                value=dict(type="str", required=True),
+            ),
+        ),
+        max_rows=dict(type="int", required=False),
+    )
+
+    # Define response object
+    result = dict(changed=False, message="", rows=0, columns=[], output_path="")
+
+    # Initiate ansible object
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        mutually_exclusive=[("quicksearch", "filters")],
+    )
+
+    # common variables
+    # define url we need to access
+    view_meta_uri = module.params["view_meta_uri"].replace("urn:view:meta:", "")
+    item_url = f"http://{module.params['qad_server']}:22010/qad-central/#/view/qraview/hybridbrowse?viewMetaUri=urn:view:meta:{view_meta_uri}"
+    output_path = module.params["output_path"]
+    result["output_path"] = output_path
+
+    # Check if state file exists
+    state_file_exists = os.path.exists(module.params["state_file"])
+    if not state_file_exists:
+        module.fail_json(msg="Authentication state file does not exist!", **result)
+
+    # A server whose circuit breaker is open is not contacted, we fail at once with the reason
+    breaker = CircuitBreaker(module.params["qad_server"])
+    try:
+        breaker.check()
+    except CircuitOpenError as exc:
+        module.fail_json(msg=str(exc), **result)
+
+    # The browser is always closed before we exit, whatever happens
+    with AuxSession(module.params["headless"], module.params["state_file"], profile=module.params["browser_profile"]) as session:
+        page = session.page
+        page.goto(item_url)
+
+        # If we are sent to the login screen we are not logged in
+        timeouts = TimeoutPolicy(module.params["qad_server"])
+        if timed_login_required(page, timeouts):
+            timeouts.save()
+            module.fail_json(msg="No current logged in user", **result)
+
+        def write_rows() -> list[str]:
+            # Run the search, an empty quicksearch lists the whole browse
+            if module.params["filters"]:
+                advsearch_for_object(page, module.params["filters"])
+            else:
+                quicksearch_for_object(page, module.params["quicksearch"] or "")
+
+            # Stream rows to the output file as each grid page is read, a retry starts it again.
+            # In check mode the rows are read and counted but nothing is written
+            columns = []
+            result["rows"] = 0
+            with open(os.devnull if module.check_mode else output_path, "w", newline="") as output_fh:
+                writer = None
+                for row in iter_browse_rows(page, module.params["max_rows"]):
+                    if not columns:
+                        columns = list(row)
+                    if module.params["output_format"] == "csv":
+                        if writer is None:
+                            writer = csv.DictWriter(output_fh, fieldnames=columns, extrasaction="ignore")
+                            writer.writeheader()
+                        writer.writerow(row)
+                    else:
+                        output_fh.write(json.dumps(row) + "\n")
+                    result["rows"] += 1
+            return columns
+
+        # Reading is safe to repeat, transient failures are retried from a reloaded browse
+        try:
+            columns = retry_read(write_rows, breaker, lambda: page.goto(item_url))
+        except AuxOperationError as exc:
+            module.fail_json(msg=str(exc), **result)
+    result["browser"] = session.report()
+
+    result["columns"] = columns
+    if module.check_mode:
+        result["message"] = f"{result['rows']} rows would be written to {output_path}"
+    else:
+        result["message"] = f"{result['rows']} rows written to {output_path}"
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
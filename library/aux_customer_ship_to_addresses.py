@@ -4,15 +4,10 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 from __future__ import absolute_import, division, print_function
 
-import os
-
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.shared_utils import (check_input_fields,
-                                               advsearch_for_object,
-                                               convert_dict_to_camel_case,
-                                               change_input_fields)
-from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
-from playwright.sync_api import expect, sync_playwright
+from ansible.module_utils.screen_engine import (REQUIRED_IF,
+                                                compile_screen_spec,
+                                                run_screen)
 
 __metaclass__ = type
 
@@ -42,6 +37,61 @@ options:
         required: false
         type: bool
         default: True
+    browser_profile:
+        description: browser launch profile, lean runs one renderer process without GPU, a small viewport and a capped JS heap to fit more forks on a runner
+        required: false
+        type: str
+        choices: default, lean
+        default: default
+    collect_metrics:
+        description: collect browser side performance metrics (page load and save timings, slowest XHR calls, long tasks, JS heap size) into the result
+        required: false
+        type: bool
+        default: False
+    record_network:
+        description: record latency histograms, response sizes and error counts per AUX XHR endpoint into the result
+        required: false
+        type: bool
+        default: False
+    network_stats_file:
+        description: json file to merge XHR endpoint histograms into across all tasks of a run, implies record_network
+        required: false
+        type: str
+    capture_mode:
+        description: record all browser traffic to har_path, or replay a recorded har_path instead of contacting the AUX server
+        required: false
+        type: str
+        choices: disabled, record, replay
+        default: disabled
+    har_path:
+        description: HAR file to record to or replay from, required when capture_mode is record or replay
+        required: false
+        type: str
+    har_timing:
+        description: when replaying, preserve the recorded response times or collapse them to serve responses immediately
+        required: false
+        type: str
+        choices: collapse, preserve
+        default: collapse
+    journal_file:
+        description: append only progress journal of a bulk run (eg a loop over records), the outcome of each record is written and fsync'd to it as the task finishes
+        required: false
+        type: str
+    resume:
+        description: skip the record without starting a browser if journal_file shows it was already done with the same input_fields, failed and interrupted records are loaded again
+        required: false
+        type: bool
+        default: False
+    validate_reference_data:
+        description: check lookup codes in input_fields (GL profiles, credit terms, invoice statuses, currencies, bank formats, tax zones) against cached AUX lookup lists before filling the form, lists are read from their lookup browses when not cached
+        required: false
+        type: bool
+        default: True
+    reference_data_ttl:
+        description: seconds a cached lookup list is used before it is read again (cache directory is set with the AUX_REFERENCE_CACHE_DIR environment variable)
+        required: false
+        type: int
+        default: 86400
     input_fields:
         description: dictionary of input fields available on a maintenance screen, identified by their css "name" attribute
         required: false
@@ -126,182 +176,87 @@ message:
     type: str
     returned: always
     sample: 'Customer Ship-to created successfully'
+metrics:
+    description: Browser side performance summary per step (navigation, save), only when collect_metrics is set
+    type: dict
+    returned: when collect_metrics is true
+    sample: {"navigation": {"ttfb_ms": 85.2, "dom_content_loaded_ms": 640.1, "xhr_count": 14, "bytes_transferred": 815233}}
+invalid_fields:
+    description: Lookup codes in input_fields that are not in the AUX lookup lists, with close matches
+    type: dict
+    returned: when validate_reference_data finds an unknown code
+    sample: {"main.payment.credit_terms_code": "'AP7' is not in the credit terms lookup list, did you mean AP07?"}
+record:
+    description: Record persisted by the save, as returned by the AUX save response of the screen (including generated keys), for use in later tasks. When nothing needed saving, the fields and tables of the record as read from the form
+    type: dict
+    returned: when state is present, not in check mode
+    sample: {"key": "1NEW001", "fields": {"customerCode": "1NEW001", "businessRelationName": "New customer"}}
+network:
+    description: Latency percentiles, bytes and error counts per normalised XHR endpoint for this task
+    type: dict
+    returned: when record_network is true or network_stats_file is set
+    sample: {"/qad-central/api/erp/data/*": {"count": 6, "p50_ms": 212.0, "p90_ms": 840.0, "p99_ms": 910.0, "max_ms": 911.3, "bytes": 48213, "errors": 0}}
+unknown:
+    description: html names of fields and table panel ids check mode could not read from the form, left out of diff and changed
+    type: list
+    returned: in check mode when a field or table could not be read
+    sample: ["taxZone"]
+resumed:
+    description: The record was skipped as journal_file shows it was already done
+    type: bool
+    returned: when resume is true and the record is done in journal_file
+    sample: true
+retries:
+    description: Transient AUX failures (timeouts, missing toasts, stale elements) that were retried, the record is searched and compared again before each retry
+    type: int
+    returned: when an operation had to be retried
+    sample: 1
+browser:
+    description: Peak resident memory of the task (python, playwright driver and browser), stale browsers reaped before it started and browser processes left running after it that had to be killed
+    type: dict
+    returned: once the browser has been started
+    sample: {"peak_rss_bytes": 412368896, "reaped": 0, "leaked": 0}
 """
 
 
-def run_module():
-    # Define available arguments/parameters a user can pass to the module
-    module_args = dict(
-        state_file=dict(type="str", required=True),
-        state=dict(type="str", required=True, choices=["present", "absent"]),
-        qad_server=dict(type="str", required=True),
-        headless=dict(type="bool", required=False, default=True),
-        input_fields=dict(
-            required=False,
-            type="dict",
-            main=dict(
-                required=False,
-                type="dict",
-                options=dict(
-                    customer_code=dict(type="str", required=True),
-                    customer_ship_to_name=dict(type="str", required=True),
-                ),
-            ),
-            address=dict(
-                required=False,
-                type="dict",
-                options=dict(
-                    address_search_name=dict(type="str", required=True),
-                    city=dict(type="str", required=True),
-                    country_code=dict(type="str", required=True),
-                ),
-            ),
-            tax=dict(
-                required=False,
-                type="dict",
-                options=dict(
-                    tax_zone=dict(type="str", required=True),
-                ),
-            ),
-        ),
-    )
+SCREEN_SPEC = r"""
+name: Customer Ship-To Address
+view_meta_uri: com.qad.erp.base.customershiptoV2s
+case_sensitive_words: [GL]
+search:
+  filters:
+    - field: Customer
+      operator: equals
+      key: customer_code
+    - field: Ship-To Name
+      operator: equals
+      key: customer_ship_to_name
+fields:
+  main:
+    customer_code: required
+    customer_ship_to_name: required
+  address:
+    address_search_name: required
+    city: required
+    country_code: required
+  tax:
+    tax_zone: required
+"""
 
-    # Define response object
-    result = dict(changed=False, message="")
+
+def run_module():
+    # Compile the screen spec into the argspec, field map and search
+    screen = compile_screen_spec(SCREEN_SPEC)
 
     # Initiate ansible object
     module = AnsibleModule(
-        argument_spec=module_args,
+        argument_spec=screen.argument_spec,
         supports_check_mode=True,
-        required_if=[
-            (
-                "state",
-                "present",
-                ["input_fields"],
-            )
-        ],
+        required_if=REQUIRED_IF,
     )
 
-    if module.check_mode:
-        module.exit_json(**result)
-
-    # common variables
-    # define url we need to access
-    item_url = f"http://{module.params['qad_server']}:22010/qad-central/#/view/qraview/hybridbrowse?viewMetaUri=urn:view:meta:com.qad.erp.base.customershiptoV2s"
-    # define name of this page
-    item_type = "Customer Ship-To Address"
-    # define primary search key
-    item_search_key = ["customer_code", "customer_ship_to_name"]
-
-    # Check if state file exists
-    state_file_exists = os.path.exists(module.params["state_file"])
-    if not state_file_exists:
-        module.fail_json(msg="Authentication state file does not exist!", **result)
-
-    # initialise browser interraction
-    playwright = sync_playwright().start()
-    browser = playwright.chromium.launch(headless=module.params["headless"])
-    context = browser.new_context(storage_state=module.params["state_file"])
-    page = context.new_page()
-    page.goto(item_url)
-
-    # If we are sent to the login screen we are not logged in
-    try:
-        page.wait_for_url(
-            "**/qad-central/resources/login.jsp*",
-            timeout=1 * 1000,
-        )
-        module.fail_json(msg="No current logged in user", **result)
-    except PlaywrightTimeoutError:
-        pass
-
-    filter_params = [
-    {
-     "field"    : "Customer",
-     "operator" : "equals",
-     "value"    : module.params["input_fields"]["main"][item_search_key[0]]
-     },
-    {
-     "field"    : "Ship-To Name",
-     "operator" : "equals",
-     "value"    : module.params["input_fields"]["main"][item_search_key[1]]
-     }
-    ]
-
-    # If we want to create/maintain an item
-    if module.params["state"] == "present":
-        # First we check if item already exists
-        ship_to_locator = advsearch_for_object(page, filter_params)
-        if ship_to_locator.is_visible():
-            ship_to_locator.click(click_count=2)
-        else:
-            # Create item
-            page.locator("[id=ToolBtnNew]").click()
-
-        page.locator(".k-loading-color").first.wait_for(state="detached")
-
-        # Construct all input fields with camel case keys
-        args = convert_dict_to_camel_case(module.params["input_fields"], ["GL"])
-
-        # Enter details in mapped fields
-        result["changed"] = change_input_fields(page, args)
-
-        if result["changed"]:
-            result["message"] = f"{item_type} has been updated"
-            page.locator("[id=ToolBtnSave]").click()
-
-            # Wait for success toast to appear
-            toast = page.locator(".toast-message").first
-            toast.wait_for(timeout=160000)
-            try:
-                expect(toast).to_have_text("saved", ignore_case=True)
-            except (PlaywrightTimeoutError, AssertionError):
-                module.fail_json(msg=f"Error saving {item_type}")
-
-            # Exit menu and search for item again, confirm it exists
-            page.locator("#btnViewFormPane").click()
-            if not advsearch_for_object(page, filter_params).is_visible():
-                module.fail_json(msg=f"{item_type} not found after saving")
-
-            # Check that all fields have been updated correctly
-            ship_to_locator.click(click_count=2)
-            page.locator(".k-loading-color").first.wait_for(state="detached")
-            incorrect_fields = check_input_fields(page, args)
-            if incorrect_fields:
-                module.fail_json(
-                    msg=f"{item_type} details have not correctly been updated {str(incorrect_fields)}"
-                )
-
-    elif module.params["state"] == "absent":
-        # Find item
-        ship_to_locator = advsearch_for_object(page, filter_params)
-        if not ship_to_locator.is_visible():
-            result["message"] = f"{item_type} does not exist"
-            module.exit_json(**result)
-        ship_to_locator.click(click_count=2)
-
-        # Delete customer
-        page.locator("#ToolBtnDelete").click()
-        popup_locator = page.locator("#qModalDialogConfirm")
-        popup_locator.wait_for()
-        popup_locator.click()
-
-        # Wait for deleted toast message
-        toast = page.locator(".toast-message").first
-        toast.wait_for()
-        try:
-            expect(toast).to_have_text("deleted", ignore_case=True)
-        except (PlaywrightTimeoutError, AssertionError):
-            module.fail_json(msg=f"Error deleting {item_type}")
-
-        # Check if customer no longer exists in browse
-        page.locator("#btnViewFormPane").click()
-        if advsearch_for_object(page, filter_params).is_visible():
-            module.fail_json(msg=f"Could not delete {item_type}")
-
-        result["message"] = f"{item_type} has been deleted"
-        result["changed"] = True
-    module.exit_json(**result)
+    # Search, fill, save and verify (or delete) with the generic screen engine
+    run_screen(module, screen)
 
 
 def main():
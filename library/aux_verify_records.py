@@ -0,0 +1,270 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2018, Terry Jones <terry.jones@example.org>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import absolute_import, division, print_function
+
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.shared_utils import (AuxOperationError, AuxSession,
+                                               CircuitBreaker,
+                                               CircuitOpenError,
+                                               convert_dict_to_camel_case,
+                                               retry_read,
+                                               to_camel_case,
+                                               verify_records)
+from ansible.module_utils.timeouts import TimeoutPolicy, timed_login_required
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: aux_verify_records
+
+short_description: Verify many records in a QAD AUX browse with one search
+description: This module checks a list of expected records against a qad aux browse using one advanced search per chunk of keys, and reports only the records that are missing or differ
+
+options:
+    state_file:
+        description: Authentication state file path to check auth cookies
+        required: true
+        type: str
+    qad_server:
+        description: QAD server name to verify records on
+        required: true
+        type: str
+    headless:
+        description: run playwright browser in headless mode
+        required: false
+        type: bool
+        default: True
+    browser_profile:
+        description: browser launch profile, lean runs one renderer process without GPU, a small viewport and a capped JS heap to fit more forks on a runner
+        required: false
+        type: str
+        choices: default, lean
+        default: default
+    view_meta_uri:
+        description: browse to search, as used in the hybridbrowse url (eg com.qad.erp.base.customerV2s)
+        required: true
+        type: str
+    key_field:
+        description: snake_case name of the key field of each record (eg customer_code)
+        required: true
+        type: str
+    key_label:
+        description: label of the key field in the advanced search field list (eg Customer)
+        required: true
+        type: str
+    operator:
+        description: advanced search operator that matches a list of values
+        required: false
+        type: str
+        default: in
+    separator:
+        description: separator between values for operator
+        required: false
+        type: str
+        default: ","
+    chunk_size:
+        description: number of keys per advanced search
+        required: false
+        type: int
+        default: 50
+    case_sensitive_words:
+        description: words that are not title cased when converting field names to camelCase (see convert_dict_to_camel_case)
+        required: false
+        type: list
+        elements: str
+        default: ["GL"]
+    records:
+        description: expected records, as flat dictionaries of snake_case browse column names and values
+        required: true
+        type: list
+        elements: dict
+    fail_on_mismatch:
+        description: fail the task if any record is missing or differs
+        required: false
+        type: bool
+        default: True
+
+author:
+    - Bernard Gray (bernard_gray@debortoli.com.au)
+"""
+
+EXAMPLES = r"""
+# Check a bulk load of customers in a single pass
+- name: Verify loaded customers
+  aux_verify_records:
+    qad_server: qad-test
+    state_file: state.json
+    view_meta_uri: com.qad.erp.base.customerV2s
+    key_field: customer_code
+    key_label: Customer
+    records:
+      - customer_code: 2JOE001
+        business_relation_name: Joes customer
+        city: Sydney
+      - customer_code: 2JOE002
+        business_relation_name: Joes other customer
+        city: Melbourne
+    fail_on_mismatch: False
+  register: verified
+
+# ... then deep check only what didn't match
+- name: Re-apply mismatched customers
+  aux_customers:
+    state: present
+    qad_server: qad-test
+    state_file: state.json
+    input_fields: "{{ customers[item] }}"
+  loop: "{{ verified.missing + verified.mismatched.keys() | list }}"
+"""
+
+RETURN = r"""
+message:
+    description: Output status message
+    type: str
+    returned: always
+    sample: '2 of 1500 records do not match'
+checked:
+    description: Number of records checked
+    type: int
+    returned: always
+    sample: 1500
+missing:
+    description: Keys of expected records not found in the browse
+    type: list
+    returned: always
+    sample: ["2JOE002"]
+mismatched:
+    description: Per key, the browse columns that differ from the expected record
+    type: dict
+    returned: always
+    sample: {"2JOE001": {"city": {"expected": "Sydney", "actual": "Melbourne"}}}
+unchecked_fields:
+    description: Expected fields that are not browse columns, so could not be verified from the browse
+    type: list
+    returned: always
+    sample: ["tax_zone"]
+browser:
+    description: Peak resident memory of the task (python, playwright driver and browser), stale browsers reaped before it started and browser processes left running after it that had to be killed
+    type: dict
+    returned: once the browser has been started
+    sample: {"peak_rss_bytes": 412368896, "reaped": 0, "leaked": 0}
+"""
+
+
+def run_module():
+    # Define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        state_file=dict(type="str", required=True),
+        qad_server=dict(type="str", required=True),
+        headless=dict(type="bool", required=False, default=True),
+        browser_profile=dict(type="str", required=False, default="default", choices=["default", "lean"]),
+        view_meta_uri=dict(type="str", required=True),
+        key_field=dict(type="str", required=True),
+        key_label=dict(type="str", required=True),
+        operator=dict(type="str", required=False, default="in"),
+        separator=dict(type="str", required=False, default=","),
+        chunk_size=dict(type="int", required=False, default=50),
+        case_sensitive_words=dict(type="list", required=False, elements="str", default=["GL"]),
+        records=dict(type="list", required=True, elements="dict"),
+        fail_on_mismatch=dict(type="bool", required=False, default=True),
+    )
+
+    # Define response object
+    result = dict(changed=False, message="", checked=0, missing=[], mismatched={}, unchecked_fields=[])
+
+    # Initiate ansible object
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+    )
+
+    # common variables
+    # define url we need to access
+    view_meta_uri = module.params["view_meta_uri"].replace("urn:view:meta:", "")
+    item_url = f"http://{module.params['qad_server']}:22010/qad-central/#/view/qraview/hybridbrowse?viewMetaUri=urn:view:meta:{view_meta_uri}"
+    case_sensitive_words = module.params["case_sensitive_words"]
+    key_name = to_camel_case(module.params["key_field"], case_sensitive_words)
+
+    for record in module.params["records"]:
+        if module.params["key_field"] not in record:
+            module.fail_json(msg=f"Record has no {module.params['key_field']}: {record}", **result)
+
+    # Check if state file exists
+    state_file_exists = os.path.exists(module.params["state_file"])
+    if not state_file_exists:
+        module.fail_json(msg="Authentication state file does not exist!", **result)
+
+    # A server whose circuit breaker is open is not contacted, we fail at once with the reason
+    breaker = CircuitBreaker(module.params["qad_server"])
+    try:
+        breaker.check()
+    except CircuitOpenError as exc:
+        module.fail_json(msg=str(exc), **result)
+
+    # The browser is always closed before we exit, whatever happens
+    with AuxSession(module.params["headless"], module.params["state_file"], profile=module.params["browser_profile"]) as session:
+        page = session.page
+        page.goto(item_url)
+
+        # If we are sent to the login screen we are not logged in
+        timeouts = TimeoutPolicy(module.params["qad_server"])
+        if timed_login_required(page, timeouts):
+            timeouts.save()
+            module.fail_json(msg="No current logged in user", **result)
+
+        # Browse columns are camel case html names, as are input fields
+        expected_records = [
+            convert_dict_to_camel_case(record, case_sensitive_words)
+            for record in module.params["records"]
+        ]
+        # Reading is safe to repeat, transient failures are retried from a reloaded browse
+        try:
+            verification = retry_read(
+                lambda: verify_records(
+                    page,
+                    module.params["key_label"],
+                    key_name,
+                    expected_records,
+                    module.params["operator"],
+                    module.params["separator"],
+                    module.params["chunk_size"],
+                ),
+                breaker,
+                lambda: page.goto(item_url),
+            )
+        except AuxOperationError as exc:
+            module.fail_json(msg=str(exc), **result)
+    result["browser"] = session.report()
+
+    # Report keys and fields back in the playbook's snake case
+    snake_names = {
+        to_camel_case(field, case_sensitive_words): field
+        for record in module.params["records"]
+        for field in record
+    }
+    result["checked"] = len(expected_records)
+    result["missing"] = verification["missing"]
+    result["mismatched"] = {
+        key: {snake_names[field]: difference for field, difference in differences.items()}
+        for key, differences in verification["mismatched"].items()
+    }
+    result["unchecked_fields"] = [snake_names[field] for field in verification["unchecked_fields"]]
+
+    failed_count = len(result["missing"]) + len(result["mismatched"])
+    result["message"] = f"{failed_count} of {result['checked']} records do not match"
+    if failed_count and module.params["fail_on_mismatch"]:
+        module.fail_json(msg=result["message"], **result)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
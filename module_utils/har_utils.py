@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+from urllib.parse import quote, quote_plus
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import Browser, BrowserContext, Route
+
+# headers and json keys that carry credentials or session state
+SENSITIVE_HEADERS = ("cookie", "set-cookie", "authorization", "x-csrf-token", "x-xsrf-token")
+SENSITIVE_KEYS = re.compile(r"pass(word)?|user(name)?|token|secret|session|credential", re.IGNORECASE)
+REDACTED = "REDACTED"
+
+
+def new_browser_context(
+    browser: Browser,
+    state_file: str,
+    capture_mode: str = "disabled",
+    har_path: str = None,
+    har_timing: str = "collapse",
+    context_args: dict = None,
+) -> BrowserContext:
+    """
+    create the browser context for a task, optionally recording all
+    traffic to a HAR file, or replaying a recorded HAR instead of
+    talking to the AUX server, context_args are extra new_context options
+    """
+    context_args = dict(context_args or {})
+    if os.path.exists(state_file):
+        context_args["storage_state"] = state_file
+    if capture_mode == "record":
+        context_args["record_har_path"] = har_path
+        context_args["record_har_content"] = "embed"
+    context = browser.new_context(**context_args)
+
+    if capture_mode == "replay":
+        if har_timing == "preserve":
+            replay_har(context, har_path)
+        else:
+            # served from the HAR with no waiting, only harness time is left
+            context.route_from_har(har_path, not_found="abort")
+    return context
+
+
+def finish_capture(context: BrowserContext, capture_mode: str = "disabled") -> None:
+    """the HAR file is only written once the recording context is closed"""
+    if capture_mode == "record":
+        context.close()
+
+
+def recorded_response(entry: dict) -> tuple[int, dict, bytes]:
+    """status, headers and body of a HAR entry's response"""
+    response = entry["response"]
+    content = response["content"]
+    body = content.get("text", "")
+    body = base64.b64decode(body) if content.get("encoding") == "base64" else body.encode()
+    headers = {
+        header["name"]: header["value"]
+        for header in response["headers"]
+        if header["name"].lower() not in ("content-length", "content-encoding", "transfer-encoding")
+    }
+    return response["status"], headers, body
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """answers /<entry index> with that HAR entry's response, once its recorded time has passed"""
+
+    def replay(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        entry = self.server.entries[int(self.path.strip("/"))]
+        time.sleep(max(entry["time"], 0) / 1000)
+        status, headers, body = recorded_response(entry)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = replay
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def replay_har(context: BrowserContext, har_path: str) -> None:
+    """
+    serve requests from a HAR file, each once as long as its recorded
+    response took. The route handler only picks the recorded entry and
+    sends the request on to a local server that waits in a thread per
+    request, so playwright's dispatcher is never blocked and parallel
+    XHRs overlap as they did against the AUX server
+    """
+    with open(har_path) as har_fh:
+        entries = json.load(har_fh)["log"]["entries"]
+
+    # repeated requests to the same url are replayed in recorded order
+    recorded = {}
+    for index, entry in enumerate(entries):
+        recorded.setdefault((entry["request"]["method"], entry["request"]["url"]), []).append(index)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+    server.daemon_threads = True
+    server.entries = entries
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # shutdown waits for the serve loop, it is not done on playwright's dispatcher
+    context.on("close", lambda _: threading.Thread(target=server.shutdown, daemon=True).start())
+
+    def handle_route(route: Route) -> None:
+        request = route.request
+        candidates = recorded.get((request.method, request.url))
+        if not candidates:
+            route.abort()
+            return
+        index = candidates.pop(0) if len(candidates) > 1 else candidates[0]
+        if request.url.startswith("https:"):
+            # a request can only be sent on over the same protocol, these wait here, one at a time
+            time.sleep(max(entries[index]["time"], 0) / 1000)
+            status, headers, body = recorded_response(entries[index])
+            route.fulfill(status=status, headers=headers, body=body)
+            return
+        route.continue_(url=f"http://127.0.0.1:{server.server_port}/{index}")
+
+    context.route("**/*", handle_route)
+
+
+def redaction_map(redact_values: list) -> dict:
+    """
+    stable replacement token per company value, so a scrubbed HAR still
+    replays when the playbook uses the same tokens as input values
+    """
+    values = sorted({value for value in redact_values if value}, key=len, reverse=True)
+    redactions = {}
+    for index, value in enumerate(values, start=1):
+        # values also appear url encoded in query strings
+        for variant in (value, quote(value), quote_plus(value)):
+            redactions.setdefault(variant, f"{REDACTED}{index}")
+    return redactions
+
+
+def scrub_text(text: str, redactions: dict, redact_patterns: list) -> str:
+    # longest values first, so a value containing another is replaced whole
+    for value, token in redactions.items():
+        text = text.replace(value, token)
+    for pattern in redact_patterns:
+        text = pattern.sub(REDACTED, text)
+    return text
+
+
+def scrub_json(data, redactions: dict, redact_patterns: list):
+    if isinstance(data, dict):
+        return {
+            key: REDACTED if SENSITIVE_KEYS.search(key) and isinstance(val, str) else scrub_json(val, redactions, redact_patterns)
+            for key, val in data.items()
+        }
+    if isinstance(data, list):
+        return [scrub_json(item, redactions, redact_patterns) for item in data]
+    if isinstance(data, str):
+        return scrub_text(data, redactions, redact_patterns)
+    return data
+
+
+def scrub_body(text: str, mime_type: str, redactions: dict, redact_patterns: list) -> str:
+    if "json" in mime_type:
+        try:
+            return json.dumps(scrub_json(json.loads(text), redactions, redact_patterns))
+        except ValueError:
+            pass
+    if "x-www-form-urlencoded" in mime_type:
+        # form encoded logins
+        text = re.sub(r"((?:^|&)[^=&]*(?:pass|user)[^=&]*=)[^&]*", r"\g<1>" + REDACTED, text, flags=re.IGNORECASE)
+    return scrub_text(text, redactions, redact_patterns)
+
+
+def scrub_har(har: dict, redact_values: list = [], redact_patterns: list = []) -> dict:
+    """
+    strip credentials, cookies and session headers from a HAR,
+    and replace any company data (given as literal values or
+    compiled regexes) in urls, headers and bodies
+    """
+    redactions = redaction_map(redact_values)
+
+    for entry in har["log"]["entries"]:
+        for message in (entry["request"], entry["response"]):
+            message["cookies"] = []
+            message["headers"] = [
+                dict(header, value=REDACTED) if header["name"].lower() in SENSITIVE_HEADERS
+                else dict(header, value=scrub_text(header["value"], redactions, redact_patterns))
+                for header in message["headers"]
+            ]
+
+        request = entry["request"]
+        request["url"] = scrub_text(request["url"], redactions, redact_patterns)
+        for param in request.get("queryString", []):
+            param["value"] = scrub_text(param["value"], redactions, redact_patterns)
+        if "postData" in request:
+            post_data = request["postData"]
+            for param in post_data.get("params", []):
+                if SENSITIVE_KEYS.search(param["name"]):
+                    param["value"] = REDACTED
+            if "text" in post_data:
+                post_data["text"] = scrub_body(post_data["text"], post_data.get("mimeType", ""), redactions, redact_patterns)
+
+        response = entry["response"]
+        response["redirectURL"] = scrub_text(response.get("redirectURL", ""), redactions, redact_patterns)
+        content = response["content"]
+        mime_type = content.get("mimeType", "")
+        if "text" not in content:
+            continue
+        if content.get("encoding") != "base64":
+            content["text"] = scrub_body(content["text"], mime_type, redactions, redact_patterns)
+        elif mime_type.startswith("text/") or "json" in mime_type or "javascript" in mime_type:
+            decoded = base64.b64decode(content["text"]).decode("utf-8", errors="replace")
+            content["text"] = base64.b64encode(scrub_body(decoded, mime_type, redactions, redact_patterns).encode()).decode()
+    return har
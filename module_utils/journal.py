@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import time
+
+# outcomes a record can have in the journal, started without a later line is in flight
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+
+class RecordJournal:
+    """
+    append only progress journal of a bulk run, one json line per record
+    outcome, written and fsync'd before the task carries on so a crash or
+    a killed run keeps every outcome it got to:
+
+        {"time": 1718150000.1, "record": "Customer present 2JOE001", "digest": "9f2c...", "outcome": "started"}
+        {"time": 1718150004.7, "record": "Customer present 2JOE001", "digest": "9f2c...", "outcome": "done", "changed": true}
+
+    A record is completed when its last line is done with the digest of the
+    same input_fields, so a record whose input changed is loaded again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def outcomes(self) -> dict[str, dict]:
+        """the last journal line of every record"""
+        last = {}
+        try:
+            with open(self.path) as journal_fh:
+                for line in journal_fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line torn by a crash while it was written
+                        continue
+                    last[entry["record"]] = entry
+        except FileNotFoundError:
+            pass
+        return last
+
+    def completed(self, record: str, digest: str) -> bool:
+        entry = self.outcomes().get(record)
+        return entry is not None and entry["outcome"] == DONE and entry["digest"] == digest
+
+    def append(self, record: str, digest: str, outcome: str, **details) -> None:
+        line = json.dumps(dict(time=round(time.time(), 3), record=record, digest=digest, outcome=outcome, **details), default=str)
+        created = not os.path.exists(self.path)
+        # ansible forks of a looped task append to the same journal
+        with open(self.path, "a") as journal_fh:
+            fcntl.flock(journal_fh, fcntl.LOCK_EX)
+            journal_fh.write(line + "\n")
+            journal_fh.flush()
+            os.fsync(journal_fh.fileno())
+        if created:
+            # the new directory entry must survive a crash too
+            directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+
+def input_digest(input_fields: dict) -> str:
+    return hashlib.sha256(json.dumps(input_fields, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import math
+import re
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import BrowserContext, Page, Request
+
+# path segments that address a record rather than an endpoint (numbers, uuids, hex keys)
+ID_SEGMENT_PATTERN = re.compile(r"\d+|[0-9a-fA-F-]{16,}")
+
+
+# Installed before any page script runs, so long tasks during the initial
+# AUX bootstrap are captured as well as those after a save
+PERF_OBSERVER_SCRIPT = """
+(() => {
+    window.__auxLongTasks = [];
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) {
+                window.__auxLongTasks.push({startTime: entry.startTime, duration: entry.duration});
+            }
+        }).observe({type: "longtask", buffered: true});
+    } catch (e) {
+        // longtask entries are chromium only
+    }
+})();
+"""
+
+PERF_ENTRIES_SCRIPT = """
+(since) => {
+    const navigation = performance.getEntriesByType("navigation").map((entry) => entry.toJSON());
+    const resources = performance.getEntriesByType("resource")
+        .filter((entry) => entry.startTime >= since)
+        .map((entry) => ({
+            name: entry.name,
+            initiatorType: entry.initiatorType,
+            startTime: entry.startTime,
+            duration: entry.duration,
+            transferSize: entry.transferSize,
+        }));
+    const longTasks = (window.__auxLongTasks || []).filter((task) => task.startTime >= since);
+    const memory = performance.memory ? {
+        usedJSHeapSize: performance.memory.usedJSHeapSize,
+        totalJSHeapSize: performance.memory.totalJSHeapSize,
+    } : null;
+    return {navigation, resources, longTasks, memory, now: performance.now()};
+}
+"""
+
+
+def install_perf_observers(context: BrowserContext) -> None:
+    """Register the long task observer on every page opened in this context"""
+    context.add_init_script(PERF_OBSERVER_SCRIPT)
+
+
+def start_perf_window(page: Page) -> float:
+    """Return the page clock, to only summarise entries recorded after this point"""
+    return page.evaluate("() => performance.now()")
+
+
+def collect_page_metrics(page: Page, since: float = 0, slowest: int = 5) -> dict:
+    """
+    pull timing entries from the browser and summarise them,
+    since=0 includes the navigation that loaded the page
+    """
+    return summarise_perf_entries(page.evaluate(PERF_ENTRIES_SCRIPT, since), since, slowest)
+
+
+def summarise_perf_entries(entries: dict, since: float = 0, slowest: int = 5) -> dict:
+    """
+    reduce raw performance entries to the figures that separate
+    AUX server time from browser and harness time (all times in ms)
+    """
+    summary = {}
+    if since == 0 and entries["navigation"]:
+        navigation = entries["navigation"][0]
+        summary["ttfb_ms"] = round(navigation["responseStart"] - navigation["requestStart"], 1)
+        summary["dom_content_loaded_ms"] = round(navigation["domContentLoadedEventEnd"] - navigation["startTime"], 1)
+        summary["load_ms"] = round(navigation["loadEventEnd"] - navigation["startTime"], 1)
+
+    xhr_entries = [
+        entry for entry in entries["resources"]
+        if entry["initiatorType"] in ("xmlhttprequest", "fetch")
+    ]
+    xhr_entries.sort(key=lambda entry: entry["duration"], reverse=True)
+    summary["xhr_count"] = len(xhr_entries)
+    summary["xhr_total_ms"] = round(sum(entry["duration"] for entry in xhr_entries), 1)
+    summary["slowest_xhr"] = [
+        {"url": entry["name"], "duration_ms": round(entry["duration"], 1)}
+        for entry in xhr_entries[:slowest]
+    ]
+    summary["resource_count"] = len(entries["resources"])
+    summary["bytes_transferred"] = sum(entry["transferSize"] for entry in entries["resources"])
+
+    long_tasks = entries["longTasks"]
+    summary["long_task_count"] = len(long_tasks)
+    summary["long_task_total_ms"] = round(sum(task["duration"] for task in long_tasks), 1)
+
+    if entries["memory"] is not None:
+        summary["js_heap_used_bytes"] = entries["memory"]["usedJSHeapSize"]
+    summary["window_ms"] = round(entries["now"] - since, 1)
+    return summary
+
+
+class LatencyHistogram:
+    """
+    HDR style latency histogram, values are kept in buckets with a fixed
+    number of significant digits so memory is bounded and histograms from
+    separate tasks can be merged without losing percentile accuracy
+    """
+
+    def __init__(self, significant_digits: int = 3):
+        self.significant_digits = significant_digits
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value: float) -> float:
+        if value <= 0:
+            return 0.0
+        exponent = math.floor(math.log10(value)) - (self.significant_digits - 1)
+        return round(math.floor(value / 10 ** exponent) * 10 ** exponent, max(0, -exponent))
+
+    def record(self, value: float, count: int = 1) -> None:
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        """Value at or below which the given percentage of recorded values fall"""
+        if self.count == 0:
+            return 0.0
+        threshold = self.count * percent / 100
+        running = 0
+        for bucket in sorted(self.buckets):
+            running += self.buckets[bucket]
+            if running >= threshold:
+                return min(bucket, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return dict(
+            count=self.count,
+            mean_ms=round(self.total / self.count, 1) if self.count else 0.0,
+            min_ms=round(self.min or 0.0, 1),
+            p50_ms=round(self.percentile(50), 1),
+            p90_ms=round(self.percentile(90), 1),
+            p99_ms=round(self.percentile(99), 1),
+            max_ms=round(self.max or 0.0, 1),
+        )
+
+    def to_dict(self) -> dict:
+        return dict(
+            significant_digits=self.significant_digits,
+            buckets=sorted(self.buckets.items()),
+            count=self.count,
+            total=self.total,
+            min=self.min,
+            max=self.max,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        histogram = cls(data["significant_digits"])
+        histogram.buckets = {bucket: count for bucket, count in data["buckets"]}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def normalise_endpoint(url: str) -> str:
+    """
+    reduce a request url to the endpoint it calls, so calls for different
+    records are grouped together, eg:
+    /qad-central/api/erp/data/customerV2s/10-1001?x=1 => /qad-central/api/erp/data/*
+    """
+    parsed = urlsplit(url)
+    segments = []
+    for segment in parsed.path.split("/"):
+        if segments and segments[-1] == "data":
+            # everything after a data segment is the record being addressed
+            segments.append("*")
+            break
+        if ID_SEGMENT_PATTERN.fullmatch(segment):
+            segment = "*"
+        segments.append(segment)
+    endpoint = "/".join(segments)
+
+    # viewMetaUri identifies the screen being loaded, keep it as part of the endpoint
+    view_meta_uri = parse_qs(parsed.query).get("viewMetaUri")
+    if view_meta_uri:
+        endpoint += "?viewMetaUri=" + view_meta_uri[0].replace("urn:view:meta:", "")
+    return endpoint
+
+
+class NetworkRecorder:
+    """
+    Attach to a page and keep latency histograms, response sizes and
+    error counts per normalised XHR endpoint
+    """
+
+    def __init__(self, page: Page, resource_types: tuple = ("xhr", "fetch")):
+        self.resource_types = resource_types
+        self.endpoints = {}
+        page.on("requestfinished", self._request_finished)
+        page.on("requestfailed", self._request_failed)
+
+    def _endpoint_stats(self, url: str) -> dict:
+        endpoint = normalise_endpoint(url)
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = dict(latency=LatencyHistogram(), bytes=0, errors=0)
+        return self.endpoints[endpoint]
+
+    def _request_finished(self, request: Request) -> None:
+        if request.resource_type not in self.resource_types:
+            return
+        stats = self._endpoint_stats(request.url)
+        # timing values are ms relative to the request start time
+        stats["latency"].record(max(request.timing["responseEnd"], 0))
+        sizes = request.sizes()
+        stats["bytes"] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        response = request.response()
+        if response is not None and response.status >= 400:
+            stats["errors"] += 1
+
+    def _request_failed(self, request: Request) -> None:
+        if request.resource_type not in self.resource_types:
+            return
+        self._endpoint_stats(request.url)["errors"] += 1
+
+    def summary(self) -> dict:
+        return summarise_network_stats(self.endpoints)
+
+    def emit(self, stats_file: str = None) -> dict:
+        """
+        return the per task summary, and merge the full histograms
+        into stats_file (if given) so a run can be reported as a whole
+        """
+        if stats_file:
+            merge_network_stats(stats_file, self.endpoints)
+        return self.summary()
+
+
+def summarise_network_stats(endpoints: dict) -> dict:
+    summary = {}
+    for endpoint, stats in sorted(endpoints.items()):
+        summary[endpoint] = stats["latency"].summary()
+        summary[endpoint]["bytes"] = stats["bytes"]
+        summary[endpoint]["errors"] = stats["errors"]
+    return summary
+
+
+def merge_network_stats(stats_file: str, endpoints: dict) -> dict:
+    """
+    merge endpoint stats into a json stats file shared by all tasks of a run,
+    the file is locked while merging as ansible forks write to it concurrently
+    """
+    with open(stats_file, "a+") as stats_fh:
+        fcntl.flock(stats_fh, fcntl.LOCK_EX)
+        stats_fh.seek(0)
+        content = stats_fh.read()
+        merged = {}
+        if content:
+            for endpoint, stats in json.loads(content)["endpoints"].items():
+                merged[endpoint] = dict(
+                    latency=LatencyHistogram.from_dict(stats["latency"]),
+                    bytes=stats["bytes"],
+                    errors=stats["errors"],
+                )
+        for endpoint, stats in endpoints.items():
+            if endpoint not in merged:
+                merged[endpoint] = dict(latency=LatencyHistogram(), bytes=0, errors=0)
+            merged[endpoint]["latency"].merge(stats["latency"])
+            merged[endpoint]["bytes"] += stats["bytes"]
+            merged[endpoint]["errors"] += stats["errors"]
+
+        stats_fh.seek(0)
+        stats_fh.truncate()
+        json.dump(
+            dict(
+                summary=summarise_network_stats(merged),
+                endpoints={
+                    endpoint: dict(latency=stats["latency"].to_dict(), bytes=stats["bytes"], errors=stats["errors"])
+                    for endpoint, stats in merged.items()
+                },
+            ),
+            stats_fh,
+            indent=2,
+        )
+        fcntl.flock(stats_fh, fcntl.LOCK_UN)
+    return merged
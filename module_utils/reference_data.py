@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import difflib
+import json
+import os
+import time
+from typing import TYPE_CHECKING
+
+from ansible.module_utils.shared_utils import (AuxOperationError,
+                                               iter_browse_rows,
+                                               quicksearch_for_object)
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import Page
+
+# AUX_REFERENCE_CACHE_DIR is read when a cache is made, tools against the mock server set it after importing us
+DEFAULT_REFERENCE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aux_reference_data")
+# lookup lists change rarely, a day old list is still good for pre-flight checks
+DEFAULT_TTL = 24 * 60 * 60
+
+# lookup browses listing the valid codes, list name: (view meta uri, code column)
+REFERENCE_LISTS = {
+    "gl_profiles": ("com.qad.erp.financials.glProfiles", "profileCode"),
+    "credit_terms": ("com.qad.erp.financials.creditTerms", "creditTermsCode"),
+    "invoice_statuses": ("com.qad.erp.financials.invoiceStatuses", "invoiceStatusCode"),
+    "currencies": ("com.qad.erp.base.currencies", "currencyCode"),
+    "bank_formats": ("com.qad.erp.financials.bankFormats", "bankAccFormatCode"),
+    "tax_zones": ("com.qad.erp.base.taxZones", "taxZone"),
+}
+
+# snake case input_fields names checked against each lookup list
+REFERENCE_FIELDS = {
+    "invoice_control_gl_profile_code": "gl_profiles",
+    "credit_note_control_gl_profile_code": "gl_profiles",
+    "pre_payment_control_gl_profile_code": "gl_profiles",
+    "sales_account_gl_profile_code": "gl_profiles",
+    "purchase_account_gl_profile_code": "gl_profiles",
+    "credit_terms_code": "credit_terms",
+    "invoice_status_code": "invoice_statuses",
+    "currency_code": "currencies",
+    "bank_acc_format_code": "bank_formats",
+    "tax_zone": "tax_zones",
+}
+
+
+class ReferenceDataCache:
+    """lookup list codes per qad server, one json file per list with its fetch time"""
+
+    def __init__(self, qad_server: str, ttl: int = DEFAULT_TTL, cache_dir: str = None):
+        cache_dir = cache_dir or os.environ.get("AUX_REFERENCE_CACHE_DIR", DEFAULT_REFERENCE_CACHE_DIR)
+        self.cache_dir = os.path.join(cache_dir, qad_server)
+        self.ttl = ttl
+
+    def path(self, list_name: str) -> str:
+        return os.path.join(self.cache_dir, f"{list_name}.json")
+
+    def get(self, list_name: str) -> list[str]:
+        """cached codes, None if the list was never fetched or has expired"""
+        try:
+            with open(self.path(list_name)) as cache_fh:
+                cached = json.load(cache_fh)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached["fetched"] > self.ttl:
+            return None
+        return cached["codes"]
+
+    def put(self, list_name: str, codes: list[str]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write then rename, parallel tasks may read the same list
+        tmp_path = f"{self.path(list_name)}.{os.getpid()}"
+        with open(tmp_path, "w") as cache_fh:
+            json.dump(dict(fetched=time.time(), codes=codes), cache_fh)
+        os.replace(tmp_path, self.path(list_name))
+
+
+def reference_fields(input_fields, path: str = "") -> list[tuple[str, str, str]]:
+    """(field path, list name, value) for every lookup field in snake case input_fields, including table rows"""
+    found = []
+    if isinstance(input_fields, dict):
+        for key, val in input_fields.items():
+            field_path = f"{path}.{key}" if path else key
+            if isinstance(val, (dict, list)):
+                found.extend(reference_fields(val, field_path))
+            elif key in REFERENCE_FIELDS and val not in (None, ""):
+                found.append((field_path, REFERENCE_FIELDS[key], str(val)))
+    elif isinstance(input_fields, list):
+        for index, row in enumerate(input_fields):
+            found.extend(reference_fields(row, f"{path}[{index}]"))
+    return found
+
+
+def validate_reference_fields(input_fields: dict, cache: ReferenceDataCache) -> tuple[dict, list[str], list[str]]:
+    """
+    check lookup codes in input_fields against the cached lists, returns
+    {field path: message with close matches} for unknown codes, the
+    names of lists that are not cached and of lists cached as unavailable,
+    whose fields could not be checked
+    """
+    invalid_fields = {}
+    uncached_lists = []
+    unavailable_lists = []
+    for field_path, list_name, value in reference_fields(input_fields):
+        codes = cache.get(list_name)
+        if codes is None:
+            if list_name not in uncached_lists:
+                uncached_lists.append(list_name)
+            continue
+        if not codes:
+            if list_name not in unavailable_lists:
+                unavailable_lists.append(list_name)
+            continue
+        if value not in codes:
+            suggestions = difflib.get_close_matches(value, codes, n=3, cutoff=0.6)
+            message = f"'{value}' is not in the {list_name.replace('_', ' ')} lookup list"
+            if suggestions:
+                message += f", did you mean {', '.join(suggestions)}?"
+            invalid_fields[field_path] = message
+    return invalid_fields, uncached_lists, unavailable_lists
+
+
+def invalid_fields_message(invalid_fields: dict) -> str:
+    return "Invalid lookup codes in input_fields: " + "; ".join(
+        f"{field_path}: {message}" for field_path, message in invalid_fields.items()
+    )
+
+
+def fetch_reference_list(page: Page, qad_server: str, list_name: str) -> list[str]:
+    """read every code from a lookup browse"""
+    view_meta_uri, code_column = REFERENCE_LISTS[list_name]
+    page.goto(f"http://{qad_server}:22010/qad-central/#/view/qraview/hybridbrowse?viewMetaUri=urn:view:meta:{view_meta_uri}")
+    quicksearch_for_object(page, "")
+    return [row[code_column] for row in iter_browse_rows(page) if row.get(code_column)]
+
+
+def unavailable_lists_message(list_names: list[str]) -> str:
+    return "Lookup lists could not be read, their input_fields were not validated: " + ", ".join(
+        list_name.replace("_", " ") for list_name in list_names
+    )
+
+
+def refresh_reference_lists(page: Page, qad_server: str, cache: ReferenceDataCache, list_names: list[str]) -> list[str]:
+    """
+    fetch and cache lookup lists, the page is left on the last lookup
+    browse. Returns the lists that could not be read, they are cached
+    empty for the ttl so the next tasks don't page their browse again
+    """
+    from playwright.sync_api import Error as PlaywrightError
+
+    unavailable_lists = []
+    for list_name in list_names:
+        try:
+            codes = fetch_reference_list(page, qad_server, list_name)
+        except (AuxOperationError, PlaywrightError):
+            codes = []
+        # an empty list means no access to the lookup browse, not that no code is valid
+        if not codes:
+            unavailable_lists.append(list_name)
+        cache.put(list_name, codes)
+    return unavailable_lists
@@ -0,0 +1,589 @@
+from __future__ import annotations
+
+import ast
+import functools
+import os
+from typing import TYPE_CHECKING
+
+import yaml
+from ansible.module_utils.har_utils import finish_capture, new_browser_context
+from ansible.module_utils.journal import (DONE, FAILED, STARTED,
+                                          RecordJournal, input_digest)
+from ansible.module_utils.perf_utils import (NetworkRecorder,
+                                             collect_page_metrics,
+                                             install_perf_observers,
+                                             start_perf_window)
+from ansible.module_utils.reference_data import (REFERENCE_FIELDS,
+                                                 ReferenceDataCache,
+                                                 invalid_fields_message,
+                                                 refresh_reference_lists,
+                                                 unavailable_lists_message,
+                                                 validate_reference_fields)
+from ansible.module_utils.screen_meta import load_screen_meta
+from ansible.module_utils.shared_utils import (AuxOperationError, AuxSession,
+                                               CircuitBreaker,
+                                               CircuitOpenError,
+                                               add_table_rows,
+                                               advsearch_for_object,
+                                               delete_object,
+                                               error_summary,
+                                               expand_panels,
+                                               is_transient,
+                                               map_field_names,
+                                               open_object,
+                                               quicksearch_for_object,
+                                               remove_table_rows,
+                                               retry_transient,
+                                               save_object,
+                                               snapshot_form,
+                                               string_field,
+                                               to_camel_case)
+from ansible.module_utils.timeouts import TimeoutPolicy, timed_login_required
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import Locator, Page
+
+# options every maintenance screen module takes, besides input_fields
+COMMON_ARGS = dict(
+    state_file=dict(type="str", required=True),
+    state=dict(type="str", required=True, choices=["present", "absent"]),
+    qad_server=dict(type="str", required=True),
+    headless=dict(type="bool", required=False, default=True),
+    browser_profile=dict(type="str", required=False, default="default", choices=["default", "lean"]),
+    collect_metrics=dict(type="bool", required=False, default=False),
+    record_network=dict(type="bool", required=False, default=False),
+    network_stats_file=dict(type="str", required=False),
+    capture_mode=dict(type="str", required=False, default="disabled", choices=["disabled", "record", "replay"]),
+    har_path=dict(type="str", required=False),
+    har_timing=dict(type="str", required=False, default="collapse", choices=["collapse", "preserve"]),
+    journal_file=dict(type="str", required=False),
+    resume=dict(type="bool", required=False, default=False),
+)
+# only for screens with lookup code fields
+REFERENCE_DATA_ARGS = dict(
+    validate_reference_data=dict(type="bool", required=False, default=True),
+    reference_data_ttl=dict(type="int", required=False, default=86400),
+)
+REQUIRED_IF = [
+    ("state", "present", ["input_fields"]),
+    ("capture_mode", "record", ["har_path"]),
+    ("capture_mode", "replay", ["har_path"]),
+]
+
+
+class ScreenSpec:
+    """
+    a maintenance screen compiled from its yaml spec:
+
+        name: Supplier                       # used in messages
+        view_meta_uri: com.qad.erp.base.supplierV2s
+        case_sensitive_words: [GL]           # optional, default [GL]
+        field_names:                         # optional, html names that don't camel case cleanly
+          head_office_email: headOfficeEMail
+        delete_timeout: 30000                # optional, ms to wait for the deleted toast until timings are learned
+        search:
+          quicksearch: supplier_code         # input_fields.main key to quicksearch for
+          # or advanced search conditions, values from input_fields.main
+          # filters: [{field: Customer, operator: equals, key: customer_code}]
+        fields:                              # input_fields sections, fields are required/optional
+          main:
+            supplier_code: required
+          banking:                           # table panel rows
+            table: BankingPanel
+            columns:
+              currency_code: required
+    """
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.view_meta_uri = spec["view_meta_uri"]
+        self.case_sensitive_words = spec.get("case_sensitive_words", ["GL"])
+        self.delete_timeout = spec.get("delete_timeout")
+        self.quicksearch_key = spec["search"].get("quicksearch")
+        self.search_filters = spec["search"].get("filters", [])
+        if not self.quicksearch_key and not self.search_filters:
+            raise ValueError(f"{self.name} spec needs a quicksearch key or search filters")
+        self.fields = spec["fields"]
+        # snake case key: html name, for every section, table and field
+        self.field_map = {
+            name: to_camel_case(name, self.case_sensitive_words) for name in section_names(self.fields)
+        }
+        self.field_map.update(spec.get("field_names", {}))
+        # html table key: panel id
+        self.tables = {
+            self.field_map[name]: field["table"]
+            for name, field in self.fields.items()
+            if isinstance(field, dict) and "table" in field
+        }
+        self.reference_data = any(name in REFERENCE_FIELDS for name in field_names(self.fields))
+        self.argument_spec = dict(COMMON_ARGS)
+        if self.reference_data:
+            self.argument_spec.update(REFERENCE_DATA_ARGS)
+        # nested sections are not validated by ansible, so input_fields only needs the keys it uses
+        self.argument_spec["input_fields"] = dict(required=False, type="dict", **fields_argument_spec(self.fields))
+
+    def item_url(self, qad_server: str) -> str:
+        return f"http://{qad_server}:22010/qad-central/#/view/qraview/hybridbrowse?viewMetaUri=urn:view:meta:{self.view_meta_uri}"
+
+    def camel_case(self, input_fields: dict) -> dict:
+        """input_fields keyed by html name, a dict lookup per key"""
+        return map_field_names(input_fields, self.field_map, self.case_sensitive_words)
+
+    def record_label(self, input_fields: dict) -> str:
+        """the search key values of the record in input_fields, for messages"""
+        if self.quicksearch_key:
+            return str(input_fields["main"][self.quicksearch_key])
+        return "/".join(str(input_fields["main"][search_filter["key"]]) for search_filter in self.search_filters)
+
+    def search_values(self, input_fields: dict) -> list[dict]:
+        """advanced search conditions for the record in input_fields"""
+        return [
+            dict(field=search_filter["field"], operator=search_filter["operator"], value=input_fields["main"][search_filter["key"]])
+            for search_filter in self.search_filters
+        ]
+
+
+def field_names(fields: dict):
+    for name, field in fields.items():
+        if isinstance(field, str):
+            yield name
+        elif "table" in field:
+            yield from field_names(field["columns"])
+        else:
+            yield from field_names(field)
+
+
+def section_names(fields: dict):
+    """every section, table and field name in a spec"""
+    for name, field in fields.items():
+        yield name
+        if isinstance(field, dict):
+            yield from section_names(field["columns"] if "table" in field else field)
+
+
+def fields_argument_spec(fields: dict) -> dict:
+    argument_spec = {}
+    for name, field in fields.items():
+        if isinstance(field, str):
+            argument_spec[name] = dict(type="str", required=field == "required")
+        elif "table" in field:
+            argument_spec[name] = dict(required=False, type="list", elements="dict", options=fields_argument_spec(field["columns"]))
+        else:
+            argument_spec[name] = dict(required=False, type="dict", options=fields_argument_spec(field))
+    return argument_spec
+
+
+@functools.lru_cache(maxsize=None)
+def compile_screen_spec(spec_text: str) -> ScreenSpec:
+    """compile a yaml screen spec, once per process"""
+    return ScreenSpec(yaml.safe_load(spec_text))
+
+
+def spec_from_module(module_path: str) -> ScreenSpec:
+    """compile the SCREEN_SPEC of a library/ module without importing it"""
+    with open(module_path) as module_fh:
+        tree = ast.parse(module_fh.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "SCREEN_SPEC" for target in node.targets):
+            return compile_screen_spec(node.value.value)
+    raise ValueError(f"{module_path} has no SCREEN_SPEC")
+
+
+def find_record(page: Page, screen: ScreenSpec, input_fields: dict, timeouts: TimeoutPolicy = None) -> Locator:
+    """search the browse for the record in input_fields, returns the first result row"""
+    timeouts = timeouts or TimeoutPolicy()
+    with timeouts.timed(f"search {screen.name}") as timeout:
+        if screen.quicksearch_key:
+            return quicksearch_for_object(page, input_fields["main"][screen.quicksearch_key], timeout)
+        return advsearch_for_object(page, screen.search_values(input_fields), timeout)
+
+
+def fill_record(page: Page, screen: ScreenSpec, args: dict) -> list[str]:
+    """
+    fill the open form from camel case args, only the fields and tables that
+    differ are touched and only the panels holding them are expanded,
+    returns the field names and table panel ids that were written
+    """
+    after = expected_snapshot(screen, args)
+    changed_fields, changed_tables = changed_items(read_record(page, after), after)
+    expanded, _ = expand_panels(page, changed_fields, changed_tables)
+    if expanded:
+        # fields of a lazily rendered panel read as empty until it is expanded, so what differed is read again
+        differing = select_items(after, changed_fields + changed_tables)
+        changed_fields, changed_tables = changed_items(read_record(page, differing), differing)
+    # field widget types, read once their panels are expanded
+    screen_meta = load_screen_meta(page, changed_fields) if changed_fields else {}
+    written = []
+    for name in changed_fields:
+        widget = screen_meta.get(name, {}).get("widget")
+        if string_field(page, f"[name={name}]", after["fields"][name], widget) == "changed":
+            written.append(name)
+    for table_key, panel_id in screen.tables.items():
+        if panel_id in changed_tables:
+            remove_table_rows(page, panel_id)
+            add_table_rows(page, panel_id, args[table_key])
+            written.append(panel_id)
+    return written
+
+
+def verify_record(page: Page, screen: ScreenSpec, args: dict, changed: list[str] = None) -> None:
+    """
+    check the reopened form matches args, or only the changed fields and
+    tables from fill_record, raises AuxOperationError if not
+    """
+    after = expected_snapshot(screen, args)
+    if changed is not None:
+        after = select_items(after, changed)
+    expand_panels(page, list(after["fields"]), list(after["tables"]))
+    before = read_record(page, after)
+    incorrect_fields, incorrect_tables = changed_items(before, after)
+    if incorrect_fields:
+        raise AuxOperationError(f"{screen.name} details have not correctly been updated {str(incorrect_fields)}")
+    for table_key, panel_id in screen.tables.items():
+        if panel_id in incorrect_tables:
+            incorrect_rows = [row for row in after["tables"][panel_id] if row not in (before["tables"][panel_id] or [])]
+            raise AuxOperationError(f"{screen.name} {table_key} details have not correctly been updated {str(incorrect_rows)}")
+
+
+def present_record(
+    page: Page,
+    screen: ScreenSpec,
+    input_fields: dict,
+    result: dict,
+    collect_metrics: bool = False,
+    timeouts: TimeoutPolicy = None,
+) -> None:
+    """create or update the record in input_fields, raises AuxOperationError on failure"""
+    timeouts = timeouts or TimeoutPolicy()
+    # First we check if the record already exists, open it or create a new one
+    record_locator = find_record(page, screen, input_fields, timeouts)
+    open_object(page, record_locator)
+
+    args = screen.camel_case(input_fields)
+    changed = fill_record(page, screen, args)
+    result["changed"] = bool(changed)
+    if not changed:
+        result["record"] = form_record(page, screen)
+        return
+
+    result["message"] = f"{screen.name} has been updated"
+    if collect_metrics:
+        perf_mark = start_perf_window(page)
+    # Save and wait for success toast to appear
+    try:
+        with timeouts.timed(f"save {screen.name}") as timeout:
+            result["record"] = save_object(page, timeout, screen.view_meta_uri)
+    except AuxOperationError as exc:
+        # the same error type, a save that timed out may be retried
+        raise type(exc)(f"Error saving {screen.name}") from exc
+    if collect_metrics:
+        result["metrics"]["save"] = collect_page_metrics(page, since=perf_mark)
+
+    # Exit the form and search again, confirm it exists
+    page.locator("#btnViewFormPane").click()
+    if not find_record(page, screen, input_fields, timeouts).is_visible():
+        raise AuxOperationError(f"{screen.name} not found after saving")
+
+    # Check that all fields have been updated correctly
+    record_locator.click(click_count=2)
+    page.locator(".k-loading-color").first.wait_for(state="detached")
+    verify_record(page, screen, args, changed)
+
+
+def form_record(page: Page, screen: ScreenSpec) -> dict:
+    """
+    the open record as read from the form, for a run with nothing to save:
+    every field and table in the page, in the shape of a save response record
+    """
+    snapshot = snapshot_form(page, list(load_screen_meta(page)), list(screen.tables.values()))
+    return dict(
+        fields={name: value for name, value in snapshot["fields"].items() if value is not None},
+        tables={panel_id: rows for panel_id, rows in snapshot["tables"].items() if rows is not None},
+    )
+
+
+def expected_snapshot(screen: ScreenSpec, args: dict) -> dict:
+    """camel case args in the shape of snapshot_form, rows sorted so row order is ignored"""
+    fields = {}
+
+    def flatten(section: dict) -> None:
+        for key, val in section.items():
+            if isinstance(val, dict):
+                flatten(val)
+            elif not isinstance(val, list):
+                fields[key] = str(val)
+
+    flatten(args)
+    tables = {
+        panel_id: sorted_rows([{key: str(val) for key, val in row.items()} for row in args[table_key]])
+        for table_key, panel_id in screen.tables.items()
+        if table_key in args
+    }
+    return dict(fields=fields, tables=tables)
+
+
+def select_items(snapshot: dict, names: list[str]) -> dict:
+    """the fields and tables of a snapshot whose name or panel id is in names"""
+    return dict(
+        fields={name: value for name, value in snapshot["fields"].items() if name in names},
+        tables={panel_id: rows for panel_id, rows in snapshot["tables"].items() if panel_id in names},
+    )
+
+
+def sorted_rows(rows: list[dict]) -> list[dict]:
+    return sorted(rows, key=lambda row: sorted(row.items()))
+
+
+def read_record(page: Page, after: dict) -> dict:
+    """one batched read of the open form in the shape of expected_snapshot"""
+    snapshot = snapshot_form(page, list(after["fields"]), list(after["tables"]))
+    before = dict(fields=snapshot["fields"], tables={})
+    for panel_id, rows in snapshot["tables"].items():
+        if rows is None:
+            before["tables"][panel_id] = None
+            continue
+        # only the table columns we manage are compared
+        columns = {column for expected_row in after["tables"][panel_id] for column in expected_row}
+        before["tables"][panel_id] = sorted_rows([{column: row.get(column) for column in columns} for row in rows])
+    return before
+
+
+def unread_items(snapshot: dict) -> list[str]:
+    """field names and table panel ids of a read_record snapshot that were not in the page"""
+    return [name for name, value in {**snapshot["fields"], **snapshot["tables"]}.items() if value is None]
+
+
+def changed_items(before: dict, after: dict) -> tuple[list[str], list[str]]:
+    """field names and table panel ids whose values differ between two snapshots"""
+    fields = [name for name, value in after["fields"].items() if before["fields"].get(name) != value]
+    tables = [panel_id for panel_id, rows in after["tables"].items() if before["tables"].get(panel_id) != rows]
+    return fields, tables
+
+
+def check_record(page: Page, screen: ScreenSpec, input_fields: dict, result: dict, timeouts: TimeoutPolicy = None) -> None:
+    """
+    check mode for state present: one batched read of the record's fields
+    and table rows, returned as an ansible diff without writing anything.
+    Fields and tables that could not be read are returned as unknown and
+    left out of the diff
+    """
+    args = screen.camel_case(input_fields)
+    after = expected_snapshot(screen, args)
+    label = screen.record_label(input_fields)
+
+    record_locator = find_record(page, screen, input_fields, timeouts)
+    if record_locator.is_visible():
+        open_object(page, record_locator)
+        # lazily rendered panels have no fields to read until they are expanded
+        expand_panels(page, list(after["fields"]), list(after["tables"]))
+        before = read_record(page, after)
+        unknown = unread_items(before)
+        if unknown:
+            result["unknown"] = unknown
+            known = [name for name in list(after["fields"]) + list(after["tables"]) if name not in unknown]
+            before, after = select_items(before, known), select_items(after, known)
+        result["message"] = f"{screen.name} would be updated" if before != after else f"{screen.name} is up to date"
+        if unknown:
+            result["message"] += f", {len(unknown)} fields or tables could not be read"
+    else:
+        before = {}
+        result["message"] = f"{screen.name} would be created"
+
+    result["changed"] = before != after
+    result["diff"] = dict(
+        before=before,
+        after=after,
+        before_header=f"{screen.name} {label} (AUX)",
+        after_header=f"{screen.name} {label} (input_fields)",
+    )
+
+
+def check_absent_record(page: Page, screen: ScreenSpec, input_fields: dict, result: dict, timeouts: TimeoutPolicy = None) -> None:
+    """check mode for state absent, only searches for the record"""
+    label = screen.record_label(input_fields)
+    if not find_record(page, screen, input_fields, timeouts).is_visible():
+        result["message"] = f"{screen.name} does not exist"
+        return
+    result["message"] = f"{screen.name} would be deleted"
+    result["changed"] = True
+    result["diff"] = dict(
+        before=dict(state="present"),
+        after=dict(state="absent"),
+        before_header=f"{screen.name} {label}",
+        after_header=f"{screen.name} {label}",
+    )
+
+
+def absent_record(page: Page, screen: ScreenSpec, input_fields: dict, result: dict, timeouts: TimeoutPolicy = None) -> None:
+    """delete the record in input_fields if it exists, raises AuxOperationError on failure"""
+    timeouts = timeouts or TimeoutPolicy()
+    record_locator = find_record(page, screen, input_fields, timeouts)
+    if not record_locator.is_visible():
+        result["message"] = f"{screen.name} does not exist"
+        return
+    record_locator.click(click_count=2)
+
+    try:
+        with timeouts.timed(f"delete {screen.name}", screen.delete_timeout) as timeout:
+            delete_object(page, timeout)
+    except AuxOperationError as exc:
+        raise type(exc)(f"Error deleting {screen.name}") from exc
+
+    # Check the record no longer exists in browse
+    page.locator("#btnViewFormPane").click()
+    if find_record(page, screen, input_fields, timeouts).is_visible():
+        raise AuxOperationError(f"Could not delete {screen.name}")
+
+    result["message"] = f"{screen.name} has been deleted"
+    result["changed"] = True
+
+
+def run_screen(module, screen: ScreenSpec) -> None:
+    """run a maintenance screen module, exits the module with the result"""
+    result = dict(changed=False, message="")
+
+    # Check if state file exists
+    state_file_exists = os.path.exists(module.params["state_file"])
+    if not state_file_exists and module.params["capture_mode"] != "replay":
+        module.fail_json(msg="Authentication state file does not exist!", **result)
+
+    # Records a resumed bulk run already loaded are skipped, before launching a browser
+    journal = None
+    if module.params["journal_file"] and not module.check_mode:
+        journal = RecordJournal(module.params["journal_file"])
+        record = f"{screen.name} {module.params['state']} {screen.record_label(module.params['input_fields'])}"
+        digest = input_digest(module.params["input_fields"])
+        if module.params["resume"] and journal.completed(record, digest):
+            result["message"] = f"{record} already done in {module.params['journal_file']}"
+            result["resumed"] = True
+            module.exit_json(**result)
+
+    # Fail fast on mistyped lookup codes, before launching a browser
+    reference_cache = None
+    uncached_lists = []
+    if screen.reference_data and module.params["state"] == "present" and module.params["validate_reference_data"]:
+        reference_cache = ReferenceDataCache(module.params["qad_server"], module.params["reference_data_ttl"])
+        invalid_fields, uncached_lists, unavailable_lists = validate_reference_fields(module.params["input_fields"], reference_cache)
+        if invalid_fields:
+            module.fail_json(msg=invalid_fields_message(invalid_fields), invalid_fields=invalid_fields, **result)
+        if unavailable_lists:
+            module.warn(unavailable_lists_message(unavailable_lists))
+        if module.params["capture_mode"] == "replay":
+            # lookup browses are not in the recorded traffic
+            uncached_lists = []
+
+    # Replayed traffic says nothing about the server's timings or health
+    replay = module.params["capture_mode"] == "replay"
+    timeouts = TimeoutPolicy(None if replay else module.params["qad_server"])
+
+    # A server whose circuit breaker is open is not contacted, we fail at once with the reason
+    breaker = None if replay else CircuitBreaker(module.params["qad_server"])
+    if breaker is not None:
+        try:
+            breaker.check()
+        except CircuitOpenError as exc:
+            module.fail_json(msg=str(exc), **result)
+
+    # The browser is always closed before we exit, whatever happens
+    with AuxSession(
+        module.params["headless"],
+        new_context=lambda browser, context_args: new_browser_context(
+            browser,
+            module.params["state_file"],
+            module.params["capture_mode"],
+            module.params["har_path"],
+            module.params["har_timing"],
+            context_args,
+        ),
+        profile=module.params["browser_profile"],
+    ) as session:
+        # a started record without an outcome, eg the run was killed, is in flight and retried on resume
+        if journal is not None:
+            journal.append(record, digest, STARTED)
+        error = run_screen_task(module, screen, session, result, reference_cache, uncached_lists, timeouts, breaker)
+    result["browser"] = session.report()
+    timeouts.save()
+    if journal is not None:
+        journal.append(record, digest, FAILED if error else DONE, changed=result["changed"], message=error or result["message"])
+
+    if error:
+        module.fail_json(msg=error, **result)
+    module.exit_json(**result)
+
+
+def run_screen_task(
+    module,
+    screen: ScreenSpec,
+    session: AuxSession,
+    result: dict,
+    reference_cache: ReferenceDataCache = None,
+    uncached_lists: list[str] = [],
+    timeouts: TimeoutPolicy = None,
+    breaker: CircuitBreaker = None,
+) -> str:
+    """the browser part of run_screen, returns an error message if the task failed"""
+    timeouts = timeouts or TimeoutPolicy()
+    item_url = screen.item_url(module.params["qad_server"])
+    if module.params["collect_metrics"]:
+        install_perf_observers(session.context)
+    page = session.page
+    network_recorder = None
+    if module.params["record_network"] or module.params["network_stats_file"]:
+        network_recorder = NetworkRecorder(page)
+    page.goto(item_url)
+
+    # If we are sent to the login screen we are not logged in
+    if timed_login_required(page, timeouts):
+        return "No current logged in user"
+
+    if module.params["collect_metrics"]:
+        result["metrics"] = dict(navigation=collect_page_metrics(page))
+
+    # Lookup lists not cached yet are read now we are logged in
+    if uncached_lists:
+        # a lookup browse that can't be read only skips validating its fields
+        unavailable_lists = refresh_reference_lists(page, module.params["qad_server"], reference_cache, uncached_lists)
+        if unavailable_lists:
+            module.warn(unavailable_lists_message(unavailable_lists))
+        invalid_fields, _, _ = validate_reference_fields(module.params["input_fields"], reference_cache)
+        if invalid_fields:
+            result["invalid_fields"] = invalid_fields
+            return invalid_fields_message(invalid_fields)
+        page.goto(item_url)
+
+    def screen_operation() -> None:
+        if module.check_mode and module.params["state"] == "present":
+            check_record(page, screen, module.params["input_fields"], result, timeouts)
+        elif module.check_mode:
+            check_absent_record(page, screen, module.params["input_fields"], result, timeouts)
+        elif module.params["state"] == "present":
+            present_record(page, screen, module.params["input_fields"], result, module.params["collect_metrics"], timeouts)
+        elif module.params["state"] == "absent":
+            absent_record(page, screen, module.params["input_fields"], result, timeouts)
+
+    # every operation searches for the record first and only writes what
+    # differs, so a retry re-checks what a failed save or delete already did
+    attempts_changed = []
+
+    def before_retry() -> None:
+        attempts_changed.append(result["changed"])
+        result["retries"] = len(attempts_changed)
+        page.goto(item_url)
+
+    try:
+        retry_transient(screen_operation, breaker, before_retry)
+    except AuxOperationError as exc:
+        return str(exc)
+    except Exception as exc:
+        if not is_transient(exc):
+            raise
+        return f"AUX did not respond in time after {len(attempts_changed) + 1} attempts: {error_summary(exc)}"
+    finally:
+        # a save that went through before its attempt failed leaves nothing to change on the retry
+        result["changed"] = result["changed"] or any(attempts_changed)
+
+    if network_recorder is not None:
+        result["network"] = network_recorder.emit(module.params["network_stats_file"])
+    finish_capture(session.context, module.params["capture_mode"])
+    return None
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import Page
+
+# AUX_SCREEN_META_CACHE_DIR is read when a cache is made, tools against the mock server set it after importing us
+DEFAULT_SCREEN_META_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aux_screen_meta")
+# screens only change with an AUX upgrade, the ttl covers servers that don't report a version
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+AUX_VERSION_SCRIPT = """
+() => (document.querySelector("meta[name='qad-version']") || {}).content
+    || (window.QAD && window.QAD.version)
+    || "unknown"
+"""
+
+# widget type, section panel and options source of every named field in the open form
+SCREEN_META_SCRIPT = """
+() => {
+    const fields = {};
+    for (const input of document.querySelectorAll("input[name], textarea[name], select[name]")) {
+        const wrapper = input.parentElement;
+        const listbox = wrapper && wrapper.querySelector("[role=listbox]");
+        let widget = "text";
+        if (input.type === "checkbox") {
+            widget = "checkbox";
+        } else if (listbox && (input.type === "hidden" || input.getClientRects().length === 0)) {
+            // kendo drop down, the named input is hidden and set from the listbox
+            widget = "list";
+        }
+        const panel = input.closest(".panel[id]");
+        fields[input.name] = {
+            widget,
+            section: panel ? panel.id : null,
+            options: widget === "list"
+                ? wrapper.getAttribute("aria-controls") || wrapper.getAttribute("aria-owns") || listbox.id || null
+                : null,
+        };
+    }
+    return fields;
+}
+"""
+
+
+class ScreenMetaCache:
+    """field metadata per qad server, AUX version and screen, one json file per screen"""
+
+    def __init__(self, qad_server: str, aux_version: str, ttl: int = DEFAULT_TTL, cache_dir: str = None):
+        cache_dir = cache_dir or os.environ.get("AUX_SCREEN_META_CACHE_DIR", DEFAULT_SCREEN_META_CACHE_DIR)
+        self.cache_dir = os.path.join(cache_dir, qad_server, aux_version)
+        self.ttl = ttl
+
+    def path(self, view_meta_uri: str) -> str:
+        return os.path.join(self.cache_dir, f"{view_meta_uri}.json")
+
+    def get(self, view_meta_uri: str) -> dict:
+        """cached field metadata, None if the screen was never read or has expired"""
+        try:
+            with open(self.path(view_meta_uri)) as cache_fh:
+                cached = json.load(cache_fh)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached["read"] > self.ttl:
+            return None
+        return cached["fields"]
+
+    def put(self, view_meta_uri: str, fields: dict) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write then rename, parallel tasks may read the same screen
+        tmp_path = f"{self.path(view_meta_uri)}.{os.getpid()}"
+        with open(tmp_path, "w") as cache_fh:
+            json.dump(dict(read=time.time(), fields=fields), cache_fh)
+        os.replace(tmp_path, self.path(view_meta_uri))
+
+
+def page_view_meta_uri(page: Page) -> str:
+    """view meta uri of the hybridbrowse the page is on"""
+    fragment_query = urlsplit(page.url).fragment.partition("?")[2]
+    return parse_qs(fragment_query).get("viewMetaUri", [""])[0].replace("urn:view:meta:", "")
+
+
+def load_screen_meta(page: Page, names: list[str] = []) -> dict:
+    """
+    {field name: {widget, section, options}} for the screen open in the
+    form pane, read from the DOM once per server and AUX version then
+    served from disk. The fields of a lazily rendered panel are only in
+    the DOM once it is expanded, so when any of names is not cached the
+    DOM is read again and the fields it adds are merged into the cache
+    """
+    view_meta_uri = page_view_meta_uri(page)
+    if not view_meta_uri:
+        # not on a hybridbrowse url, nothing to key the cache on
+        return page.evaluate(SCREEN_META_SCRIPT)
+    cache = ScreenMetaCache(urlsplit(page.url).hostname, page.evaluate(AUX_VERSION_SCRIPT))
+    fields = cache.get(view_meta_uri)
+    if fields is not None and all(name in fields for name in names):
+        return fields
+    seen = page.evaluate(SCREEN_META_SCRIPT)
+    if fields is None or any(name not in fields for name in seen):
+        fields = dict(fields or {}, **seen)
+        if fields:
+            cache.put(view_meta_uri, fields)
+    return fields
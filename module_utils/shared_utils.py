@@ -1,6 +1,30 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import random
+import signal
+import threading
 import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import Locator, Page, Response
+
+
+class AuxOperationError(Exception):
+    """AUX did not confirm an operation (eg save/delete toast missing or wrong)"""
+
+
+class AuxTransientError(AuxOperationError):
+    """AUX did not answer in time (eg toast never shown), the operation may succeed if retried"""
 
-from playwright.sync_api._generated import Locator, Page
+
+class CircuitOpenError(AuxOperationError):
+    """the qad server's circuit breaker is open, it is not contacted until the cool down is over"""
 
 
 # Copilot prompt: function to traverse nested dictionary tree and return dict with all keys converted to camel case
@@ -25,37 +49,46 @@ def to_camel_case(snake_case: str, case_sensitive_words: list[str] = []) -> str:
     # First word is lowercase
     camel_string = words[0].lower()
 
-    # Loop through remaining words
+    # Some words need to be case sensitive, eg GL, the rest are title cased
+    case_sensitive = {word.lower(): word for word in case_sensitive_words}
     for word in words[1:]:
-        if len(case_sensitive_words) != 0:
-            # Some words need to be case sensitive, this handles that
-            for case_sensitive_word in case_sensitive_words:
-                if word.lower() == case_sensitive_word.lower():
-                    word = case_sensitive_word
-                else:
-                    word = word.title()
-        else:
-            word = word.title()
-
-        camel_string += word
+        camel_string += case_sensitive.get(word.lower(), word.title())
     return camel_string
 
 
-def change_input_fields(page: Page, input_fields: dict, changed: bool = False) -> bool:
+def map_field_names(input_fields: dict, field_map: dict, case_sensitive_words: list[str] = []) -> dict:
+    """
+    Rename all keys in nested dictionary to their html name with a
+    precompiled field map, keys not in the map are camel cased
+    """
+    mapped = {}
+    for key, val in input_fields.items():
+        if isinstance(val, dict):
+            val = map_field_names(val, field_map, case_sensitive_words)
+        elif isinstance(val, list):
+            val = [map_field_names(item, field_map, case_sensitive_words) for item in val]
+        name = field_map.get(key)
+        mapped[name if name is not None else to_camel_case(key, case_sensitive_words)] = val
+    return mapped
+
+
+def change_input_fields(page: Page, input_fields: dict, changed: bool = False, screen_meta: dict = None) -> bool:
     """
     recursively update any input fields, returns true
-    if any are changed
+    if any are changed, screen_meta (see screen_meta.load_screen_meta)
+    gives the widget type of each field so it isn't probed
     """
     for key, val in input_fields.items():
         if isinstance(val, dict):
-            changed = change_input_fields(page, val, changed)
+            changed = change_input_fields(page, val, changed, screen_meta)
         elif isinstance(val, list):
             # this is a table, the table id naming is not consistent
             # so we have hardcoded handling in the module XXX:todo
             continue
         else:
             html_locator = f"[name={key}]"
-            result = string_field(page, html_locator, str(val))
+            widget = (screen_meta or {}).get(key, {}).get("widget")
+            result = string_field(page, html_locator, str(val), widget)
             if result == "changed":
                 changed = True
     return changed
@@ -121,10 +154,135 @@ def check_object_details(page: Page, module_details: dict[str, str]) -> list[str
     return incorrect_object_details
 
 
-def quicksearch_for_object(page: Page, object_code: str) -> Locator:
+# one round trip for the whole form: named field values and table panel rows
+FORM_SNAPSHOT_SCRIPT = """
+([names, tableIds]) => {
+    const fields = {};
+    for (const name of names) {
+        const input = document.querySelector(`[name="${name}"]`);
+        fields[name] = input ? input.value : null;
+    }
+    const tables = {};
+    for (const tableId of tableIds) {
+        // the grid of a panel that has not been rendered is unknown, not empty
+        const grid = document.querySelector(`[id="${tableId}"] .k-grid-content`);
+        if (!grid) {
+            tables[tableId] = null;
+            continue;
+        }
+        const rows = grid.querySelectorAll(":scope > table > tbody > tr");
+        tables[tableId] = [...rows].map((row) => {
+            const values = {};
+            for (const cell of row.querySelectorAll("td")) {
+                const fieldClass = [...cell.classList].find((name) => name.startsWith("qFieldName-"));
+                if (fieldClass) {
+                    values[fieldClass.slice("qFieldName-".length)] = cell.textContent.trim();
+                }
+            }
+            return values;
+        });
+    }
+    return {fields, tables};
+}
+"""
+
+
+def snapshot_form(page: Page, names: list[str], table_ids: list[str] = []) -> dict:
+    """
+    read the values of named fields and the rows of table panels in the
+    open form, None for those that are not in the page
+    """
+    return page.evaluate(FORM_SNAPSHOT_SCRIPT, [names, table_ids])
+
+
+# expand the collapsed section panels (outermost first) holding the given fields and tables,
+# returns the ids of the panels opened and the fields and tables that are not in the page at all
+EXPAND_PANELS_SCRIPT = """
+([names, tableIds]) => {
+    const targets = [];
+    const missing = [];
+    for (const [name, element] of [
+        ...names.map((name) => [name, document.querySelector(`[name="${name}"]`)]),
+        ...tableIds.map((tableId) => [tableId, document.getElementById(tableId)]),
+    ]) {
+        if (element) {
+            targets.push(element);
+        } else {
+            missing.push(name);
+        }
+    }
+    const seen = new Set();
+    const opened = new Set();
+    for (const target of targets) {
+        const panels = [];
+        for (let panel = target.closest(".panel"); panel; panel = panel.parentElement.closest(".panel")) {
+            panels.unshift(panel);
+        }
+        // a panel inside one we just opened may still be animating, only its class is trusted
+        let opening = false;
+        for (const panel of panels) {
+            const body = panel.querySelector(":scope > .panel-body");
+            const hidden = !opening && body && body.getClientRects().length === 0;
+            const collapsed = panel.classList.contains("collapsed") || hidden;
+            const heading = panel.querySelector(":scope > .panel-heading");
+            if (!seen.has(panel) && collapsed && heading) {
+                heading.click();
+                opened.add(panel);
+            }
+            seen.add(panel);
+            opening = opening || opened.has(panel);
+        }
+    }
+    return [[...opened].map((panel) => panel.id), missing];
+}
+"""
+# true once every given field and table grid is in the page, ie their panels have been rendered
+PANELS_RENDERED_SCRIPT = """
+([names, tableIds]) => names.every((name) => document.querySelector(`[name="${name}"]`))
+    && tableIds.every((tableId) => document.querySelector(`[id="${tableId}"] .k-grid-content`))
+"""
+
+
+def expand_panels(
+    page: Page, names: list[str], table_ids: list[str] = [], timeout: float = 5000
+) -> tuple[list[str], list[str]]:
+    """
+    expand only the section panels that hold the given fields and tables,
+    so untouched sections are never rendered, and wait once for them to
+    be drawn. Returns the expanded panel ids and the fields and tables not
+    in the page, which are left unknown rather than searched for
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    expanded, missing = page.evaluate(EXPAND_PANELS_SCRIPT, [names, table_ids])
+    if expanded:
+        # only what is in the page is waited for, a missing target would hold us for the whole timeout
+        present_names = [name for name in names if name not in missing]
+        present_tables = [table_id for table_id in table_ids if table_id not in missing]
+        try:
+            page.wait_for_function(PANELS_RENDERED_SCRIPT, arg=[present_names, present_tables], timeout=timeout)
+        except PlaywrightTimeoutError:
+            # a table grid still not drawn reads as unknown
+            pass
+    return expanded, missing
+
+
+def login_required(page: Page, timeout: float = 1000) -> bool:
+    """True if the page is sent to the AUX login screen, ie we are not logged in"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    try:
+        page.wait_for_url("**/qad-central/resources/login.jsp*", timeout=timeout)
+    except PlaywrightTimeoutError:
+        return False
+    return True
+
+
+def quicksearch_for_object(page: Page, object_code: str, timeout: float = 30000) -> Locator:
     """
         Search browse using quicksearch bar,
-        return the object playwright locator if exists
+        return the object playwright locator if exists,
+        timeout is ms for the search bar and for the search
     """
     # Use browse search bar to search for object
     searchbar_locator = page.locator("[id=tbQuickSearch_BrowseDataGrid]")
@@ -135,12 +293,12 @@ def quicksearch_for_object(page: Page, object_code: str) -> Locator:
             view_option.click()
 
     if searchbar_locator.is_visible():
-        searchbar_locator.fill(object_code, timeout=15000)
+        searchbar_locator.fill(object_code, timeout=timeout)
 
     page.locator("[id=btnBrowseSearch]").click()
 
     # Wait for loading spinner to detatch
-    page.locator(".k-loading-color").first.wait_for(state="detached")
+    page.locator(".k-loading-color").first.wait_for(state="detached", timeout=timeout)
     # Find first element in results table
     object_locator = page.locator(
         "#qGridContent > table[aria-activedescendant=kGrid_BrowseDataGrid_active_cell] > tbody > tr"
@@ -148,10 +306,11 @@ def quicksearch_for_object(page: Page, object_code: str) -> Locator:
     return object_locator
 
 
-def advsearch_for_object(page: Page, filter_defs: list[dict[str, str, str]]) -> Locator:
+def advsearch_for_object(page: Page, filter_defs: list[dict[str, str, str]], timeout: float = None) -> Locator:
     """
         Search browse using advanced search options,
-        return the object playwright locator if exists
+        return the object playwright locator if exists,
+        timeout is ms for the search once the conditions are set
     """
     # open the advanced search caret
     page.locator("[id=btnSearchAdvance]").click()
@@ -219,7 +378,7 @@ def advsearch_for_object(page: Page, filter_defs: list[dict[str, str, str]]) ->
 
     page.locator("[id=btnSaveSearchCond]").click()
     # Wait for loading spinner to detatch
-    page.locator(".k-loading-color").first.wait_for(state="detached")
+    page.locator(".k-loading-color").first.wait_for(state="detached", timeout=timeout)
     # Find first element in results table
     object_locator = page.locator(
         "#qGridContent > table[aria-activedescendant=kGrid_BrowseDataGrid_active_cell] > tbody > tr"
@@ -227,31 +386,318 @@ def advsearch_for_object(page: Page, filter_defs: list[dict[str, str, str]]) ->
     return object_locator
 
 
-def string_field(page: Page, locator_string: str, text: str) -> str:
-    """Idempotently update given field in object edit page"""
+def open_object(page: Page, object_locator: Locator) -> bool:
+    """
+        Open a searched object for editing, or a new object if the
+        search found nothing, returns True if the object already existed
+    """
+    object_exists = object_locator.is_visible()
+    if object_exists:
+        object_locator.click(click_count=2)
+    else:
+        page.locator("[id=ToolBtnNew]").click()
+    page.locator(".k-loading-color").first.wait_for(state="detached")
+    return object_exists
+
+
+def wait_for_toast(page: Page, text: str, timeout: float = None) -> None:
+    """Wait for the AUX toast message, raise AuxOperationError unless it contains text"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    from playwright.sync_api import expect
+
+    toast = page.locator(".toast-message").first
+    try:
+        toast.wait_for(timeout=timeout)
+    except PlaywrightTimeoutError as exc:
+        raise AuxTransientError(f"toast message '{text}' not shown") from exc
+    try:
+        expect(toast).to_have_text(text, ignore_case=True)
+    except AssertionError as exc:
+        # AUX answered with something else, eg a validation error
+        raise AuxOperationError(f"toast message '{text}' not shown") from exc
+
+
+# the form is saved with a json write to the qad-central api
+SAVE_METHODS = ("POST", "PUT", "PATCH")
+SAVE_URL_PART = "/qad-central/api/erp/"
+
+
+def is_save_response(response: Response, view_meta_uri: str = None) -> bool:
+    """
+    a write to the erp api, to the open screen's own resource when its
+    view meta uri is given, so other XHRs sent during a save are ignored
+    """
+    if response.request.method not in SAVE_METHODS or SAVE_URL_PART not in response.url:
+        return False
+    if not view_meta_uri:
+        return True
+    # the resource is named by the whole view meta uri or its last part (customerV2s)
+    segments = urlsplit(response.url).path.split("/")
+    return view_meta_uri in segments or view_meta_uri.rsplit(".", 1)[-1] in segments
+
+
+def saved_record(responses: list[Response]) -> dict:
+    """the persisted record (including generated keys) from the last save response"""
+    from playwright.sync_api import Error as PlaywrightError
+
+    for response in reversed(responses):
+        try:
+            body = response.json()
+        except (ValueError, PlaywrightError):
+            # not json, or the body is no longer available
+            continue
+        if isinstance(body, dict):
+            return body.get("record", body)
+    return {}
+
+
+def save_object(page: Page, timeout: float = 160000, view_meta_uri: str = None) -> dict:
+    """
+    Save the open object and wait for the success toast, return the
+    saved record from the save response so no extra search is needed,
+    view_meta_uri is the open screen's, to pick its save response
+    """
+    responses = []
+
+    def on_response(response: Response) -> None:
+        if is_save_response(response, view_meta_uri):
+            responses.append(response)
+
+    page.on("response", on_response)
+    try:
+        page.locator("[id=ToolBtnSave]").click()
+        wait_for_toast(page, "saved", timeout)
+    finally:
+        page.remove_listener("response", on_response)
+    return saved_record(responses)
+
+
+def delete_object(page: Page, timeout: float = None) -> None:
+    """Delete the open object, confirm the popup and wait for the deleted toast"""
+    page.locator("#ToolBtnDelete").click()
+    popup_locator = page.locator("#qModalDialogConfirm")
+    popup_locator.wait_for()
+    popup_locator.click()
+    wait_for_toast(page, "deleted", timeout)
+
+
+# one round trip per grid page, cells are keyed by their qFieldName-<name> class
+BROWSE_ROWS_SCRIPT = """
+() => [...document.querySelectorAll(
+    "#qGridContent > table[aria-activedescendant=kGrid_BrowseDataGrid_active_cell] > tbody > tr"
+)].map((row) => {
+    const values = {};
+    for (const cell of row.querySelectorAll("td")) {
+        const fieldClass = [...cell.classList].find((name) => name.startsWith("qFieldName-"));
+        if (fieldClass) {
+            values[fieldClass.slice("qFieldName-".length)] = cell.textContent.trim();
+        }
+    }
+    return values;
+})
+"""
+
+
+BROWSE_NEXT_PAGE = ".k-pager-wrap .k-pager-nav[title='Go to the next page'], .k-pager .k-pager-nav[title='Go to the next page']"
+
+
+def read_browse_rows(page: Page) -> list[dict]:
+    """return all rows on the current browse grid page as dicts keyed by field name"""
+    return page.evaluate(BROWSE_ROWS_SCRIPT)
+
+
+def has_next_browse_page(page: Page) -> bool:
+    """True if the browse grid has a page after the current one"""
+    next_button = page.locator(BROWSE_NEXT_PAGE).first
+    if not next_button.is_visible():
+        return False
+    classes = next_button.get_attribute("class") or ""
+    return not ("k-disabled" in classes or "k-state-disabled" in classes or next_button.get_attribute("aria-disabled") == "true")
+
+
+def next_browse_page(page: Page) -> bool:
+    """move the browse grid to its next page, returns False on the last page"""
+    if not has_next_browse_page(page):
+        return False
+    page.locator(BROWSE_NEXT_PAGE).first.click()
+    page.locator(".k-loading-color").first.wait_for(state="detached")
+    return True
+
+
+def iter_browse_rows(page: Page, max_rows: int = None):
+    """
+    yield every row of the current browse search result, one grid page
+    at a time so memory use does not grow with the size of the browse
+    """
+    row_count = 0
+    while True:
+        for row in read_browse_rows(page):
+            yield row
+            row_count += 1
+            if max_rows is not None and row_count >= max_rows:
+                return
+        if not next_browse_page(page):
+            return
+
+
+def verify_records(
+    page: Page,
+    key_label: str,
+    key_name: str,
+    expected_records: list[dict],
+    operator: str = "in",
+    separator: str = ",",
+    chunk_size: int = 50,
+) -> dict:
+    """
+    verify many records with one advanced search per chunk of keys
+    (key_label <operator> key1,key2,...), diffing the browse grid columns
+    against the expected records (camel case keys), returns missing keys
+    and per key {field: {expected, actual}} for mismatched records, plus
+    the expected fields that are not grid columns and need a deep check
+    """
+    missing = []
+    mismatched = {}
+    columns = set()
+    for start in range(0, len(expected_records), chunk_size):
+        chunk = expected_records[start:start + chunk_size]
+        keys = [str(record[key_name]) for record in chunk]
+        advsearch_for_object(page, [dict(field=key_label, operator=operator, value=separator.join(keys))])
+        found = {}
+        for row in iter_browse_rows(page):
+            columns.update(row)
+            if row.get(key_name) in keys:
+                found[row[key_name]] = row
+
+        for record in chunk:
+            key = str(record[key_name])
+            if key not in found:
+                missing.append(key)
+                continue
+            # only columns shown in the grid can be checked from the browse
+            differences = {
+                field: dict(expected=str(val), actual=found[key][field])
+                for field, val in record.items()
+                if field in found[key] and found[key][field] != str(val)
+            }
+            if differences:
+                mismatched[key] = differences
+    expected_fields = {field for record in expected_records for field in record}
+    return dict(missing=missing, mismatched=mismatched, unchecked_fields=sorted(expected_fields - columns))
+
+
+def find_browse_keys(
+    page: Page,
+    key_label: str,
+    key_name: str,
+    keys: list[str],
+    operator: str = "in",
+    separator: str = ",",
+    chunk_size: int = 50,
+) -> list[str]:
+    """return the keys that are in the browse, one advanced search per chunk of keys"""
+    found = []
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        advsearch_for_object(page, [dict(field=key_label, operator=operator, value=separator.join(chunk))])
+        found.extend(row[key_name] for row in iter_browse_rows(page) if row.get(key_name) in chunk)
+    return found
+
+
+def select_browse_rows(page: Page, key_name: str, keys: list[str]) -> list[str]:
+    """ctrl+click the rows on the current browse grid page whose key is in keys, return the selected keys"""
+    grid_rows = page.locator("#qGridContent > table[aria-activedescendant=kGrid_BrowseDataGrid_active_cell] > tbody > tr")
+    selected = []
+    for index, row in enumerate(read_browse_rows(page)):
+        if row.get(key_name) in keys:
+            grid_rows.nth(index).locator(f"td.qFieldName-{key_name}").click(modifiers=["Control"])
+            selected.append(row[key_name])
+    return selected
+
+
+def bulk_delete_browse_rows(
+    page: Page,
+    key_label: str,
+    key_name: str,
+    keys: list[str],
+    batch_size: int = 25,
+    operator: str = "in",
+    separator: str = ",",
+    timeout: float = None,
+    result: dict = None,
+) -> dict:
+    """
+    delete many records from the browse grid, searching for a batch of
+    keys, selecting the matching rows and deleting them with one toolbar
+    delete, then one final search for every key to find those still there.
+    A batch must fit on one grid page, batch_size is lowered to the grid
+    page size when a batch's rows run onto a next page. result's deleted
+    and not_deleted are updated as each batch is deleted, so they still
+    hold the batches done when a later one raises
+    """
+    result = result if result is not None else {}
+    result["deleted"] = []
+    result["not_deleted"] = list(keys)
+    selected = []
+    pending = list(keys)
+    while pending:
+        batch, pending = pending[:batch_size], pending[batch_size:]
+        advsearch_for_object(page, [dict(field=key_label, operator=operator, value=separator.join(batch))])
+        page_rows = len(read_browse_rows(page))
+        batch_selected = select_browse_rows(page, key_name, batch)
+        if page_rows < len(batch) and has_next_browse_page(page):
+            # rows on the next grid page can't be selected with these, they go in the next batches
+            batch_size = max(page_rows, 1)
+            pending = [key for key in batch if key not in batch_selected] + pending
+        if not batch_selected:
+            continue
+        selected.extend(batch_selected)
+        try:
+            delete_object(page, timeout)
+        except AuxOperationError:
+            # rows that could not be deleted are picked up by the final search
+            continue
+        result["deleted"].extend(batch_selected)
+        result["not_deleted"] = [key for key in result["not_deleted"] if key not in batch_selected]
+    # keys never found are already absent, a key that was never selected (eg a missed click) is still found
+    not_deleted = find_browse_keys(page, key_label, key_name, keys, operator, separator)
+    result["deleted"] = [key for key in selected if key not in not_deleted]
+    result["not_deleted"] = not_deleted
+    return result
+
+
+def string_field(page: Page, locator_string: str, text: str, widget: str = None) -> str:
+    """
+    Idempotently update given field in object edit page, widget is
+    "list" or "text" when known, otherwise the field is probed
+    """
     input_field = page.locator(locator_string)
     if input_field.input_value() == text:
         return "ok"
 
-    if input_field.is_hidden():
-        # find the parent, and click it
-        parent_input_field = input_field.locator("..")
-        parent_input_field.click()
-        select_list_field = parent_input_field.get_by_role("listbox")
-        if select_list_field != None:
-            field_select_list = select_list_field.locator(
-                    "li > span.k-list-item-text",
-                    has=page.get_by_text(text, exact=True)
-                    ).all()
-            for field_list_item in field_select_list:
-                if field_list_item.is_visible():
-                    field_list_item.click()
-            return "changed"
+    if widget == "list" or (widget is None and input_field.is_hidden()):
+        select_list_item(page, input_field, text)
+        return "changed"
     input_field.clear()
     input_field.fill(text)
     return "changed"
 
 
+def select_list_item(page: Page, input_field: Locator, text: str) -> None:
+    """set a kendo list field by picking text from the listbox of its parent"""
+    # find the parent, and click it
+    parent_input_field = input_field.locator("..")
+    parent_input_field.click()
+    select_list_field = parent_input_field.get_by_role("listbox")
+    field_select_list = select_list_field.locator(
+            "li > span.k-list-item-text",
+            has=page.get_by_text(text, exact=True)
+            ).all()
+    for field_list_item in field_select_list:
+        if field_list_item.is_visible():
+            field_list_item.click()
+
+
 def add_table_rows(page: Page, table_id_string: str, input_fields: list) -> str:
     """
        given a list of row input values (as a dict per row),
@@ -292,3 +738,455 @@ def remove_table_rows(page: Page, table_id_string: str) -> bool:
             popup_locator.click()
             changed = True
     return changed
+
+
+# seconds an orphaned playwright browser may keep running before a new session kills it
+STALE_BROWSER_AGE = int(os.environ.get("AUX_STALE_BROWSER_AGE", 600))
+# command line marker of the playwright driver, and the launch flag marking the browsers
+# an AuxSession starts with the pid of the python process that owns them
+DRIVER_MARKER = "run-driver"
+OWNER_FLAG = "--aux-session-owner="
+
+
+def read_processes() -> dict[int, dict]:
+    """
+    pid -> ppid, owner, start time (seconds since boot), rss bytes and
+    command line of every running process, empty where there is no /proc
+    """
+    processes = {}
+    if not os.path.isdir("/proc"):
+        return processes
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    ticks = os.sysconf("SC_CLK_TCK")
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat_fh:
+                stat = stat_fh.read()
+            with open(f"/proc/{entry}/cmdline", "rb") as cmdline_fh:
+                cmdline = cmdline_fh.read().replace(b"\0", b" ").decode(errors="replace")
+            uid = os.stat(f"/proc/{entry}").st_uid
+        except OSError:
+            # exited while we were looking
+            continue
+        # the command name may contain spaces, the fields after it don't
+        fields = stat[stat.rindex(")") + 2:].split()
+        if fields[0] == "Z":
+            continue
+        processes[int(entry)] = dict(
+            ppid=int(fields[1]),
+            uid=uid,
+            started=int(fields[19]) / ticks,
+            rss=int(fields[21]) * page_size,
+            cmdline=cmdline,
+        )
+    return processes
+
+
+def descendants(processes: dict[int, dict], pid: int) -> list[int]:
+    """pids of all children of pid, and their children"""
+    children = {}
+    for child, process in processes.items():
+        children.setdefault(process["ppid"], []).append(child)
+    found = []
+    pending = list(children.get(pid, []))
+    while pending:
+        child = pending.pop()
+        found.append(child)
+        pending.extend(children.get(child, []))
+    return found
+
+
+def kill_processes(pids: list[int]) -> None:
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def reap_stale_browsers(max_age: float = STALE_BROWSER_AGE) -> list[int]:
+    """
+    kill browsers (and their renderers) that earlier AuxSessions left
+    running, returns the killed pids. Only orphans are stale: browsers
+    launched by an AuxSession (see OWNER_FLAG) whose owning process has
+    gone, that no playwright driver is attached to (their parent is gone,
+    init or a subreaper) and older than max_age seconds. Browsers of other
+    playwright users are never touched
+    """
+    processes = read_processes()
+    if not processes:
+        return []
+    with open("/proc/uptime") as uptime_fh:
+        uptime = float(uptime_fh.read().split()[0])
+    reaped = []
+    for pid, process in processes.items():
+        if process["uid"] != os.getuid():
+            continue
+        owner = next((arg[len(OWNER_FLAG):] for arg in process["cmdline"].split() if arg.startswith(OWNER_FLAG)), None)
+        # only our own browsers, and renderers carry no owner so they go with their browser
+        if owner is None or not owner.isdigit():
+            continue
+        if int(owner) in processes:
+            continue
+        parent = processes.get(process["ppid"], dict(cmdline=""))
+        if DRIVER_MARKER in parent["cmdline"]:
+            continue
+        if uptime - process["started"] < max_age:
+            continue
+        stale = [pid] + descendants(processes, pid)
+        kill_processes(stale)
+        reaped.extend(stale)
+    return reaped
+
+
+# launch flags and context options per browser_profile, lean trades rendering
+# for memory so more forks fit on a runner (playwright already disables
+# extensions, background networking and component updates by default)
+BROWSER_PROFILES = dict(
+    default=dict(args=[], context={}),
+    lean=dict(
+        args=[
+            # one renderer process for every page, no per site isolation
+            "--renderer-process-limit=1",
+            "--disable-site-isolation-trials",
+            "--disable-features=site-per-process,Translate,BackForwardCache,MediaRouter,OptimizationHints",
+            "--disable-gpu",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--disable-dev-shm-usage",
+            # cap the V8 heap of the AUX page
+            "--js-flags=--max-old-space-size=256",
+        ],
+        context=dict(
+            viewport=dict(width=1024, height=768),
+            device_scale_factor=1,
+            reduced_motion="reduce",
+            service_workers="block",
+        ),
+    ),
+)
+
+
+class AuxSession:
+    """
+    owns the playwright driver, browser, context and page of one task and
+    always tears them down, whether the task succeeds, fails, calls
+    exit_json/fail_json or is sent SIGTERM. Stale browsers from earlier
+    tasks are reaped on entry and the peak RSS of this process and its
+    browser is sampled while the session is open:
+
+        with AuxSession(headless, state_file) as session:
+            session.page.goto(url)
+        result["browser"] = session.report()
+
+    profile is a BROWSER_PROFILES name. new_context is called with the
+    browser and the profile's context options to create the context (eg
+    for HAR capture), by default the state file is used when it exists.
+    Only one context is opened per session and reused for every page.
+
+    While a session is set as AuxSession.shared (eg by tools/aux_run.py,
+    which runs a whole playbook in one process), other sessions open their
+    context on its browser instead of launching their own, and only close
+    that context.
+    """
+
+    shared = None
+
+    def __init__(
+        self,
+        headless: bool = True,
+        state_file: str = None,
+        new_context=None,
+        reap_after: float = STALE_BROWSER_AGE,
+        sample_interval: float = 0.5,
+        profile: str = "default",
+    ) -> None:
+        self.headless = headless
+        self.state_file = state_file
+        self.profile = BROWSER_PROFILES[profile]
+        self.new_context = new_context
+        self.reap_after = reap_after
+        self.sample_interval = sample_interval
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.reaped = []
+        self.leaked = []
+        self.peak_rss = 0
+        self.sampler = None
+        self.stop_sampling = threading.Event()
+        self.previous_handlers = {}
+        self.other_children = set()
+        self.borrowed = False
+
+    def __enter__(self) -> "AuxSession":
+        self.borrowed = AuxSession.shared is not None
+        if not self.borrowed:
+            if self.reap_after:
+                self.reaped = reap_stale_browsers(self.reap_after)
+            # children we had before the browser started are not ours to clean up
+            self.other_children = set(descendants(read_processes(), os.getpid()))
+            self.handle_signals()
+        try:
+            if self.borrowed:
+                self.browser = AuxSession.shared.browser
+            else:
+                # the heavy import, only paid once a task really needs a browser
+                from playwright.sync_api import sync_playwright
+
+                self.playwright = sync_playwright().start()
+                self.browser = self.playwright.chromium.launch(
+                    headless=self.headless,
+                    args=self.profile["args"] + [f"{OWNER_FLAG}{os.getpid()}"],
+                )
+            context_args = dict(self.profile["context"])
+            if self.new_context is not None:
+                self.context = self.new_context(self.browser, context_args)
+            else:
+                if self.state_file and os.path.exists(self.state_file):
+                    context_args["storage_state"] = self.state_file
+                self.context = self.browser.new_context(**context_args)
+            self.page = self.context.new_page()
+        except BaseException:
+            self.close()
+            raise
+        self.sampler = threading.Thread(target=self.sample_rss, daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+    def handle_signals(self) -> None:
+        """turn SIGTERM/SIGHUP into SystemExit so the session is closed on the way out"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def on_signal(signum, frame):
+            raise SystemExit(128 + signum)
+
+        for signum in (signal.SIGTERM, signal.SIGHUP):
+            self.previous_handlers[signum] = signal.signal(signum, on_signal)
+
+    def sample_rss(self) -> None:
+        pid = os.getpid()
+        while True:
+            processes = read_processes()
+            rss = sum(processes[child]["rss"] for child in [pid] + descendants(processes, pid) if child in processes)
+            self.peak_rss = max(self.peak_rss, rss)
+            if self.stop_sampling.wait(self.sample_interval):
+                return
+
+    def close(self, grace: float = 2) -> None:
+        """close page, context, browser and driver, then kill anything of ours still running"""
+        from playwright.sync_api import Error as PlaywrightError
+
+        self.stop_sampling.set()
+        if self.sampler is not None:
+            self.sampler.join()
+        # a borrowed browser belongs to the shared session
+        for resource in (self.context, None if self.borrowed else self.browser):
+            if resource is not None:
+                try:
+                    resource.close()
+                except PlaywrightError:
+                    pass
+        if self.playwright is not None:
+            try:
+                self.playwright.stop()
+            except PlaywrightError:
+                pass
+        self.context = self.browser = self.playwright = self.page = None
+        if self.borrowed:
+            return
+
+        # give the driver a moment to exit, what is left has leaked
+        deadline = time.time() + grace
+        remaining = self.session_processes()
+        while remaining and time.time() < deadline:
+            time.sleep(0.1)
+            remaining = self.session_processes()
+        kill_processes(remaining)
+        self.leaked.extend(remaining)
+
+        for signum, handler in self.previous_handlers.items():
+            signal.signal(signum, handler)
+        self.previous_handlers = {}
+
+    def session_processes(self) -> list[int]:
+        return [pid for pid in descendants(read_processes(), os.getpid()) if pid not in self.other_children]
+
+    def report(self) -> dict:
+        """peak RSS of the task (python, driver and browser) and processes cleaned up"""
+        return dict(peak_rss_bytes=self.peak_rss, reaped=len(self.reaped), leaked=len(self.leaked))
+
+
+RETRY_ATTEMPTS = int(os.environ.get("AUX_RETRY_ATTEMPTS", 3))
+RETRY_BASE_DELAY = float(os.environ.get("AUX_RETRY_BASE_DELAY", 2))
+RETRY_MAX_DELAY = float(os.environ.get("AUX_RETRY_MAX_DELAY", 30))
+# consecutive transient failures on a server before its circuit opens, and seconds it stays open
+CIRCUIT_THRESHOLD = int(os.environ.get("AUX_CIRCUIT_THRESHOLD", 5))
+CIRCUIT_COOLDOWN = float(os.environ.get("AUX_CIRCUIT_COOLDOWN", 300))
+# AUX_CIRCUIT_DIR is read when a breaker is made, tools against the mock server set it after importing us
+DEFAULT_CIRCUIT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aux_circuit")
+# playwright errors of an element the AUX page replaced under us
+STALE_ELEMENT_MESSAGES = ("not attached to the DOM", "Element is detached", "Execution context was destroyed")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """a failure that may not happen again: timeouts, missing toasts and stale elements"""
+    from playwright.sync_api import Error as PlaywrightError
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    if isinstance(exc, (AuxTransientError, PlaywrightTimeoutError)):
+        return True
+    return isinstance(exc, PlaywrightError) and any(message in str(exc) for message in STALE_ELEMENT_MESSAGES)
+
+
+def error_summary(exc: BaseException) -> str:
+    """first line of an exception's message (playwright adds a call log), its type if it has none"""
+    return (str(exc).splitlines() or [type(exc).__name__])[0]
+
+
+def backoff_delay(attempt: int, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """exponential backoff with full jitter, so retrying forks don't hit the server together"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    counts consecutive transient failures on a qad server. Every task of a
+    run (each its own process) shares the count through a json file, so
+    once a struggling server has failed threshold times in a row the
+    remaining tasks fail at once with the reason instead of adding load.
+    After cooldown seconds one task is let through to try the server again,
+    its success closes the circuit and its failure opens it again
+    """
+
+    def __init__(
+        self,
+        qad_server: str,
+        threshold: int = CIRCUIT_THRESHOLD,
+        cooldown: float = CIRCUIT_COOLDOWN,
+        state_dir: str = None,
+    ):
+        self.qad_server = qad_server
+        self.threshold = threshold
+        self.cooldown = cooldown
+        state_dir = state_dir or os.environ.get("AUX_CIRCUIT_DIR", DEFAULT_CIRCUIT_DIR)
+        self.path = os.path.join(state_dir, f"{qad_server}.json")
+        # this process is the one let through to try an open circuit's server
+        self.trial = False
+
+    def update(self, change) -> dict:
+        """read, change and write the server's state under a lock, forks share it"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a+") as state_fh:
+            fcntl.flock(state_fh, fcntl.LOCK_EX)
+            state_fh.seek(0)
+            try:
+                state = json.loads(state_fh.read() or "{}")
+            except ValueError:
+                state = {}
+            state = dict(dict(failures=0, opened_at=None, trial_at=None, reason=""), **state)
+            change(state)
+            state_fh.seek(0)
+            state_fh.truncate()
+            json.dump(state, state_fh)
+        return state
+
+    def check(self) -> None:
+        """raise CircuitOpenError unless the server may be contacted"""
+        if self.trial:
+            return
+        now = time.time()
+        allowed = []
+
+        def claim_trial(state: dict) -> None:
+            if state["opened_at"] is None:
+                allowed.append(True)
+            elif now - state["opened_at"] >= self.cooldown and now - (state["trial_at"] or 0) >= self.cooldown:
+                state["trial_at"] = now
+                self.trial = True
+                allowed.append(True)
+
+        state = self.update(claim_trial)
+        if not allowed:
+            retry_in = max(self.cooldown - (now - state["opened_at"]), 0)
+            raise CircuitOpenError(
+                f"{self.qad_server} is not responding, {state['failures']} operations in a row failed "
+                f"(last: {state['reason']}), not trying again for {retry_in:.0f}s"
+            )
+
+    def success(self) -> None:
+        def close(state: dict) -> None:
+            state.update(failures=0, opened_at=None, trial_at=None, reason="")
+
+        self.update(close)
+        self.trial = False
+
+    def failure(self, reason: str) -> None:
+        def count(state: dict) -> None:
+            state["failures"] += 1
+            state["reason"] = reason
+            if self.trial or state["failures"] >= self.threshold:
+                state["opened_at"] = time.time()
+
+        self.update(count)
+        self.trial = False
+
+
+def retry_transient(
+    operation,
+    breaker: CircuitBreaker = None,
+    before_retry=None,
+    attempts: int = RETRY_ATTEMPTS,
+    base_delay: float = RETRY_BASE_DELAY,
+    max_delay: float = RETRY_MAX_DELAY,
+):
+    """
+    run operation(), retrying transient failures (see is_transient) after
+    an exponential backoff with jitter, other errors are raised at once.
+    Only idempotent operations may be retried as they are: an operation
+    that writes must check what the failed attempt already did first, eg
+    by searching and diffing the record again. before_retry is called
+    before each retry (eg to reload the page). Every attempt is checked
+    against and counted by the server's breaker
+    """
+    for attempt in range(attempts):
+        if breaker is not None:
+            breaker.check()
+        try:
+            if attempt and before_retry is not None:
+                before_retry()
+            value = operation()
+        except Exception as exc:
+            if not is_transient(exc):
+                raise
+            if breaker is not None:
+                breaker.failure(error_summary(exc))
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+            continue
+        if breaker is not None:
+            breaker.success()
+        return value
+
+
+def retry_read(operation, breaker: CircuitBreaker = None, before_retry=None, attempts: int = RETRY_ATTEMPTS):
+    """
+    retry_transient for an operation that only reads, so it is safe to run
+    again as it is. Raises AuxOperationError with the last error once
+    every attempt has failed
+    """
+    try:
+        return retry_transient(operation, breaker, before_retry, attempts)
+    except Exception as exc:
+        if not is_transient(exc):
+            raise
+        raise AuxOperationError(f"AUX did not respond in time after {attempts} attempts: {error_summary(exc)}") from exc
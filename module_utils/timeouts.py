@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from ansible.module_utils.shared_utils import login_required
+
+if TYPE_CHECKING:
+    # playwright is only imported once a browser is needed
+    from playwright.sync_api._generated import Page
+
+DEFAULT_TIMEOUT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aux_timeouts")
+# a timeout is this multiple of this percentile of the observed durations
+TIMEOUT_PERCENTILE = float(os.environ.get("AUX_TIMEOUT_PERCENTILE", 99))
+TIMEOUT_MULTIPLE = float(os.environ.get("AUX_TIMEOUT_MULTIPLE", 3))
+# observed durations before they are trusted, and how many are kept per operation
+MIN_SAMPLES = 10
+WINDOW = 200
+
+# operation: (ms used until there is history, floor, ceiling)
+OPERATION_LIMITS = dict(
+    search=(30000, 5000, 60000),
+    save=(160000, 20000, 300000),
+    delete=(30000, 10000, 120000),
+    login=(10000, 5000, 60000),
+    # how long we wait to be sent to the login screen, paid in full by every logged in task
+    login_check=(1000, 500, 5000),
+)
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """nearest rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+class TimeoutPolicy:
+    """
+    timeouts per operation (search, save, delete, login, login_check),
+    learned from the durations observed on a qad server. Once an operation
+    has MIN_SAMPLES durations its timeout is TIMEOUT_MULTIPLE times their
+    TIMEOUT_PERCENTILE, kept between the operation's floor and ceiling, so
+    a slow server gets time and a fast one fails fast:
+
+        timeouts = TimeoutPolicy(qad_server)
+        with timeouts.timed("save Customer") as timeout:
+            save_object(page, timeout)
+        timeouts.save()
+
+    Operations may be qualified after a space (eg by screen name) to be
+    learned separately. Durations are kept in one json file per server
+    (AUX_TIMEOUT_DIR, read when the policy is made so tools against the
+    mock server can set it after importing us), without a server nothing
+    is kept.
+    """
+
+    def __init__(
+        self,
+        qad_server: str = None,
+        cache_dir: str = None,
+        percent: float = TIMEOUT_PERCENTILE,
+        multiple: float = TIMEOUT_MULTIPLE,
+    ):
+        cache_dir = cache_dir or os.environ.get("AUX_TIMEOUT_DIR", DEFAULT_TIMEOUT_DIR)
+        self.path = os.path.join(cache_dir, f"{qad_server}.json") if qad_server else None
+        self.percent = percent
+        self.multiple = multiple
+        self.samples = self.load()
+        self.new_samples = {}
+
+    def load(self) -> dict[str, list[float]]:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as timeouts_fh:
+                return json.load(timeouts_fh)
+        except (OSError, ValueError):
+            return {}
+
+    def timeout(self, operation: str, default: float = None) -> float:
+        """ms to wait for operation, default (or the operation's) until there is history"""
+        limit_default, floor, ceiling = OPERATION_LIMITS[operation.split(" ")[0]]
+        samples = self.samples.get(operation, [])
+        if len(samples) < MIN_SAMPLES:
+            return default or limit_default
+        return round(min(max(percentile(samples, self.percent) * self.multiple, floor), ceiling))
+
+    def record(self, operation: str, duration_ms: float) -> None:
+        for samples in (self.samples, self.new_samples):
+            samples.setdefault(operation, []).append(round(duration_ms, 1))
+
+    @contextmanager
+    def timed(self, operation: str, default: float = None):
+        """yields the timeout, the duration is recorded if the block succeeds"""
+        start = time.perf_counter()
+        yield self.timeout(operation, default)
+        self.record(operation, (time.perf_counter() - start) * 1000)
+
+    def save(self) -> None:
+        """
+        merge this run's durations into the server's file, locked as
+        ansible forks save to it concurrently
+        """
+        if self.path is None or not self.new_samples:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a+") as timeouts_fh:
+            fcntl.flock(timeouts_fh, fcntl.LOCK_EX)
+            timeouts_fh.seek(0)
+            try:
+                merged = json.loads(timeouts_fh.read() or "{}")
+            except ValueError:
+                merged = {}
+            for operation, samples in self.new_samples.items():
+                merged[operation] = (merged.get(operation, []) + samples)[-WINDOW:]
+            timeouts_fh.seek(0)
+            timeouts_fh.truncate()
+            json.dump(merged, timeouts_fh)
+        self.new_samples = {}
+
+
+def timed_login_required(page: Page, timeouts: TimeoutPolicy) -> bool:
+    """login_required, learning how long the server takes to send us to the login screen"""
+    start = time.perf_counter()
+    required = login_required(page, timeouts.timeout("login_check"))
+    # not being sent there says nothing about how long it takes
+    if required:
+        timeouts.record("login_check", (time.perf_counter() - start) * 1000)
+    return required
@@ -0,0 +1,272 @@
+#!/bin/python3
+
+# Load generation for QAD AUX: drives the same search/open/fill/save flows as
+# the maintenance screen modules (from their SCREEN_SPEC) with concurrent
+# virtual users, and reports throughput and latency percentiles per operation.
+#
+# usage: tools/aux_load.py examples/load_test.yml.ex [--output results.json]
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+import ansible.module_utils
+import yaml
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the screen engine imports its siblings as ansible.module_utils.*, as in a module run
+ansible.module_utils.__path__.append(os.path.join(REPO_ROOT, "module_utils"))
+
+from ansible.module_utils.perf_utils import LatencyHistogram  # noqa: E402
+from ansible.module_utils.screen_engine import (ScreenSpec,  # noqa: E402
+                                                fill_record,
+                                                find_record,
+                                                spec_from_module)
+from ansible.module_utils.shared_utils import (AuxSession,  # noqa: E402
+                                               delete_object,
+                                               open_object,
+                                               save_object)
+
+# seconds between checks that every virtual user still running is alive
+RESULT_POLL_SECONDS = 10
+# a user still running this long after the deadline is stuck in an iteration and is stopped
+STOP_GRACE_SECONDS = 300
+
+
+def load_screen(module: str) -> ScreenSpec:
+    """screen spec of a library/ maintenance module, as the module itself runs it"""
+    return spec_from_module(os.path.join(REPO_ROOT, "library", f"{module}.py"))
+
+
+@contextmanager
+def timed(timings: dict, errors: dict, operation: str):
+    """record the duration of an operation, failed operations are counted as errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors[operation] = errors.get(operation, 0) + 1
+        raise
+    if operation not in timings:
+        timings[operation] = LatencyHistogram()
+    timings[operation].record((time.perf_counter() - start) * 1000)
+
+
+def render_fields(value, user: int, iteration: int):
+    """substitute {user} and {iteration} in scenario values, so each virtual user works on its own records"""
+    if isinstance(value, dict):
+        return {key: render_fields(val, user, iteration) for key, val in value.items()}
+    if isinstance(value, list):
+        return [render_fields(item, user, iteration) for item in value]
+    if isinstance(value, str):
+        return value.format(user=user, iteration=iteration)
+    return value
+
+
+def run_scenario(
+    page,
+    config: dict,
+    scenario: dict,
+    screen: ScreenSpec,
+    user: int,
+    iteration: int,
+    timings: dict,
+    errors: dict,
+) -> None:
+    """one pass of a module flow: search, open, fill, save and optionally delete"""
+    input_fields = render_fields(scenario["input_fields"], user, iteration)
+
+    with timed(timings, errors, "navigate"):
+        page.goto(screen.item_url(config["qad_server"]))
+        page.locator("[id=tbQuickSearch_BrowseDataGrid]").wait_for()
+    with timed(timings, errors, "search"):
+        item_locator = find_record(page, screen, input_fields)
+    with timed(timings, errors, "open"):
+        open_object(page, item_locator)
+
+    args = screen.camel_case(input_fields)
+    with timed(timings, errors, "fill"):
+        changed = fill_record(page, screen, args)
+    if changed:
+        with timed(timings, errors, "save"):
+            save_object(page, view_meta_uri=screen.view_meta_uri)
+
+    if scenario.get("delete", False):
+        page.locator("#btnViewFormPane").click()
+        with timed(timings, errors, "search"):
+            item_locator = find_record(page, screen, input_fields)
+        item_locator.click(click_count=2)
+        with timed(timings, errors, "delete"):
+            delete_object(page, screen.delete_timeout)
+
+
+def run_virtual_user(user: int, config: dict, start_delay: float, deadline: float, results: multiprocessing.Queue) -> None:
+    """
+    a virtual user runs in its own process with its own browser and context,
+    so no page or session state is shared between users
+    """
+    time.sleep(start_delay)
+    rng = random.Random(user)
+    timings = {}
+    errors = {}
+    iterations = 0
+    scenarios = config["scenarios"]
+    weights = [scenario.get("weight", 1) for scenario in scenarios]
+    session = None
+    try:
+        # module sources are parsed once per user, not in the measured iterations
+        screens = {scenario["module"]: load_screen(scenario["module"]) for scenario in scenarios}
+        session = AuxSession(config.get("headless", True), config["state_file"], profile=config.get("browser_profile", "default"))
+        with session:
+            while time.time() < deadline:
+                scenario = rng.choices(scenarios, weights)[0]
+                try:
+                    run_scenario(session.page, config, scenario, screens[scenario["module"]], user, iterations, timings, errors)
+                except Exception as exc:
+                    sys.stderr.write(f"user {user} iteration {iterations}: {exc}\n")
+                iterations += 1
+                think_min, think_max = config.get("think_time", [0, 0])
+                time.sleep(rng.uniform(think_min, think_max))
+    finally:
+        # always report back, the parent waits for one result per user
+        results.put(dict(
+            user=user,
+            iterations=iterations,
+            errors=errors,
+            timings={operation: histogram.to_dict() for operation, histogram in timings.items()},
+            peak_rss_bytes=session.peak_rss if session is not None else 0,
+        ))
+
+
+def collect_results(workers: list, results: multiprocessing.Queue, stop_at: float) -> list[dict]:
+    """
+    one result per virtual user, in user order. A user that exits without
+    reporting, or is still running at stop_at, gets an empty result with
+    its exit code instead of the run waiting on it for ever
+    """
+    user_results = {}
+    exited = set()
+    while len(user_results) < len(workers):
+        try:
+            user_result = results.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            if time.time() > stop_at:
+                for user, worker in enumerate(workers):
+                    if user not in user_results:
+                        worker.terminate()
+            # a result is in the queue before its process ends, so one that had
+            # already ended at the last poll and sent nothing since never will
+            stopped = {user for user, worker in enumerate(workers) if user not in user_results and not worker.is_alive()}
+            for user in stopped & exited:
+                user_results[user] = dict(user=user, iterations=0, errors={}, timings={}, peak_rss_bytes=0, exitcode=workers[user].exitcode)
+                sys.stderr.write(f"user {user} exited with code {workers[user].exitcode} without reporting\n")
+            exited = stopped - set(user_results)
+            continue
+        user_results[user_result["user"]] = user_result
+    return [user_results[user] for user in range(len(workers))]
+
+
+def run_load_test(config: dict) -> dict:
+    users = config.get("users", 1)
+    ramp_up = config.get("ramp_up", 0)
+    duration = config.get("duration", 60)
+
+    # spawn, so each virtual user gets a clean interpreter for playwright
+    mp_context = multiprocessing.get_context("spawn")
+    results = mp_context.Queue()
+    start = time.time()
+    deadline = start + ramp_up + duration
+    workers = []
+    for user in range(users):
+        start_delay = ramp_up * user / users
+        worker = mp_context.Process(target=run_virtual_user, args=(user, config, start_delay, deadline, results))
+        worker.start()
+        workers.append(worker)
+
+    user_results = collect_results(workers, results, deadline + STOP_GRACE_SECONDS)
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start
+    # users that never reported, killed (eg out of memory) or stopped, with their exit codes
+    lost_users = {user: user_result["exitcode"] for user, user_result in enumerate(user_results) if "exitcode" in user_result}
+
+    operations = {}
+    errors = {}
+    for user_result in user_results:
+        for operation, histogram in user_result["timings"].items():
+            if operation not in operations:
+                operations[operation] = LatencyHistogram()
+            operations[operation].merge(LatencyHistogram.from_dict(histogram))
+        for operation, count in user_result["errors"].items():
+            errors[operation] = errors.get(operation, 0) + count
+
+    report = dict(
+        users=users,
+        elapsed_s=round(elapsed, 1),
+        iterations=sum(user_result["iterations"] for user_result in user_results),
+        # browser memory per virtual user, to size load generator hosts
+        peak_rss_bytes=max(user_result["peak_rss_bytes"] for user_result in user_results),
+        operations={},
+    )
+    if lost_users:
+        report["lost_users"] = lost_users
+    for operation in sorted(set(operations) | set(errors)):
+        summary = operations.get(operation, LatencyHistogram()).summary()
+        summary["errors"] = errors.get(operation, 0)
+        summary["throughput_per_s"] = round(summary["count"] / elapsed, 3)
+        report["operations"][operation] = summary
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['users']} users, {report['iterations']} iterations in {report['elapsed_s']}s")
+    print(f"peak RSS per user (python, driver and browser) {report['peak_rss_bytes'] / 2 ** 20:.0f} MiB")
+    if report.get("lost_users"):
+        print(f"{len(report['lost_users'])} users never reported: " + ", ".join(
+            f"user {user} (exit code {exitcode})" for user, exitcode in report["lost_users"].items()
+        ))
+    print(f"{'operation':<10} {'count':>7} {'errors':>7} {'ops/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for operation, summary in report["operations"].items():
+        print(
+            f"{operation:<10} {summary['count']:>7} {summary['errors']:>7} {summary['throughput_per_s']:>8} "
+            f"{summary['p50_ms']:>9} {summary['p90_ms']:>9} {summary['p99_ms']:>9} {summary['max_ms']:>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run concurrent virtual users against a QAD AUX instance")
+    parser.add_argument("config", help="load test definition (yaml)")
+    parser.add_argument("--users", type=int, help="override number of virtual users")
+    parser.add_argument("--duration", type=float, help="override steady state duration (seconds)")
+    parser.add_argument("--output", help="write the report as json to this file")
+    cli_args = parser.parse_args()
+
+    with open(cli_args.config) as config_fh:
+        config = yaml.safe_load(config_fh)
+    if cli_args.users:
+        config["users"] = cli_args.users
+    if cli_args.duration:
+        config["duration"] = cli_args.duration
+    for scenario in config["scenarios"]:
+        try:
+            load_screen(scenario["module"])
+        except (OSError, ValueError):
+            sys.exit(f"Unsupported scenario module {scenario['module']}, it needs a SCREEN_SPEC in library/")
+    if not os.path.exists(config["state_file"]):
+        sys.exit("Authentication state file does not exist!")
+
+    report = run_load_test(config)
+    print_report(report)
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_fh:
+            json.dump(report, output_fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
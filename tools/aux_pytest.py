@@ -0,0 +1,238 @@
+# pytest plugin for writing AUX tests as python assertions instead of
+# playbook tasks. Each pytest process (each pytest-xdist worker) opens one
+# browser and one authenticated context for the whole session, from aux_auth's
+# storage state, and every test gets a fresh page on it. Records created
+# through the aux_records factory are deleted again when the test finishes,
+# and aux_keys hands out record keys in a namespace of the worker, so
+# workers never touch each other's records:
+#
+#     def test_customer_sort_name(aux_records, aux_screen):
+#         customer = aux_records("aux_customers", dict(main=dict(sort_name="pytest")))
+#         screen = aux_screen("aux_customers")
+#         assert screen.open(customer["input_fields"])
+#         assert screen.incorrect(customer["input_fields"]) == []
+#
+# Without --aux-server the mock qad-central server is started once, before
+# any worker, and each worker logs in to it.
+#
+# usage: PYTHONPATH=tools pytest -p aux_pytest [-n 4] [--aux-server qadhost --aux-state-file state.json] tests/
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import ansible.module_utils
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the screen engine imports its siblings as ansible.module_utils.*, as in a module run
+ansible.module_utils.__path__.append(os.path.join(REPO_ROOT, "module_utils"))
+
+from ansible.module_utils.screen_engine import (ScreenSpec,  # noqa: E402
+                                                absent_record,
+                                                expected_snapshot,
+                                                find_record,
+                                                present_record,
+                                                spec_from_module)
+from ansible.module_utils.screen_meta import load_screen_meta  # noqa: E402
+from ansible.module_utils.shared_utils import (BROWSER_PROFILES,  # noqa: E402
+                                               AuxOperationError,
+                                               AuxSession,
+                                               change_input_fields,
+                                               check_input_fields,
+                                               login_required,
+                                               open_object,
+                                               quicksearch_for_object,
+                                               save_object)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("aux", "QAD AUX")
+    group.addoption("--aux-server", help="QAD server to test against, the mock server is started if not given")
+    group.addoption("--aux-state-file", default="state.json", help="authentication state file written by aux_auth")
+    group.addoption("--aux-headed", action="store_true", help="show the browsers")
+    group.addoption("--aux-browser-profile", default="default", choices=list(BROWSER_PROFILES))
+    group.addoption("--aux-key-prefix", default="PT", help="start of every record key handed out by aux_keys")
+
+
+def pytest_configure(config):
+    config.aux_mock_server = None
+    config.aux_mock_dir = None
+    if config.getoption("aux_server"):
+        if not os.path.exists(config.getoption("aux_state_file")):
+            raise pytest.UsageError("Authentication state file does not exist! Log in with aux_auth first (examples/auth.yml.ex)")
+        return
+    # xdist workers share the controller's mock server, modules always connect on port 22010
+    if not hasattr(config, "workerinput"):
+        sys.path.insert(0, os.path.join(REPO_ROOT, "tools", "mock_aux"))
+        from server import make_server
+        config.aux_mock_server = make_server()
+        threading.Thread(target=config.aux_mock_server.serve_forever, daemon=True).start()
+        # what is learned about the mock server must not shape real runs against localhost,
+        # workers inherit the environment
+        config.aux_mock_dir = tempfile.mkdtemp(prefix="aux_pytest_")
+        os.environ["AUX_TIMEOUT_DIR"] = os.path.join(config.aux_mock_dir, "timeouts")
+        os.environ["AUX_CIRCUIT_DIR"] = os.path.join(config.aux_mock_dir, "circuit")
+        os.environ["AUX_SCREEN_META_CACHE_DIR"] = os.path.join(config.aux_mock_dir, "screen_meta")
+        os.environ["AUX_REFERENCE_CACHE_DIR"] = os.path.join(config.aux_mock_dir, "reference_data")
+
+
+def pytest_unconfigure(config):
+    if getattr(config, "aux_mock_server", None) is not None:
+        config.aux_mock_server.shutdown()
+        config.aux_mock_server.server_close()
+    if getattr(config, "aux_mock_dir", None) is not None:
+        shutil.rmtree(config.aux_mock_dir, ignore_errors=True)
+
+
+def worker_index() -> int:
+    """0 without xdist, n for xdist worker gwn"""
+    return int(os.environ.get("PYTEST_XDIST_WORKER", "gw0")[2:])
+
+
+class KeyNamespace:
+    """
+    record keys of one worker, <prefix><worker><counter> eg PT030012, so
+    parallel workers never create, change or delete the same record
+    """
+
+    def __init__(self, prefix: str, worker: int):
+        self.prefix = f"{prefix}{worker:02d}"
+        self.counter = 0
+
+    def new(self) -> str:
+        self.counter += 1
+        return f"{self.prefix}{self.counter:04d}"
+
+    def owns(self, key: str) -> bool:
+        return key.startswith(self.prefix)
+
+
+class AuxScreen:
+    """a maintenance screen on a test's page, wrapping the helpers the modules use"""
+
+    def __init__(self, page, screen: ScreenSpec, qad_server: str):
+        self.page = page
+        self.screen = screen
+        self.qad_server = qad_server
+
+    def goto(self) -> "AuxScreen":
+        self.page.goto(self.screen.item_url(self.qad_server))
+        self.page.locator("[id=tbQuickSearch_BrowseDataGrid]").wait_for()
+        return self
+
+    def search(self, record):
+        """
+        quicksearch for a key, or search for the record in input_fields
+        (advanced search for screens without a quicksearch key), returns
+        the first result row
+        """
+        if isinstance(record, str):
+            return quicksearch_for_object(self.page, record)
+        return find_record(self.page, self.screen, record)
+
+    def open(self, record) -> bool:
+        """open the record, or a new one if it isn't found, True if it existed"""
+        return open_object(self.page, self.search(record))
+
+    def change(self, input_fields: dict) -> bool:
+        """change fields of the open record (not tables), True if any changed"""
+        args = self.screen.camel_case(input_fields)
+        # field widget types, read from the form once per screen and again for fields not seen yet
+        screen_meta = load_screen_meta(self.page, list(expected_snapshot(self.screen, args)["fields"]))
+        return change_input_fields(self.page, args, screen_meta=screen_meta)
+
+    def incorrect(self, input_fields: dict) -> list[str]:
+        """html names of the fields (not tables) of the open record that differ from input_fields"""
+        return sorted(check_input_fields(self.page, self.screen.camel_case(input_fields), []))
+
+    def save(self) -> dict:
+        """save the open record, returns the saved record"""
+        return save_object(self.page, view_meta_uri=self.screen.view_meta_uri)
+
+
+@pytest.fixture(scope="session")
+def aux_server(pytestconfig) -> str:
+    return pytestconfig.getoption("aux_server") or "localhost"
+
+
+@pytest.fixture(scope="session")
+def aux_keys(pytestconfig) -> KeyNamespace:
+    return KeyNamespace(pytestconfig.getoption("aux_key_prefix"), worker_index())
+
+
+@pytest.fixture(scope="session")
+def aux_session(pytestconfig, aux_server):
+    """the worker's browser and authenticated context, open for the whole session"""
+    mock = not pytestconfig.getoption("aux_server")
+    with AuxSession(
+        not pytestconfig.getoption("aux_headed"),
+        None if mock else pytestconfig.getoption("aux_state_file"),
+        profile=pytestconfig.getoption("aux_browser_profile"),
+    ) as session:
+        page = session.page
+        page.goto(f"http://{aux_server}:22010/qad-central/")
+        if login_required(page):
+            if not mock:
+                pytest.exit("No current logged in user, log in with aux_auth again", returncode=1)
+            # the mock server accepts any user
+            page.locator("[name=username]").fill(f"pytest{worker_index()}")
+            page.locator("[name=password]").fill("pytest")
+            page.locator("[id=logInBtn]").click()
+            page.wait_for_url("**/qad-central/#/view/webshell/home")
+        yield session
+
+
+@pytest.fixture
+def aux_page(aux_session):
+    """a page of its own for each test, on the worker's context"""
+    page = aux_session.context.new_page()
+    yield page
+    page.close()
+
+
+@pytest.fixture
+def aux_screen(aux_page, aux_server):
+    """aux_screen("aux_customers") opens that module's screen on the test's page"""
+
+    def open_screen(module: str) -> AuxScreen:
+        screen = spec_from_module(os.path.join(REPO_ROOT, "library", f"{module}.py"))
+        return AuxScreen(aux_page, screen, aux_server).goto()
+
+    return open_screen
+
+
+@pytest.fixture
+def aux_records(aux_page, aux_server, aux_keys):
+    """
+    aux_records(module, input_fields) creates (or updates) a record as the
+    module would with state present, a missing quicksearch key is taken from
+    aux_keys. Returns the present_record result with the input_fields used,
+    every record is deleted again after the test, newest first
+    """
+    created = []
+
+    def create(module: str, input_fields: dict) -> dict:
+        screen = spec_from_module(os.path.join(REPO_ROOT, "library", f"{module}.py"))
+        input_fields = dict(input_fields, main=dict(input_fields.get("main", {})))
+        if screen.quicksearch_key and not input_fields["main"].get(screen.quicksearch_key):
+            input_fields["main"][screen.quicksearch_key] = aux_keys.new()
+        result = dict(changed=False, message="", input_fields=input_fields)
+        AuxScreen(aux_page, screen, aux_server).goto()
+        created.append((screen, input_fields))
+        present_record(aux_page, screen, input_fields, result)
+        return result
+
+    yield create
+
+    errors = []
+    for screen, input_fields in reversed(created):
+        try:
+            AuxScreen(aux_page, screen, aux_server).goto()
+            absent_record(aux_page, screen, input_fields, {})
+        except AuxOperationError as exc:
+            errors.append(f"{screen.record_label(input_fields)}: {exc}")
+    if errors:
+        raise AuxOperationError(f"records not cleaned up: {errors}")
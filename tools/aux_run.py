@@ -0,0 +1,369 @@
+#!/bin/python3
+
+# Run test playbooks without ansible-playbook: every task of every play runs in
+# this one interpreter, and every aux_* task opens its context on one shared
+# browser, so a suite costs one python start up and one browser launch.
+#
+# Understands the subset of the playbook format used in examples/*.yml.ex:
+#   import_playbook, vars, vars_files, pre_tasks/tasks/post_tasks
+#   tasks: library/aux_* modules, include_vars, set_fact, assert, debug
+#   task keywords: name, register, when, no_log, ignore_errors
+#   templating: jinja2 "{{ expression }}" and when:/that: expressions, with
+#   jinja2's own filters and tests (a whole string template keeps its type)
+# hosts are ignored, every play runs once in this process.
+#
+#
+# Every aux_* task is fingerprinted (its module's source and the module_utils
+# it imports, its templated args and check mode, which include the target
+# server) and its fingerprint and result are kept in .aux_impact.json. With
+# --changed-only, a task whose fingerprint and passing result match the last
+# run is not run again, its last result is registered instead. Once a task in
+# a play does run, every later aux_* task of the play runs too, as it works on
+# the records the earlier tasks changed.
+#
+# usage: tools/aux_run.py examples/test_manager.yml.ex [-e key=value] [--check] [--headed] [--changed-only] [--output results.json]
+
+import argparse
+import functools
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager, redirect_stdout
+
+import ansible.module_utils
+import yaml
+from ansible.module_utils import basic
+from jinja2 import Environment, StrictUndefined
+from jinja2.nativetypes import NativeEnvironment
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the modules import their helpers as ansible.module_utils.*, as in a module run
+ansible.module_utils.__path__.append(os.path.join(REPO_ROOT, "module_utils"))
+
+from ansible.module_utils.shared_utils import (BROWSER_PROFILES,  # noqa: E402
+                                               AuxSession)
+
+try:
+    # ansible-core 2.19+
+    from ansible.module_utils.testing import patch_module_args
+except ImportError:
+    @contextmanager
+    def patch_module_args(args: dict):
+        basic._ANSIBLE_ARGS = json.dumps(dict(ANSIBLE_MODULE_ARGS=args)).encode()
+        try:
+            yield
+        finally:
+            basic._ANSIBLE_ARGS = None
+
+TEMPLATE_PATTERN = re.compile(r"{{\s*(.*?)\s*}}")
+# jinja2 as ansible uses it: an undefined variable is an error, not an empty string,
+# expressions keep their python type, text with templates in it renders to a string
+JINJA = NativeEnvironment(undefined=StrictUndefined)
+TEXT_JINJA = Environment(undefined=StrictUndefined)
+PLAY_TASK_LISTS = ("pre_tasks", "tasks", "post_tasks")
+TASK_KEYWORDS = ("name", "register", "when", "no_log", "ignore_errors")
+STATUSES = ("ok", "changed", "unchanged", "failed", "ignored", "skipped")
+MODULE_UTILS_IMPORT = re.compile(r"ansible\.module_utils\.(\w+)")
+
+
+class TaskFailed(Exception):
+    """a task failed and the play stops, as it would for the host in ansible"""
+
+
+def evaluate(expression: str, variables: dict):
+    """a when: condition or {{ }} expression, any error in it fails the task and not the run"""
+    try:
+        return JINJA.compile_expression(expression, undefined_to_none=False)(**variables)
+    except Exception as exc:
+        raise TaskFailed(f"error evaluating '{expression}': {type(exc).__name__}: {exc}") from exc
+
+
+def template(value, variables: dict):
+    """render {{ }} expressions in strings, lists and dicts"""
+    if isinstance(value, dict):
+        return {key: template(val, variables) for key, val in value.items()}
+    if isinstance(value, list):
+        return [template(item, variables) for item in value]
+    if not isinstance(value, str) or "{{" not in value:
+        return value
+    whole = TEMPLATE_PATTERN.fullmatch(value.strip())
+    if whole and "{{" not in whole.group(1):
+        return template(evaluate(whole.group(1), variables), variables)
+    try:
+        rendered = TEXT_JINJA.from_string(value).render(variables)
+    except Exception as exc:
+        raise TaskFailed(f"error templating '{value}': {type(exc).__name__}: {exc}") from exc
+    return template(rendered, variables)
+
+
+def load_yaml(path: str):
+    with open(path) as yaml_fh:
+        return yaml.safe_load(yaml_fh)
+
+
+def expand_playbook(path: str) -> list:
+    """(play, playbook path) for every play, with import_playbook followed"""
+    plays = []
+    for play in load_yaml(path) or []:
+        if "import_playbook" in play:
+            plays.extend(expand_playbook(os.path.join(os.path.dirname(path), play["import_playbook"])))
+        else:
+            plays.append((play, os.path.abspath(path)))
+    return plays
+
+
+def load_module(name: str):
+    """a library/ module, imported once and run in process for every task that uses it"""
+    path = os.path.join(REPO_ROOT, "library", f"{name}.py")
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[name] = module
+    return sys.modules[name]
+
+
+@functools.lru_cache(maxsize=None)
+def source_files(path: str) -> frozenset:
+    """a module and every repo module_utils file it imports, directly or not"""
+    with open(path) as source_fh:
+        source = source_fh.read()
+    files = {path}
+    for name in set(MODULE_UTILS_IMPORT.findall(source)):
+        util_path = os.path.join(REPO_ROOT, "module_utils", f"{name}.py")
+        if os.path.exists(util_path) and util_path != path:
+            files |= source_files(util_path)
+    return frozenset(files)
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash(name: str) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(source_files(os.path.join(REPO_ROOT, "library", f"{name}.py"))):
+        with open(path, "rb") as source_fh:
+            digest.update(source_fh.read())
+    return digest.hexdigest()
+
+
+class TestImpact:
+    """fingerprints and last results of aux_* tasks, kept between runs in a local json file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tasks = {}
+        if os.path.exists(path):
+            with open(path) as impact_fh:
+                self.tasks = json.load(impact_fh)
+
+    def fingerprint(self, name: str, args: dict, check_mode: bool) -> str:
+        task = json.dumps(dict(args=args, check_mode=check_mode, qad_server=args.get("qad_server")), sort_keys=True, default=str)
+        return hashlib.sha256(f"{source_hash(name)}{task}".encode()).hexdigest()
+
+    def unchanged(self, task_id: str, fingerprint: str) -> dict:
+        """the last result of the task if it passed with this fingerprint, else None"""
+        last = self.tasks.get(task_id)
+        if last and last["fingerprint"] == fingerprint and last["status"] in ("ok", "changed", "unchanged"):
+            return last["result"]
+        return None
+
+    def record(self, task_id: str, fingerprint: str, status: str, result: dict) -> None:
+        self.tasks[task_id] = dict(fingerprint=fingerprint, status=status, result=result)
+
+    def save(self) -> None:
+        # written whole and renamed, an interrupted run keeps the last file
+        with open(f"{self.path}.tmp", "w") as impact_fh:
+            json.dump(self.tasks, impact_fh, indent=2, default=str)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def run_module(name: str, args: dict, check_mode: bool, no_log: bool) -> dict:
+    """run an aux_* module's main() in process, returns its exit_json/fail_json result"""
+    module = load_module(name)
+    module_args = dict(args, _ansible_check_mode=check_mode, _ansible_no_log=no_log)
+    stdout = io.StringIO()
+    with patch_module_args(module_args), redirect_stdout(stdout):
+        try:
+            module.main()
+        except SystemExit:
+            pass
+        except Exception as exc:
+            # as ansible reports a module that raised instead of calling fail_json
+            return dict(changed=False, failed=True, msg=f"MODULE FAILURE: {exc!r}")
+    try:
+        result = json.loads(stdout.getvalue())
+    except ValueError:
+        result = dict(failed=True, msg=f"{name} did not return a result: {stdout.getvalue()}")
+    result.pop("invocation", None)
+    result.setdefault("changed", False)
+    result.setdefault("failed", False)
+    return result
+
+
+def task_action(task: dict) -> str:
+    action = [key for key in task if key not in TASK_KEYWORDS]
+    if len(action) != 1:
+        raise TaskFailed(f"task '{task.get('name')}' needs exactly one module, found {action}")
+    return action[0]
+
+
+def run_task(task: dict, variables: dict, playbook_dir: str, check_mode: bool) -> dict:
+    action = task_action(task)
+    args = task[action]
+
+    if action.startswith("aux_"):
+        return run_module(action, template(args, variables), check_mode, task.get("no_log", False))
+    if action == "include_vars":
+        path = args if isinstance(args, str) else args["file"]
+        variables.update(load_yaml(os.path.join(playbook_dir, template(path, variables))) or {})
+        return dict(changed=False, failed=False)
+    if action == "set_fact":
+        variables.update(template(args, variables))
+        return dict(changed=False, failed=False)
+    if action == "assert":
+        that = args["that"] if isinstance(args["that"], list) else [args["that"]]
+        failed = [condition for condition in that if not evaluate(str(condition), variables)]
+        if failed:
+            return dict(changed=False, failed=True, msg=args.get("fail_msg", f"Assertion failed: {failed[0]}"))
+        return dict(changed=False, failed=False, msg="All assertions passed")
+    if action == "debug":
+        if "var" in args:
+            return dict(changed=False, failed=False, msg=evaluate(args["var"], variables))
+        return dict(changed=False, failed=False, msg=template(args.get("msg", "Hello world!"), variables))
+    raise TaskFailed(f"module '{action}' is not supported by aux_run, run this playbook with ansible-playbook")
+
+
+def conditions_met(task: dict, variables: dict) -> bool:
+    conditions = task.get("when", [])
+    if not isinstance(conditions, list):
+        conditions = [conditions]
+    return all(evaluate(str(condition), variables) for condition in conditions)
+
+
+def run_play(
+    play: dict,
+    play_id: str,
+    playbook: str,
+    extra_vars: dict,
+    check_mode: bool,
+    results: list,
+    impact: TestImpact,
+    changed_only: bool = False,
+) -> bool:
+    """run the tasks of one play, returns False once a task fails"""
+    playbook_dir = os.path.dirname(playbook)
+    variables = dict(play.get("vars") or {})
+    try:
+        for vars_file in play.get("vars_files") or []:
+            variables.update(load_yaml(os.path.join(playbook_dir, template(vars_file, variables))) or {})
+    except (TaskFailed, OSError) as exc:
+        results.append(dict(playbook=os.path.relpath(playbook, REPO_ROOT), name="vars_files", status="failed", seconds=0, result=dict(failed=True, msg=str(exc))))
+        print(f"{'failed':<9} {0:>7.2f}s  vars_files\n          {exc}")
+        return False
+    variables.update(extra_vars)
+    # once an aux_* task runs, the records later tasks work on may have changed
+    rerun = not changed_only
+
+    tasks = [task for task_list in PLAY_TASK_LISTS for task in play.get(task_list) or []]
+    for task_number, task in enumerate(tasks, start=1):
+        name = task.get("name") or next(key for key in task if key not in TASK_KEYWORDS)
+        task_id = f"{play_id}:{task_number}"
+        fingerprint = None
+        start = time.perf_counter()
+        try:
+            if not conditions_met(task, variables):
+                result = dict(changed=False, failed=False, skipped=True)
+            else:
+                action = task_action(task)
+                if action.startswith("aux_"):
+                    fingerprint = impact.fingerprint(action, template(task[action], variables), check_mode)
+                last_result = None if rerun or fingerprint is None else impact.unchanged(task_id, fingerprint)
+                if last_result is not None:
+                    result = dict(last_result, unchanged=True)
+                else:
+                    rerun = rerun or fingerprint is not None
+                    result = run_task(task, variables, playbook_dir, check_mode)
+        except (TaskFailed, OSError, KeyError) as exc:
+            result = dict(changed=False, failed=True, msg=str(exc))
+        seconds = time.perf_counter() - start
+        if "register" in task:
+            variables[task["register"]] = result
+
+        if result.get("skipped"):
+            status = "skipped"
+        elif result.get("unchanged"):
+            status = "unchanged"
+        elif result["failed"]:
+            status = "ignored" if task.get("ignore_errors") else "failed"
+        else:
+            status = "changed" if result["changed"] else "ok"
+        if fingerprint is not None:
+            impact.record(task_id, fingerprint, status, result)
+        if task.get("no_log"):
+            result_output = "the output has been hidden due to the fact that 'no_log: true' was specified for this result"
+        else:
+            result_output = result
+        # keyed by the path in the repo, so timings from any runner line up (see tools/aux_shard.py)
+        results.append(dict(playbook=os.path.relpath(playbook, REPO_ROOT), name=name, status=status, seconds=round(seconds, 3), result=result_output))
+        print(f"{status:<9} {seconds:>7.2f}s  {name}")
+        if result["failed"]:
+            print(f"          {result_output['msg'] if isinstance(result_output, dict) else result_output}")
+        if status == "failed":
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run aux_* test playbooks in one process with one browser")
+    parser.add_argument("playbooks", nargs="+", help="playbook files (examples/*.yml.ex format)")
+    parser.add_argument("-e", "--extra-vars", action="append", default=[], metavar="KEY=VALUE", help="set a variable, overrides play vars")
+    parser.add_argument("--check", action="store_true", help="run aux_* tasks in check mode")
+    parser.add_argument("--headed", action="store_true", help="show the browser, tasks' headless option is ignored")
+    parser.add_argument("--browser-profile", default="default", choices=list(BROWSER_PROFILES))
+    parser.add_argument("--changed-only", action="store_true", help="only run aux_* tasks that changed or failed since the last run")
+    parser.add_argument("--impact-file", default=".aux_impact.json", help="task fingerprints and results of earlier runs")
+    parser.add_argument("--output", help="write per task results and timings as json to this file")
+    cli_args = parser.parse_args()
+
+    extra_vars = {}
+    for extra_var in cli_args.extra_vars:
+        key, _, value = extra_var.partition("=")
+        extra_vars[key] = yaml.safe_load(value)
+
+    plays = [play for playbook in cli_args.playbooks for play in expand_playbook(playbook)]
+    impact = TestImpact(cli_args.impact_file)
+    results = []
+    ok = True
+    start = time.perf_counter()
+    # the one browser launch of the run, every task's session borrows it
+    with AuxSession(not cli_args.headed, profile=cli_args.browser_profile) as session:
+        AuxSession.shared = session
+        try:
+            play_numbers = {}
+            for play, playbook in plays:
+                print(f"PLAY [{play.get('name', play.get('hosts', ''))}] {os.path.relpath(playbook)}")
+                play_numbers[playbook] = play_numbers.get(playbook, 0) + 1
+                play_id = f"{os.path.relpath(playbook, REPO_ROOT)}:{play_numbers[playbook]}"
+                # a failed host takes no part in later plays
+                ok = run_play(play, play_id, playbook, extra_vars, cli_args.check, results, impact, cli_args.changed_only)
+                if not ok:
+                    break
+        finally:
+            AuxSession.shared = None
+            impact.save()
+    elapsed = time.perf_counter() - start
+
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in STATUSES}
+    print(" ".join(f"{status}={count}" for status, count in counts.items()), f"in {elapsed:.1f}s, peak RSS {session.peak_rss / 2 ** 20:.0f} MiB")
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_fh:
+            json.dump(dict(elapsed_s=round(elapsed, 1), browser=session.report(), tasks=results), output_fh, indent=2, default=str)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/bin/python3
+
+# Split a test suite across runner machines, and merge their results.
+#
+# split: a test manager playbook (a list of import_playbook, like
+# examples/test_manager.yml.ex) is split into N shards of whole playbooks.
+# Playbooks that share a record (one creates a key another uses, eg
+# verify_records checking the customers customers.yml.ex creates) are kept
+# in one shard. Shards are balanced on the playbook durations from earlier
+# tools/aux_run.py --output files, or on their aux_* task count when there
+# is no history. The same inputs always give the same shards. Every shard
+# gets a key prefix (S1, S2, ...): its record keys are rewritten to
+# <prefix><key> in copies of its playbooks, so shards run at the same time
+# on the same QAD server never touch the same records. Writes
+# <manager>.shard-NN.yml next to the manager playbook for each shard.
+#
+# A record set (a yaml list of records, eg for aux_verify_records) is split
+# by record count instead, records with the same --group-by values together.
+#
+# merge: combines the aux_run --output files of the shards into one result.
+#
+# usage: tools/aux_shard.py split examples/test_manager.yml.ex --shards 4 [--durations results/*.json]
+#        tools/aux_shard.py split records.yml --shards 4 --key-field customer_code [--group-by business_relation_code]
+#        tools/aux_shard.py merge shard-*.json --output results.json
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+import ansible.module_utils
+import yaml
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the screen engine imports its siblings as ansible.module_utils.*, as in a module run
+ansible.module_utils.__path__.append(os.path.join(REPO_ROOT, "module_utils"))
+
+from ansible.module_utils.screen_engine import spec_from_module  # noqa: E402
+
+PLAY_TASK_LISTS = ("pre_tasks", "tasks", "post_tasks")
+# seconds per aux_* task for playbooks without history, when there is no history at all
+DEFAULT_TASK_SECONDS = 10
+
+
+def load_yaml(path: str):
+    with open(path) as yaml_fh:
+        return yaml.safe_load(yaml_fh)
+
+
+def tasks_of(playbook: list) -> list[dict]:
+    return [task for play in playbook for task_list in PLAY_TASK_LISTS for task in play.get(task_list) or []]
+
+
+def scalars(value):
+    """every string and number in a task, templates excluded"""
+    if isinstance(value, dict):
+        for val in value.values():
+            yield from scalars(val)
+    elif isinstance(value, list):
+        for item in value:
+            yield from scalars(item)
+    elif isinstance(value, (str, int, float)) and not isinstance(value, bool) and "{{" not in str(value):
+        yield str(value)
+
+
+def record_keys(task: dict) -> set[str]:
+    """search key values of the record a maintenance screen task creates, updates or deletes"""
+    module = next((key for key in task if key.startswith("aux_")), None)
+    if module is None:
+        return set()
+    try:
+        screen = spec_from_module(os.path.join(REPO_ROOT, "library", f"{module}.py"))
+    except ValueError:
+        # not a maintenance screen module
+        return set()
+    main = (task[module].get("input_fields") or {}).get("main") or {}
+    names = [screen.quicksearch_key] if screen.quicksearch_key else [search_filter["key"] for search_filter in screen.search_filters]
+    return {str(main[name]) for name in names if name in main and "{{" not in str(main[name])}
+
+
+class PlaybookUnit:
+    """one imported playbook of a test manager, the smallest thing a shard runs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.relpath(path, REPO_ROOT)
+        self.playbook = load_yaml(path) or []
+        aux_tasks = [task for task in tasks_of(self.playbook) if any(key.startswith("aux_") for key in task)]
+        self.task_count = len(aux_tasks)
+        self.keys = set().union(*[record_keys(task) for task in aux_tasks])
+        self.values = {value for task in aux_tasks for value in scalars(task)}
+        self.seconds = None
+
+
+def history(paths: list[str]) -> dict[str, float]:
+    """mean seconds per playbook over the runs in aux_run --output (or merged) files"""
+    runs = {}
+    for path in paths:
+        with open(path) as results_fh:
+            results = json.load(results_fh)
+        per_run = {}
+        for task in results["tasks"]:
+            # tasks not run again by aux_run --changed-only took no time
+            if "playbook" in task and task["status"] != "unchanged":
+                per_run[task["playbook"]] = per_run.get(task["playbook"], 0) + task["seconds"]
+        for name, seconds in per_run.items():
+            runs.setdefault(name, []).append(seconds)
+    return {name: statistics.mean(seconds) for name, seconds in runs.items()}
+
+
+def estimate_durations(units: list[PlaybookUnit], durations: dict[str, float]) -> None:
+    """history where there is some, otherwise the mean seconds per aux_* task times the task count"""
+    known = [unit for unit in units if unit.name in durations]
+    task_seconds = DEFAULT_TASK_SECONDS
+    if sum(unit.task_count for unit in known):
+        task_seconds = sum(durations[unit.name] for unit in known) / sum(unit.task_count for unit in known)
+    for unit in units:
+        unit.seconds = durations.get(unit.name, unit.task_count * task_seconds)
+
+
+def group_units(units: list, shared) -> list[list]:
+    """connected groups of units, shared(a, b) is True when a and b must run in the same shard"""
+    groups = []
+    for unit in units:
+        joined = [group for group in groups if any(shared(unit, member) for member in group)]
+        merged = [member for group in joined for member in group] + [unit]
+        groups = [group for group in groups if not any(group is other for other in joined)] + [merged]
+    return groups
+
+
+def balance(groups: list[list], weight, shards: int) -> list[list]:
+    """longest processing time first: heaviest group to the lightest shard, ties to the lowest shard"""
+    loads = [0.0] * shards
+    assigned = [[] for _ in range(shards)]
+    for group in sorted(groups, key=lambda group: (-sum(weight(member) for member in group), group_label(group))):
+        shard = loads.index(min(loads))
+        assigned[shard].extend(group)
+        loads[shard] += sum(weight(member) for member in group)
+    return assigned
+
+
+def group_label(group: list) -> str:
+    return min(str(getattr(member, "name", json.dumps(member, sort_keys=True, default=str))) for member in group)
+
+
+def prefix_keys(value, keys: set[str], prefix: str):
+    """replace every value that is a record key with <prefix><key>"""
+    if isinstance(value, dict):
+        return {key: prefix_keys(val, keys, prefix) for key, val in value.items()}
+    if isinstance(value, list):
+        return [prefix_keys(item, keys, prefix) for item in value]
+    if not isinstance(value, bool) and isinstance(value, (str, int, float)) and str(value) in keys:
+        return f"{prefix}{value}"
+    return value
+
+
+def write_yaml(path: str, data, source: str) -> None:
+    with open(path, "w") as yaml_fh:
+        yaml_fh.write(f"# generated by tools/aux_shard.py from {source}\n---\n")
+        yaml.safe_dump(data, yaml_fh, sort_keys=False, default_flow_style=False)
+
+
+def shard_path(path: str, shard: int) -> str:
+    stem, _ = os.path.splitext(os.path.basename(path))
+    stem = stem[:-len(".yml")] if stem.endswith(".yml") else stem
+    return os.path.join(os.path.dirname(path), f"{stem}.shard-{shard:02d}.yml")
+
+
+def split_playbook(cli_args) -> list[dict]:
+    manager = load_yaml(cli_args.source)
+    manager_dir = os.path.dirname(os.path.abspath(cli_args.source))
+    units = [PlaybookUnit(os.path.join(manager_dir, entry["import_playbook"])) for entry in manager]
+    estimate_durations(units, history(cli_args.durations))
+
+    groups = group_units(units, lambda unit, other: bool(unit.keys & other.values or other.keys & unit.values))
+    shards = balance(groups, lambda unit: unit.seconds, cli_args.shards)
+
+    plan = []
+    for index, shard_units in enumerate(shards, start=1):
+        # the manager's order is kept within a shard
+        shard_units = sorted(shard_units, key=units.index)
+        prefix = cli_args.key_prefix.format(shard=index)
+        keys = set().union(*[unit.keys for unit in shard_units])
+        imports = []
+        for unit in shard_units:
+            path = unit.path
+            if prefix and unit.values & keys:
+                path = shard_path(unit.path, index)
+                write_yaml(path, prefix_keys(unit.playbook, keys, prefix), f"{unit.name}, shard {index} of {cli_args.shards}")
+            imports.append(dict(import_playbook=os.path.relpath(path, manager_dir)))
+        write_yaml(shard_path(cli_args.source, index), imports, f"{cli_args.source}, shard {index} of {cli_args.shards}")
+        plan.append(dict(
+            shard=index,
+            playbook=shard_path(cli_args.source, index),
+            key_prefix=prefix,
+            seconds=round(sum(unit.seconds for unit in shard_units), 1),
+            playbooks=[unit.name for unit in shard_units],
+        ))
+    return plan
+
+
+def get_field(record: dict, name: str):
+    """a dotted field of a record, eg main.customer_code"""
+    for part in name.split("."):
+        record = (record or {}).get(part)
+    return record
+
+
+def set_field(record: dict, name: str, value) -> None:
+    *parents, last = name.split(".")
+    for part in parents:
+        record = record[part]
+    record[last] = value
+
+
+def split_records(cli_args) -> list[dict]:
+    records = load_yaml(cli_args.source) or []
+    if not cli_args.key_field:
+        sys.exit("--key-field is needed to split a record set")
+
+    def shared(record: int, other: int) -> bool:
+        return any(
+            get_field(records[record], name) is not None and get_field(records[record], name) == get_field(records[other], name)
+            for name in cli_args.group_by
+        )
+
+    # records are grouped by their position, so equal records are still counted twice
+    groups = group_units(list(range(len(records))), shared)
+    shards = balance(groups, lambda record: 1, cli_args.shards)
+
+    plan = []
+    for index, shard_records in enumerate(shards, start=1):
+        shard_records = [records[record] for record in sorted(shard_records)]
+        prefix = cli_args.key_prefix.format(shard=index)
+        if prefix:
+            shard_records = json.loads(json.dumps(shard_records, default=str))
+            for record in shard_records:
+                set_field(record, cli_args.key_field, f"{prefix}{get_field(record, cli_args.key_field)}")
+        write_yaml(shard_path(cli_args.source, index), shard_records, f"{cli_args.source}, shard {index} of {cli_args.shards}")
+        plan.append(dict(
+            shard=index,
+            records_file=shard_path(cli_args.source, index),
+            key_prefix=prefix,
+            records=len(shard_records),
+        ))
+    return plan
+
+
+def merge(cli_args) -> dict:
+    """one result from the aux_run results of every shard, shards ran side by side"""
+    shard_results = []
+    for path in cli_args.results:
+        with open(path) as results_fh:
+            shard_results.append((path, json.load(results_fh)))
+    tasks = [dict(task, shard=os.path.basename(path)) for path, results in shard_results for task in results["tasks"]]
+    return dict(
+        shards=len(shard_results),
+        elapsed_s=max(results["elapsed_s"] for _, results in shard_results),
+        busy_s=round(sum(results["elapsed_s"] for _, results in shard_results), 1),
+        browser=dict(
+            peak_rss_bytes=max(results["browser"]["peak_rss_bytes"] for _, results in shard_results),
+            reaped=sum(results["browser"]["reaped"] for _, results in shard_results),
+            leaked=sum(results["browser"]["leaked"] for _, results in shard_results),
+        ),
+        counts={
+            status: sum(1 for task in tasks if task["status"] == status)
+            for status in ("ok", "changed", "unchanged", "failed", "ignored", "skipped")
+        },
+        tasks=tasks,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a test manager playbook or record set into shards, and merge shard results")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split_parser = commands.add_parser("split", help="write one playbook (or record set) per shard")
+    split_parser.add_argument("source", help="test manager playbook, or a yaml list of records")
+    split_parser.add_argument("--shards", type=int, required=True)
+    split_parser.add_argument("--durations", nargs="*", default=[], help="tools/aux_run.py --output files of earlier runs")
+    split_parser.add_argument("--key-prefix", default="S{shard}", help="record key prefix per shard, '' keeps the keys as they are")
+    split_parser.add_argument("--key-field", help="record set: the (dotted) field holding the record key")
+    split_parser.add_argument("--group-by", nargs="*", default=[], help="record set: records with the same value of any of these fields share a shard")
+    split_parser.add_argument("--output", help="write the shard plan as json to this file")
+    merge_parser = commands.add_parser("merge", help="combine the aux_run results of every shard")
+    merge_parser.add_argument("results", nargs="+", help="tools/aux_run.py --output file of each shard")
+    merge_parser.add_argument("--output", help="write the merged results as json to this file")
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "merge":
+        merged = merge(cli_args)
+        print(" ".join(f"{status}={count}" for status, count in merged["counts"].items()),
+              f"in {merged['elapsed_s']}s over {merged['shards']} shards ({merged['busy_s']}s of runner time)")
+        if cli_args.output:
+            with open(cli_args.output, "w") as output_fh:
+                json.dump(merged, output_fh, indent=2)
+        sys.exit(1 if merged["counts"]["failed"] else 0)
+
+    if cli_args.shards < 1:
+        sys.exit("--shards must be at least 1")
+    source = load_yaml(cli_args.source) or []
+    if not isinstance(source, list):
+        sys.exit(f"{cli_args.source} is not a test manager playbook or a list of records")
+    if all(isinstance(entry, dict) and "import_playbook" in entry for entry in source):
+        plan = split_playbook(cli_args)
+    elif any(isinstance(entry, dict) and "hosts" in entry for entry in source):
+        sys.exit(f"{cli_args.source} has plays, only a test manager (a list of import_playbook) can be split")
+    else:
+        plan = split_records(cli_args)
+    for shard in plan:
+        print(json.dumps(shard))
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_fh:
+            json.dump(plan, output_fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
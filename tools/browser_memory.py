@@ -0,0 +1,151 @@
+#!/bin/python3
+
+# Browser memory per concurrent session, for sizing runners against Ansible
+# forks. For each browser profile and session count, opens that many sessions
+# at once (each in its own process with its own playwright driver and browser,
+# as forks do), loads a maintenance screen in each and reports the peak RSS of
+# all of them together and per session.
+#
+# Without --qad-server the mock qad-central server is started in process and
+# each session logs in to it, so no QAD instance is needed.
+#
+# usage: tools/browser_memory.py [--sessions 1 4 8] [--profiles default lean]
+#                                [--qad-server qadhost --state-file state.json] [--output memory.json]
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import ansible.module_utils
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the screen engine imports its siblings as ansible.module_utils.*, as in a module run
+ansible.module_utils.__path__.append(os.path.join(REPO_ROOT, "module_utils"))
+
+from ansible.module_utils.screen_engine import spec_from_module  # noqa: E402
+from ansible.module_utils.shared_utils import (BROWSER_PROFILES,  # noqa: E402
+                                               AuxSession,
+                                               descendants,
+                                               read_processes)
+
+
+def login(page, url: str) -> None:
+    """log in to the mock server as aux_auth does, any user name is accepted"""
+    page.locator("[name=username]").fill("memory")
+    page.locator("[name=password]").fill("memory")
+    page.locator("[id=logInBtn]").click()
+    page.wait_for_url("**/qad-central/#/view/webshell/home")
+    page.goto(url)
+
+
+def hold_session(config: dict, profile: str, ready: multiprocessing.Queue, release, results: multiprocessing.Queue) -> None:
+    """open a session on the screen and keep it open until released"""
+    session = AuxSession(True, config["state_file"], profile=profile, reap_after=0)
+    try:
+        with session:
+            session.page.goto(config["url"])
+            if "login.jsp" in session.page.url and config["mock"]:
+                login(session.page, config["url"])
+            session.page.locator("[id=tbQuickSearch_BrowseDataGrid]").wait_for()
+            ready.put(True)
+            release.wait()
+    except Exception as exc:
+        sys.stderr.write(f"{profile} session: {exc}\n")
+        ready.put(False)
+    finally:
+        results.put(session.peak_rss)
+
+
+def measure(config: dict, profile: str, sessions: int, hold: float) -> dict:
+    """peak RSS of sessions concurrent browsers of one profile"""
+    mp_context = multiprocessing.get_context("spawn")
+    ready = mp_context.Queue()
+    results = mp_context.Queue()
+    release = mp_context.Event()
+    workers = [
+        mp_context.Process(target=hold_session, args=(config, profile, ready, release, results))
+        for _ in range(sessions)
+    ]
+    for worker in workers:
+        worker.start()
+    opened = sum(1 for _ in workers if ready.get())
+
+    # every worker, driver and browser process is below us
+    peak_rss = 0
+    deadline = time.time() + hold
+    while time.time() < deadline:
+        processes = read_processes()
+        rss = sum(processes[pid]["rss"] for pid in descendants(processes, os.getpid()) if pid in processes)
+        peak_rss = max(peak_rss, rss)
+        time.sleep(0.25)
+    release.set()
+    session_peaks = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    return dict(
+        profile=profile,
+        sessions=sessions,
+        opened=opened,
+        total_mb=round(peak_rss / 2 ** 20, 1),
+        mb_per_session=round(peak_rss / 2 ** 20 / max(opened, 1), 1),
+        max_session_mb=round(max(session_peaks) / 2 ** 20, 1),
+    )
+
+
+def print_report(report: list) -> None:
+    print(f"{'profile':<10} {'sessions':>8} {'opened':>7} {'total MB':>9} {'MB/session':>11} {'max session MB':>15}")
+    for row in report:
+        print(
+            f"{row['profile']:<10} {row['sessions']:>8} {row['opened']:>7} {row['total_mb']:>9} "
+            f"{row['mb_per_session']:>11} {row['max_session_mb']:>15}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure browser memory per concurrent session for each browser profile")
+    parser.add_argument("--sessions", type=int, nargs="*", default=[1, 4, 8], help="concurrent session counts to measure")
+    parser.add_argument("--profiles", nargs="*", default=list(BROWSER_PROFILES), choices=list(BROWSER_PROFILES))
+    parser.add_argument("--module", default="aux_customers", help="maintenance module whose screen is loaded")
+    parser.add_argument("--hold", type=float, default=10, help="seconds to sample memory once all sessions are open")
+    parser.add_argument("--qad-server", help="measure against this QAD server instead of the mock server")
+    parser.add_argument("--state-file", help="authentication state file, required with --qad-server")
+    parser.add_argument("--output", help="write the report as json to this file")
+    cli_args = parser.parse_args()
+
+    if cli_args.qad_server and not (cli_args.state_file and os.path.exists(cli_args.state_file)):
+        sys.exit("Authentication state file does not exist!")
+
+    server = None
+    if not cli_args.qad_server:
+        sys.path.insert(0, os.path.join(REPO_ROOT, "tools", "mock_aux"))
+        from server import make_server
+        server = make_server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    screen = spec_from_module(os.path.join(REPO_ROOT, "library", f"{cli_args.module}.py"))
+    config = dict(
+        url=screen.item_url(cli_args.qad_server or "localhost"),
+        state_file=cli_args.state_file,
+        mock=server is not None,
+    )
+    report = [
+        measure(config, profile, sessions, cli_args.hold)
+        for profile in cli_args.profiles
+        for sessions in cli_args.sessions
+    ]
+    if server is not None:
+        server.shutdown()
+
+    print_report(report)
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_fh:
+            json.dump(report, output_fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
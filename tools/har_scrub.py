@@ -0,0 +1,62 @@
+#!/bin/python3
+
+# Strip credentials and company data from a HAR recorded with
+# capture_mode: record, so it can be shared and replayed offline.
+#
+# usage: tools/har_scrub.py session.har session.scrubbed.har \
+#            --redact-file vars/credentials.yml --redact "Joes customer" --redact-pattern "\d{3}-\d{3}"
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "module_utils"))
+
+from har_utils import redaction_map, scrub_har  # noqa: E402
+
+
+def leaf_values(data) -> list:
+    """all scalar values in a yaml/json document, eg a vars file"""
+    if isinstance(data, dict):
+        return [value for val in data.values() for value in leaf_values(val)]
+    if isinstance(data, list):
+        return [value for item in data for value in leaf_values(item)]
+    if data is None or isinstance(data, bool):
+        return []
+    return [str(data)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove credentials and company data from a HAR file")
+    parser.add_argument("har_in")
+    parser.add_argument("har_out")
+    parser.add_argument("--redact", action="append", default=[], help="literal value to replace (repeatable)")
+    parser.add_argument("--redact-file", action="append", default=[], help="yaml/json file, every value in it is replaced (repeatable)")
+    parser.add_argument("--redact-pattern", action="append", default=[], help="regex to replace (repeatable)")
+    parser.add_argument("--mapping-out", help="write the value => token mapping to this file (keep it private)")
+    cli_args = parser.parse_args()
+
+    redact_values = list(cli_args.redact)
+    for redact_file in cli_args.redact_file:
+        with open(redact_file) as redact_fh:
+            redact_values += leaf_values(yaml.safe_load(redact_fh))
+    redact_patterns = [re.compile(pattern) for pattern in cli_args.redact_pattern]
+
+    with open(cli_args.har_in) as har_fh:
+        har = json.load(har_fh)
+    har = scrub_har(har, redact_values, redact_patterns)
+    with open(cli_args.har_out, "w") as har_fh:
+        json.dump(har, har_fh)
+
+    print(f"scrubbed {len(har['log']['entries'])} entries into {cli_args.har_out}")
+    if cli_args.mapping_out:
+        with open(cli_args.mapping_out, "w") as mapping_fh:
+            json.dump(redaction_map(redact_values), mapping_fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/bin/python3
+
+# Import time and pre-flight exit benchmark for the library/ modules.
+#
+# For each module, in a fresh interpreter per run:
+#   import   - time to import the module (module_utils included), and whether
+#              playwright was loaded by the import
+#   preflight - time from interpreter start to the module exiting a check mode
+#              task with a missing state file, ie argument validation and
+#              pre-flight checks only, and whether playwright was loaded to do it.
+#              Its args are built from the module's argument_spec, so every
+#              module gets past argument validation
+# Neither should need playwright, only tasks that really start a browser do.
+#
+# usage: tools/import_bench.py [--repeat 5] [--modules aux_customers aux_auth] [--importtime 10]
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import ansible.module_utils
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the screen engine imports its siblings as ansible.module_utils.*, as in a module run
+ansible.module_utils.__path__.append(os.path.join(REPO_ROOT, "module_utils"))
+
+from ansible.module_utils.screen_engine import spec_from_module  # noqa: E402
+
+RESULT_MARKER = "AUX_IMPORT_BENCH "
+# pre-flight values for required options by type, and for the options modules
+# require through required_if (input_fields with state present) or required_one_of (keys)
+PLACEHOLDERS = dict(str="preflight", int=1, bool=False, list=[], dict={})
+RECORD_OPTIONS = dict(input_fields={}, keys=["PREFLIGHT"])
+# messages of AnsibleModule argument validation, a pre-flight run must get past it
+VALIDATION_ERRORS = ("missing required arguments", "Unsupported parameters", "must be one of", "mutually exclusive", "one of the following is required", "is of type")
+
+# runs in the child interpreter, module_utils are imported as ansible.module_utils.* as in a module run
+IMPORT_SCRIPT = """
+import importlib.util, json, sys, time
+start = time.perf_counter()
+import ansible.module_utils
+ansible.module_utils.__path__.append({module_utils!r})
+spec = importlib.util.spec_from_file_location({name!r}, {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+sys.stderr.write({marker!r} + json.dumps(dict(ms=elapsed * 1000, playwright="playwright" in sys.modules)) + "\\n")
+"""
+
+PREFLIGHT_SCRIPT = """
+import json, runpy, sys
+import ansible.module_utils
+ansible.module_utils.__path__.append({module_utils!r})
+sys.argv = [{path!r}, {args_path!r}]
+try:
+    runpy.run_path({path!r}, run_name="__main__")
+finally:
+    sys.stderr.write({marker!r} + json.dumps(dict(playwright="playwright" in sys.modules)) + "\\n")
+"""
+
+
+def bench_result(stderr: str) -> dict:
+    for line in stderr.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"no benchmark result, child failed:\n{stderr}")
+
+
+def run_child(script: str, extra_args: list = []) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *extra_args, "-c", script], capture_output=True, text=True, cwd=REPO_ROOT)
+
+
+def bench_import(name: str, repeat: int) -> dict:
+    path = os.path.join(REPO_ROOT, "library", f"{name}.py")
+    script = IMPORT_SCRIPT.format(module_utils=os.path.join(REPO_ROOT, "module_utils"), name=name, path=path, marker=RESULT_MARKER)
+    results = [bench_result(run_child(script).stderr) for _ in range(repeat)]
+    return dict(
+        import_ms=round(statistics.median(result["ms"] for result in results), 1),
+        import_playwright=any(result["playwright"] for result in results),
+    )
+
+
+def argument_spec(path: str) -> dict:
+    """the argument_spec of a library/ module, its module_args or compiled SCREEN_SPEC, without importing it"""
+    with open(path) as module_fh:
+        tree = ast.parse(module_fh.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "module_args" for target in node.targets):
+            # nested dict() calls of literals
+            return eval(compile(ast.Expression(node.value), path, "eval"), {"__builtins__": {}, "dict": dict})
+    return spec_from_module(path).argument_spec
+
+
+def preflight_args(path: str, workdir: str) -> dict:
+    """module args that pass argument validation, for check mode with the state file missing"""
+    args = {}
+    for option_name, option in argument_spec(path).items():
+        if option_name in RECORD_OPTIONS:
+            args[option_name] = RECORD_OPTIONS[option_name]
+        elif option.get("required"):
+            args[option_name] = option["choices"][0] if "choices" in option else PLACEHOLDERS[option.get("type", "str")]
+    return dict(
+        args,
+        qad_server="localhost",
+        state_file=os.path.join(workdir, "missing_state.json"),
+        _ansible_check_mode=True,
+    )
+
+
+def bench_preflight(name: str, repeat: int, workdir: str) -> dict:
+    """a task that must exit before any browser is started: check mode, with the state file missing"""
+    path = os.path.join(REPO_ROOT, "library", f"{name}.py")
+    args_path = os.path.join(workdir, f"{name}.json")
+    with open(args_path, "w") as args_fh:
+        json.dump(dict(ANSIBLE_MODULE_ARGS=preflight_args(path, workdir)), args_fh)
+    script = PREFLIGHT_SCRIPT.format(module_utils=os.path.join(REPO_ROOT, "module_utils"), path=path, args_path=args_path, marker=RESULT_MARKER)
+    durations = []
+    playwright = False
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = run_child(script)
+        durations.append(time.perf_counter() - start)
+        playwright = playwright or bench_result(completed.stderr)["playwright"]
+        try:
+            module_result = json.loads(completed.stdout)
+        except ValueError:
+            raise RuntimeError(f"{name} did not exit with a module result:\n{completed.stdout}{completed.stderr}")
+        # failing argument validation would measure less than the pre-flight path
+        if any(error in str(module_result.get("msg", "")) for error in VALIDATION_ERRORS):
+            raise RuntimeError(f"{name} pre-flight args failed argument validation: {module_result['msg']}")
+    return dict(preflight_ms=round(statistics.median(durations) * 1000, 1), preflight_playwright=playwright)
+
+
+def slowest_imports(name: str, top: int) -> list:
+    """cumulative import times from python -X importtime, slowest first"""
+    path = os.path.join(REPO_ROOT, "library", f"{name}.py")
+    script = IMPORT_SCRIPT.format(module_utils=os.path.join(REPO_ROOT, "module_utils"), name=name, path=path, marker=RESULT_MARKER)
+    imports = []
+    for line in run_child(script, ["-X", "importtime"]).stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), package.strip()))
+    return [dict(package=package, cumulative_ms=round(cumulative / 1000, 1)) for cumulative, package in sorted(imports, reverse=True)[:top]]
+
+
+def main():
+    modules = sorted(name[:-3] for name in os.listdir(os.path.join(REPO_ROOT, "library")) if name.startswith("aux_") and name.endswith(".py"))
+    parser = argparse.ArgumentParser(description="Benchmark import time and pre-flight exits of the aux_* modules")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--modules", nargs="*", default=modules, help="modules to benchmark")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="also list the N slowest imports per module")
+    parser.add_argument("--output", help="write results as json to this file")
+    cli_args = parser.parse_args()
+
+    # interpreter start up, included in the pre-flight times
+    start = time.perf_counter()
+    for _ in range(cli_args.repeat):
+        run_child("pass")
+    baseline_ms = round((time.perf_counter() - start) / cli_args.repeat * 1000, 1)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in cli_args.modules:
+            results[name] = dict(bench_import(name, cli_args.repeat), **bench_preflight(name, cli_args.repeat, workdir))
+            if cli_args.importtime:
+                results[name]["slowest_imports"] = slowest_imports(name, cli_args.importtime)
+
+    print(f"python start up {baseline_ms} ms")
+    print(f"{'module':<32} {'import ms':>10} {'playwright':>11} {'preflight ms':>13} {'playwright':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<32} {result['import_ms']:>10} {str(result['import_playwright']):>11} "
+            f"{result['preflight_ms']:>13} {str(result['preflight_playwright']):>11}"
+        )
+        for slow_import in result.get("slowest_imports", []):
+            print(f"    {slow_import['cumulative_ms']:>8} ms  {slow_import['package']}")
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_fh:
+            json.dump(dict(baseline_ms=baseline_ms, modules=results), output_fh, indent=2)
+    # a module that loads playwright before it needs a browser is a regression
+    sys.exit(1 if any(result["import_playwright"] or result["preflight_playwright"] for result in results.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
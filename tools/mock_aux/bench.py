@@ -0,0 +1,192 @@
+#!/bin/python3
+
+# Benchmark every aux_* module against the mock qad-central server.
+#
+# Starts the mock server in process, then for each module runs a playbook of
+# login, create, idempotent re-apply and delete tasks through ansible-playbook,
+# and reports the duration of each task. No QAD instance is needed, so this
+# measures harness overhead and catches regressions in module_utils offline.
+#
+# usage: tools/mock_aux/bench.py [--repeat 3] [--latency-ms 20] [--output bench.json]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server import make_server  # noqa: E402
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# records created by the benchmark, per module
+BENCH_RECORDS = {
+    "aux_customers": dict(
+        main=dict(
+            customer_code="BENCH01",
+            address=dict(business_relation_name="Bench customer", address_search_name="Bench customer", city="Sydney"),
+            accounting_profile=dict(
+                invoice_control_gl_profile_code="10101-CRPAUS-A",
+                credit_note_control_gl_profile_code="10101-CRPAUS-A",
+                pre_payment_control_gl_profile_code="10101-CRPAUS-A",
+                sales_account_gl_profile_code="20202-CRPAUS-SA",
+            ),
+            payment=dict(credit_terms_code="AP07", invoice_status_code="AP-INITIAL"),
+            tax=dict(tax_zone="10"),
+        ),
+    ),
+    "aux_suppliers": dict(
+        main=dict(
+            supplier_code="BENCH01",
+            address=dict(business_relation_name="Bench supplier", address_search_name="Bench supplier", city="Sydney"),
+            accounting_profile=dict(
+                invoice_control_gl_profile_code="10111-CRPAUS-A",
+                credit_note_control_gl_profile_code="10111-CRPAUS-A",
+                pre_payment_control_gl_profile_code="10111-CRPAUS-A",
+                purchase_account_gl_profile_code="20202-CRPAUS-PA",
+            ),
+            payment=dict(credit_terms_code="AP07", invoice_status_code="AP-INITIAL"),
+        ),
+        tax=dict(tax_zone="10"),
+        banking=[
+            dict(
+                bank_acc_format_code="XX",
+                bank_number_formatted="55545556",
+                own_bank_number="98765432",
+                bank_business_relation_code="BNK",
+                bank_number_branch="063063",
+                currency_code="AUD",
+            ),
+        ],
+    ),
+    "aux_salespersons": dict(
+        main=dict(salesperson_code="BENCH01", business_relation_code="BENCHBR", sales_territory="NSW"),
+    ),
+    "aux_business_relations": dict(
+        main=dict(
+            business_relation_code="BENCHBR",
+            business_relation_name1="Bench relation",
+            business_relation_search_name="Bench relation",
+            addresses=dict(head_office=dict(head_office_city="Sydney", head_office_email="bench@example.com")),
+        ),
+    ),
+    "aux_customer_ship_to_addresses": dict(
+        main=dict(customer_code="BENCH01", customer_ship_to_name="Bench ship-to"),
+        address=dict(address_search_name="Bench ship-to", city="Sydney", country_code="AU"),
+        tax=dict(tax_zone="10"),
+    ),
+}
+
+
+def key_fields(module: str) -> dict:
+    """the input_fields needed to find the bench record, for state: absent"""
+    main = BENCH_RECORDS[module]["main"]
+    return dict(main={key: val for key, val in main.items() if key.endswith("_code") or key == "customer_ship_to_name"})
+
+
+def bench_playbook(module: str, state_file: str) -> list:
+    common = dict(qad_server="localhost", state_file=state_file)
+    return [dict(
+        hosts="all",
+        gather_facts=False,
+        tasks=[
+            dict(name="login", aux_auth=dict(common, state="present", username="bench", password="bench")),
+            dict(name="create", **{module: dict(common, state="present", input_fields=BENCH_RECORDS[module])}),
+            dict(name="reapply", **{module: dict(common, state="present", input_fields=BENCH_RECORDS[module])}),
+            dict(name="delete", **{module: dict(common, state="absent", input_fields=key_fields(module))}),
+            dict(name="delete again", **{module: dict(common, state="absent", input_fields=key_fields(module))}),
+        ],
+    )]
+
+
+def run_playbook(playbook: list, workdir: str) -> list:
+    """run a playbook with the json callback, return (task name, seconds, ok) per task"""
+    playbook_path = os.path.join(workdir, "bench.yml")
+    with open(playbook_path, "w") as playbook_fh:
+        yaml.safe_dump(playbook, playbook_fh)
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=os.path.join(REPO_ROOT, "ansible.cfg"),
+        ANSIBLE_STDOUT_CALLBACK="json",
+        ANSIBLE_LOAD_CALLBACK_PLUGINS="1",
+        # lookup lists and screen metadata come from the mock server, not a real AUX cache
+        AUX_REFERENCE_CACHE_DIR=os.path.join(workdir, "reference_data"),
+        AUX_SCREEN_META_CACHE_DIR=os.path.join(workdir, "screen_meta"),
+        # mock latencies (and --latency-ms runs) must not teach the timeouts of a real localhost
+        AUX_TIMEOUT_DIR=os.path.join(workdir, "timeouts"),
+        # nor may --error-rate runs open the circuit breaker of a real localhost
+        AUX_CIRCUIT_DIR=os.path.join(workdir, "circuit"),
+    )
+    completed = subprocess.run(
+        ["ansible-playbook", "--connection=local", "-i", "localhost,", playbook_path],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=REPO_ROOT,
+    )
+    output = json.loads(completed.stdout)
+    task_results = []
+    for task in output["plays"][0]["tasks"]:
+        duration = task["task"]["duration"]
+        seconds = (datetime.fromisoformat(duration["end"]) - datetime.fromisoformat(duration["start"])).total_seconds()
+        host_result = task["hosts"]["localhost"]
+        ok = not host_result.get("failed", False)
+        task_results.append((task["task"]["name"], seconds, ok))
+    return task_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark aux_* modules against the mock qad-central server")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module")
+    parser.add_argument("--modules", nargs="*", default=list(BENCH_RECORDS), help="modules to benchmark")
+    parser.add_argument("--latency-ms", type=float, default=0, help="mock server api latency")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--output", help="write results as json to this file")
+    cli_args = parser.parse_args()
+
+    server = make_server(latency_ms=cli_args.latency_ms, jitter_ms=cli_args.jitter_ms, error_rate=cli_args.error_rate, seed=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {}
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        state_file = os.path.join(workdir, "state.json")
+        for module in cli_args.modules:
+            durations = {}
+            for _ in range(cli_args.repeat):
+                for task_name, seconds, ok in run_playbook(bench_playbook(module, state_file), workdir):
+                    durations.setdefault(task_name, []).append(seconds)
+                    if not ok:
+                        failures += 1
+                        sys.stderr.write(f"{module}: task '{task_name}' failed\n")
+            results[module] = {
+                task_name: dict(
+                    median_s=round(statistics.median(seconds), 3),
+                    min_s=round(min(seconds), 3),
+                    max_s=round(max(seconds), 3),
+                )
+                for task_name, seconds in durations.items()
+            }
+    server.shutdown()
+
+    print(f"{'module':<32} {'task':<14} {'median s':>9} {'min s':>8} {'max s':>8}")
+    for module, tasks in results.items():
+        for task_name, summary in tasks.items():
+            print(f"{module:<32} {task_name:<14} {summary['median_s']:>9} {summary['min_s']:>8} {summary['max_s']:>8}")
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_fh:
+            json.dump(results, output_fh, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
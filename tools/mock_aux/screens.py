@@ -0,0 +1,132 @@
+# Screen definitions served by the mock qad-central server.
+#
+# Field names are the camelCase html "name" attributes the library/ modules
+# fill in, grouped by the section panels they appear under in AUX.
+
+SCREENS = {
+    "com.qad.erp.base.customerV2s": dict(
+        title="Customers",
+        key_fields=["customerCode"],
+        grid_columns=["customerCode", "businessRelationName", "addressSearchName", "city"],
+        sections=[
+            ("Main", ["customerCode"]),
+            ("Address", ["businessRelationName", "addressSearchName", "city"]),
+            ("Accounting Profile", [
+                "invoiceControlGLProfileCode",
+                "creditNoteControlGLProfileCode",
+                "prePaymentControlGLProfileCode",
+                "salesAccountGLProfileCode",
+            ]),
+            ("Payment", ["creditTermsCode", "invoiceStatusCode"]),
+            ("Tax", ["taxZone"]),
+        ],
+        lists={"invoiceStatusCode": ["AP-INITIAL", "AP-APPROVED", "AP-HOLD"]},
+        tables={},
+        search_labels={"Customer": "customerCode", "Name": "businessRelationName", "City": "city"},
+    ),
+    "com.qad.erp.base.supplierV2s": dict(
+        title="Suppliers",
+        key_fields=["supplierCode"],
+        grid_columns=["supplierCode", "businessRelationName", "addressSearchName", "city"],
+        sections=[
+            ("Main", ["supplierCode"]),
+            ("Address", ["businessRelationName", "addressSearchName", "city"]),
+            ("Accounting Profile", [
+                "invoiceControlGLProfileCode",
+                "creditNoteControlGLProfileCode",
+                "prePaymentControlGLProfileCode",
+                "purchaseAccountGLProfileCode",
+            ]),
+            ("Payment", ["creditTermsCode", "invoiceStatusCode"]),
+            ("Tax", ["taxZone"]),
+        ],
+        lists={"invoiceStatusCode": ["AP-INITIAL", "AP-APPROVED", "AP-HOLD"]},
+        tables={
+            "BankingPanel": [
+                "bankAccFormatCode",
+                "bankNumberFormatted",
+                "ownBankNumber",
+                "bankBusinessRelationCode",
+                "bankNumberBranch",
+                "currencyCode",
+            ],
+        },
+        search_labels={"Supplier": "supplierCode", "Name": "businessRelationName", "City": "city"},
+    ),
+    "com.qad.erp.sales.salespersons": dict(
+        title="Salespersons",
+        key_fields=["salespersonCode"],
+        grid_columns=["salespersonCode", "businessRelationCode", "salesTerritory"],
+        sections=[
+            ("Main", ["salespersonCode", "businessRelationCode", "salesTerritory"]),
+        ],
+        lists={},
+        tables={},
+        search_labels={"Salesperson": "salespersonCode", "Business Relation": "businessRelationCode"},
+    ),
+    "com.qad.erp.base.businessRelationV2s": dict(
+        title="Business Relations",
+        key_fields=["businessRelationCode"],
+        grid_columns=["businessRelationCode", "businessRelationName1", "businessRelationSearchName"],
+        sections=[
+            ("Main", ["businessRelationCode", "businessRelationName1", "businessRelationSearchName"]),
+            ("Head Office", [
+                "headOfficeStreet1",
+                "headOfficeStreet2",
+                "headOfficeStreet3",
+                "headOfficeZipCode",
+                "headOfficeCity",
+                "headOfficeStateCode",
+                "headOfficeTelephone",
+                "headOfficeFax",
+                "headOfficeEMail",
+                "headOfficeWebSite",
+            ]),
+        ],
+        lists={},
+        tables={},
+        search_labels={"Business Relation": "businessRelationCode", "Name": "businessRelationName1"},
+    ),
+    "com.qad.erp.base.customershiptoV2s": dict(
+        title="Customer Ship-To Addresses",
+        key_fields=["customerCode", "customerShipToName"],
+        grid_columns=["customerCode", "customerShipToName", "addressSearchName", "city"],
+        sections=[
+            ("Main", ["customerCode", "customerShipToName"]),
+            ("Address", ["addressSearchName", "city", "countryCode"]),
+            ("Tax", ["taxZone"]),
+        ],
+        lists={},
+        tables={},
+        search_labels={"Customer": "customerCode", "Ship-To Name": "customerShipToName", "City": "city"},
+    ),
+}
+
+
+def lookup_screen(title: str, code_column: str, codes: list[str]) -> dict:
+    """read only lookup browse, seeded with the codes the bench records use"""
+    return dict(
+        title=title,
+        key_fields=[code_column],
+        grid_columns=[code_column, "description"],
+        sections=[("Main", [code_column, "description"])],
+        lists={},
+        tables={},
+        search_labels={title: code_column},
+        seed=[{code_column: code, "description": code} for code in codes],
+    )
+
+
+# lookup lists read by module_utils/reference_data.py
+SCREENS.update({
+    "com.qad.erp.financials.glProfiles": lookup_screen(
+        "GL Profiles", "profileCode", ["10101-CRPAUS-A", "10111-CRPAUS-A", "20202-CRPAUS-SA", "20202-CRPAUS-PA"],
+    ),
+    "com.qad.erp.financials.creditTerms": lookup_screen("Credit Terms", "creditTermsCode", ["AP07", "AP14", "AP30"]),
+    "com.qad.erp.financials.invoiceStatuses": lookup_screen(
+        "Invoice Statuses", "invoiceStatusCode", ["AP-INITIAL", "AP-APPROVED", "AP-HOLD"],
+    ),
+    "com.qad.erp.base.currencies": lookup_screen("Currencies", "currencyCode", ["AUD", "NZD", "USD"]),
+    "com.qad.erp.financials.bankFormats": lookup_screen("Bank Formats", "bankAccFormatCode", ["XX", "AU"]),
+    "com.qad.erp.base.taxZones": lookup_screen("Tax Zones", "taxZone", ["10", "20"]),
+})
@@ -0,0 +1,334 @@
+#!/bin/python3
+
+# Local stand-in for a qad-central (QAD AUX) server, for offline benchmarking
+# of the library/ modules and CI runs without a live QAD instance.
+#
+# Serves the login page, the webshell home and hybridbrowse maintenance screens
+# with the same element ids/names the modules locate, backed by an in memory
+# record store. API calls can be slowed down and failed on purpose.
+#
+# usage: tools/mock_aux/server.py [--port 22010] [--latency-ms 50] [--error-rate 0.01]
+# then point modules at qad_server: localhost
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http import cookies
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from screens import SCREENS  # noqa: E402
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+SESSION_COOKIE = "JSESSIONID"
+# browse grid rows per page, as the AUX default
+PAGE_SIZE = 50
+DATA_PATH = re.compile(r"^/qad-central/api/erp/data/(?P<screen>[^/]+)(?:/(?P<key>[^/]+))?$")
+
+
+class MockAuxState:
+    """records, sessions and fault injection settings shared by all request threads"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int = None):
+        self.lock = threading.Lock()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.sessions = set()
+        self.next_id = 1
+        self.records = self.seed_records()
+
+    def configure(self, settings: dict) -> None:
+        with self.lock:
+            for setting in ("latency_ms", "jitter_ms", "error_rate"):
+                if setting in settings:
+                    setattr(self, setting, float(settings[setting]))
+
+    def reset(self) -> None:
+        with self.lock:
+            self.records = self.seed_records()
+
+    def seed_records(self) -> dict:
+        """empty maintenance screens, lookup screens with their seed codes"""
+        records = {screen: {} for screen in SCREENS}
+        for screen, definition in SCREENS.items():
+            for fields in definition.get("seed", []):
+                key = self.record_key(screen, fields)
+                records[screen][key] = dict(id=self.next_id, key=key, fields=fields, tables={}, created=0, modified=0)
+                self.next_id += 1
+        return records
+
+    def api_delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def inject_error(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def record_key(self, screen: str, fields: dict) -> str:
+        return "|".join(str(fields.get(key_field, "")) for key_field in SCREENS[screen]["key_fields"])
+
+    def search(self, screen: str, quick: str = None, conditions: list = None) -> list:
+        with self.lock:
+            records = list(self.records[screen].values())
+        key_field = SCREENS[screen]["key_fields"][0]
+        if quick:
+            quick = quick.lower()
+            records = [record for record in records if str(record["fields"].get(key_field, "")).lower().startswith(quick)]
+            # exact key matches are listed first, as in AUX
+            records.sort(key=lambda record: (str(record["fields"].get(key_field, "")).lower() != quick, record["fields"].get(key_field, "")))
+        for condition in conditions or []:
+            records = [record for record in records if match_condition(record["fields"], condition)]
+        return records
+
+    def save(self, screen: str, original_key: str, fields: dict, tables: dict) -> dict:
+        key = self.record_key(screen, fields)
+        with self.lock:
+            if any(not fields.get(key_field) for key_field in SCREENS[screen]["key_fields"]):
+                raise ValueError("key fields are mandatory")
+            if key != original_key and key in self.records[screen]:
+                raise ValueError(f"record {key} already exists")
+            record = self.records[screen].pop(original_key, None) if original_key else None
+            if record is None:
+                record = dict(id=self.next_id, created=time.time())
+                self.next_id += 1
+            record.update(key=key, fields=fields, tables=tables, modified=time.time())
+            self.records[screen][key] = record
+            return record
+
+    def delete(self, screen: str, key: str) -> bool:
+        with self.lock:
+            return self.records[screen].pop(key, None) is not None
+
+
+def match_condition(fields: dict, condition: dict) -> bool:
+    value = str(fields.get(condition["field"], "")).lower()
+    wanted = str(condition["value"]).lower()
+    operator = condition["operator"]
+    if operator == "equals":
+        return value == wanted
+    if operator == "not equal to":
+        return value != wanted
+    if operator == "contains":
+        return wanted in value
+    if operator == "begins with":
+        return value.startswith(wanted)
+    if operator == "in":
+        return value in [item.strip() for item in wanted.split(",")]
+    return False
+
+
+class MockAuxHandler(BaseHTTPRequestHandler):
+    server_version = "MockQADCentral/1.0"
+    state: MockAuxState = None
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # helpers
+
+    def session_id(self) -> str:
+        jar = cookies.SimpleCookie(self.headers.get("Cookie", ""))
+        if SESSION_COOKIE in jar and jar[SESSION_COOKIE].value in self.state.sessions:
+            return jar[SESSION_COOKIE].value
+        return None
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_json(self, status: int, data, headers: dict = None) -> None:
+        self.send_body(status, json.dumps(data).encode(), "application/json", headers)
+
+    def send_static(self, name: str, content_type: str, replacements: dict = None) -> None:
+        with open(os.path.join(STATIC_DIR, name), "rb") as static_fh:
+            body = static_fh.read()
+        for placeholder, value in (replacements or {}).items():
+            body = body.replace(placeholder.encode(), value.encode())
+        self.send_body(200, body, content_type)
+
+    def redirect(self, location: str, headers: dict = None) -> None:
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # routing
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path in ("/", "/qad-central", "/qad-central/"):
+            if self.session_id() is None:
+                return self.redirect("/qad-central/resources/login.jsp")
+            return self.send_static(
+                "index.html", "text/html", {"__AUX_SCREENS__": json.dumps(SCREENS)}
+            )
+        if url.path == "/qad-central/resources/login.jsp":
+            return self.send_static("login.html", "text/html")
+        if url.path.startswith("/qad-central/static/"):
+            name = os.path.basename(url.path)
+            if not os.path.isfile(os.path.join(STATIC_DIR, name)):
+                return self.send_json(404, dict(error="not found"))
+            content_type = "text/css" if name.endswith(".css") else "application/javascript"
+            return self.send_static(name, content_type)
+        if url.path == "/qad-central/api/mock/state":
+            return self.send_json(200, dict(
+                latency_ms=self.state.latency_ms,
+                jitter_ms=self.state.jitter_ms,
+                error_rate=self.state.error_rate,
+                records={screen: len(records) for screen, records in self.state.records.items()},
+            ))
+        if url.path == "/qad-central/api/views/meta":
+            view_meta_uri = parse_qs(url.query).get("viewMetaUri", [""])[0].replace("urn:view:meta:", "")
+            if view_meta_uri not in SCREENS:
+                return self.send_json(404, dict(error=f"unknown view {view_meta_uri}"))
+            return self.api(lambda: (200, SCREENS[view_meta_uri]))
+        data_match = DATA_PATH.match(url.path)
+        if data_match:
+            return self.api(lambda: self.get_data(data_match["screen"], data_match["key"], parse_qs(url.query)))
+        self.send_json(404, dict(error="not found"))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == "/qad-central/api/login":
+            body = self.read_json()
+            if not body.get("username") or not body.get("password"):
+                return self.send_json(401, dict(error="invalid credentials"))
+            session_id = uuid.uuid4().hex
+            self.state.sessions.add(session_id)
+            return self.send_json(200, dict(user=body["username"]), {
+                "Set-Cookie": f"{SESSION_COOKIE}={session_id}; Path=/qad-central",
+            })
+        if url.path == "/qad-central/api/logout":
+            self.state.sessions.discard(self.session_id())
+            return self.send_json(200, dict(), {
+                "Set-Cookie": f"{SESSION_COOKIE}=; Path=/qad-central; Max-Age=0",
+            })
+        if url.path == "/qad-central/api/mock/config":
+            self.state.configure(self.read_json())
+            return self.send_json(200, dict(status="ok"))
+        if url.path == "/qad-central/api/mock/reset":
+            self.state.reset()
+            return self.send_json(200, dict(status="ok"))
+        data_match = DATA_PATH.match(url.path)
+        if data_match:
+            body = self.read_json()
+            return self.api(lambda: self.save_data(data_match["screen"], data_match["key"], body))
+        self.send_json(404, dict(error="not found"))
+
+    def do_DELETE(self):
+        data_match = DATA_PATH.match(urlsplit(self.path).path)
+        if data_match and data_match["key"]:
+            return self.api(lambda: self.delete_data(data_match["screen"], data_match["key"]))
+        self.send_json(404, dict(error="not found"))
+
+    # erp api
+
+    def api(self, handler) -> None:
+        """authenticated api call, with injected latency and errors"""
+        if self.session_id() is None:
+            return self.send_json(401, dict(error="not logged in"))
+        time.sleep(self.state.api_delay())
+        if self.state.inject_error():
+            return self.send_json(500, dict(error="injected server error"))
+        try:
+            status, data = handler()
+        except KeyError as exc:
+            status, data = 404, dict(error=f"unknown screen {exc}")
+        except ValueError as exc:
+            status, data = 400, dict(error=str(exc))
+        self.send_json(status, data)
+
+    def get_data(self, screen: str, key: str, query: dict):
+        if screen not in SCREENS:
+            raise KeyError(screen)
+        key = unquote(key) if key is not None else None
+        if key is not None:
+            record = self.state.records[screen].get(key)
+            return (200, record) if record else (404, dict(error=f"record {key} not found"))
+        conditions = json.loads(query["filter"][0]) if "filter" in query else None
+        rows = self.state.search(screen, query.get("q", [""])[0], conditions)
+        page_size = int(query.get("pageSize", [str(PAGE_SIZE)])[0])
+        page_number = int(query.get("page", ["1"])[0])
+        start = (page_number - 1) * page_size
+        return 200, dict(total=len(rows), page=page_number, pageSize=page_size, rows=rows[start:start + page_size])
+
+    def save_data(self, screen: str, key: str, body: dict):
+        if screen not in SCREENS:
+            raise KeyError(screen)
+        key = unquote(key) if key is not None else None
+        record = self.state.save(screen, key, body.get("fields", {}), body.get("tables", {}))
+        return 200, dict(record=record)
+
+    def delete_data(self, screen: str, key: str):
+        if screen not in SCREENS:
+            raise KeyError(screen)
+        key = unquote(key)
+        if not self.state.delete(screen, key):
+            return 404, dict(error=f"record {key} not found")
+        return 200, dict(deleted=key)
+
+
+def make_server(port: int = 22010, host: str = "127.0.0.1", verbose: bool = False, **state_settings) -> ThreadingHTTPServer:
+    handler = type("BoundMockAuxHandler", (MockAuxHandler,), dict(state=MockAuxState(**state_settings)))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock qad-central server for offline testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=22010, help="modules always connect to port 22010")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added latency for each erp api call")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random +/- variation on latency")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of erp api calls that fail with a 500")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible jitter/errors")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    cli_args = parser.parse_args()
+
+    server = make_server(
+        cli_args.port,
+        cli_args.host,
+        cli_args.verbose,
+        latency_ms=cli_args.latency_ms,
+        jitter_ms=cli_args.jitter_ms,
+        error_rate=cli_args.error_rate,
+        seed=cli_args.seed,
+    )
+    print(f"mock qad-central listening on http://{cli_args.host}:{cli_args.port}/qad-central/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+// Mock qad-central single page app.
+//
+// Renders the webshell home and hybridbrowse maintenance screens with the
+// element ids, names and css classes the library/ modules locate, talking
+// to the mock erp data api in server.py.
+(() => {
+  "use strict";
+
+  const SCREENS = window.AUX_SCREENS;
+  const API = "/qad-central/api";
+  const app = document.getElementById("app");
+  const listPopup = document.getElementById("kListPopup");
+  const modal = document.getElementById("modalOverlay");
+
+  let screenId = null;
+  let screen = null;
+  // key of the record open in the form pane, null for a new record
+  let openKey = null;
+  // last browse search, rerun after a bulk delete
+  let lastSearch = {};
+
+  function el(tag, attrs, children) {
+    const node = document.createElement(tag);
+    for (const [name, value] of Object.entries(attrs || {})) {
+      if (name === "text") {
+        node.textContent = value;
+      } else if (name.startsWith("on")) {
+        node.addEventListener(name.slice(2), value);
+      } else {
+        node.setAttribute(name, value);
+      }
+    }
+    for (const child of children || []) {
+      node.appendChild(child);
+    }
+    return node;
+  }
+
+  function listItem(text, onSelect) {
+    // kendo wraps the item text, the modules match it with has=get_by_text
+    return el("li", {
+      role: "option",
+      onclick: (event) => {
+        event.stopPropagation();
+        onSelect(text);
+      },
+    }, [el("span", {class: "k-list-item-text"}, [el("span", {text})])]);
+  }
+
+  function openListPopup(options, onSelect) {
+    const list = listPopup.querySelector("ul");
+    list.replaceChildren(...options.map((option) => listItem(option, (text) => {
+      listPopup.hidden = true;
+      list.replaceChildren();
+      onSelect(text);
+    })));
+    listPopup.hidden = false;
+  }
+
+  function showSpinner() {
+    const spinner = el("div", {class: "k-loading-color"});
+    document.body.appendChild(spinner);
+    return spinner;
+  }
+
+  function clearToasts() {
+    document.getElementById("toastContainer").replaceChildren();
+  }
+
+  function toast(text) {
+    clearToasts();
+    const message = el("div", {class: "toast-message", text});
+    document.getElementById("toastContainer").appendChild(message);
+    setTimeout(() => message.remove(), 5000);
+  }
+
+  function confirmDialog() {
+    return new Promise((resolve) => {
+      modal.hidden = false;
+      document.getElementById("qModalDialogConfirm").onclick = () => {
+        modal.hidden = true;
+        resolve();
+      };
+    });
+  }
+
+  async function api(method, path, body) {
+    const response = await fetch(API + path, {
+      method,
+      headers: {"Content-Type": "application/json"},
+      body: body === undefined ? undefined : JSON.stringify(body),
+    });
+    const data = await response.json().catch(() => ({}));
+    if (response.status === 401) {
+      location.href = "/qad-central/resources/login.jsp";
+    }
+    if (!response.ok) {
+      throw new Error(data.error || response.statusText);
+    }
+    return data;
+  }
+
+  // webshell home
+
+  function renderHome() {
+    const menu = el("ul", {id: "userMenu", hidden: ""}, [
+      el("li", {
+        "data-id": "logoutMenuItem",
+        text: "Log Out",
+        onclick: async () => {
+          await api("POST", "/logout");
+          location.href = "/qad-central/resources/login.jsp";
+        },
+      }),
+    ]);
+    app.replaceChildren(
+      el("div", {id: "kMenuUserInfo_wrapper", text: "User", onclick: () => { menu.hidden = false; }}),
+      menu,
+      el("h1", {text: "Home"}),
+    );
+  }
+
+  // hybridbrowse
+
+  function renderBrowse(id) {
+    screenId = id;
+    screen = SCREENS[id];
+    openKey = null;
+    if (!screen) {
+      app.replaceChildren(el("h1", {text: `Unknown view ${id}`}));
+      return;
+    }
+    const quickSearch = el("input", {id: "tbQuickSearch_BrowseDataGrid", type: "text"});
+    const grid = el("table", {"aria-activedescendant": "kGrid_BrowseDataGrid_active_cell"}, [
+      el("thead", {}, [el("tr", {}, screen.grid_columns.map((column) => el("th", {"data-field": column, text: column})))]),
+      el("tbody"),
+    ]);
+    app.replaceChildren(
+      el("h1", {text: screen.title}),
+      el("div", {class: "toolbar"}, [
+        el("button", {id: "ToolBtnNew", text: "New", onclick: () => openForm(null)}),
+        el("button", {id: "ToolBtnSave", text: "Save", onclick: saveForm}),
+        el("button", {id: "ToolBtnDelete", text: "Delete", onclick: deleteRecord}),
+        el("button", {id: "btnViewFormPane", text: "Browse", onclick: showBrowse}),
+      ]),
+      el("div", {id: "browsePane"}, [
+        el("div", {class: "searchbar"}, [
+          quickSearch,
+          el("button", {id: "btnBrowseSearch", text: "Search", onclick: () => runSearch({q: quickSearch.value})}),
+          el("button", {id: "btnSearchAdvance", text: "Advanced", onclick: toggleAdvancedSearch}),
+        ]),
+        advancedSearchPopup(),
+        el("div", {id: "qGridContent"}, [grid]),
+        el("div", {id: "browsePager", class: "k-pager-wrap"}),
+      ]),
+      el("div", {id: "formPane", hidden: ""}),
+    );
+  }
+
+  async function runSearch(search, pageNumber = 1) {
+    lastSearch = search;
+    const spinner = showSpinner();
+    try {
+      const params = new URLSearchParams({page: pageNumber});
+      if (search.q) {
+        params.set("q", search.q);
+      }
+      if (search.conditions) {
+        params.set("filter", JSON.stringify(search.conditions));
+      }
+      const data = await api("GET", `/erp/data/${screenId}?${params}`);
+      renderRows(data.rows);
+      renderPager(data, search);
+    } catch (error) {
+      toast(`Error: ${error.message}`);
+    } finally {
+      spinner.remove();
+    }
+  }
+
+  function renderRows(rows) {
+    const tbody = document.querySelector("#qGridContent tbody");
+    tbody.replaceChildren(...rows.map((record) => el("tr", {
+      "data-key": record.key,
+      onclick: (event) => selectRow(tbody, event.currentTarget, event.ctrlKey || event.metaKey),
+      ondblclick: () => openForm(record.key),
+    }, screen.grid_columns.map((column) => el("td", {class: `qFieldName-${column}`, text: record.fields[column] || ""})))));
+  }
+
+  // kendo multiple row selection, ctrl+click toggles a row
+  function selectRow(tbody, row, toggle) {
+    if (!toggle) {
+      tbody.querySelectorAll("tr.k-selected").forEach((other) => other.classList.remove("k-selected"));
+    }
+    row.classList.toggle("k-selected", toggle ? !row.classList.contains("k-selected") : true);
+    row.setAttribute("aria-selected", String(row.classList.contains("k-selected")));
+  }
+
+  function renderPager(data, search) {
+    const lastPage = data.page * data.pageSize >= data.total;
+    document.getElementById("browsePager").replaceChildren(
+      el("span", {class: "k-pager-info", text: `${data.total} items`}),
+      el("button", {
+        class: `k-pager-nav${lastPage ? " k-disabled" : ""}`,
+        title: "Go to the next page",
+        text: ">",
+        "aria-disabled": String(lastPage),
+        onclick: () => {
+          if (!lastPage) {
+            runSearch(search, data.page + 1);
+          }
+        },
+      }),
+    );
+  }
+
+  function showBrowse() {
+    document.getElementById("formPane").hidden = true;
+    document.getElementById("browsePane").hidden = false;
+  }
+
+  // advanced search
+
+  function toggleAdvancedSearch() {
+    const popup = document.getElementById("browseAdvanceSearchPopup");
+    popup.hidden = !popup.hidden;
+  }
+
+  function advancedSearchPopup() {
+    const tbody = el("tbody");
+    const popup = el("div", {id: "browseAdvanceSearchPopup", hidden: ""}, [
+      el("div", {class: "qAdvanceSearchContainer"}, [el("table", {}, [tbody])]),
+      el("button", {
+        id: "btnSearchClearAll",
+        text: "Clear All",
+        onclick: () => {
+          tbody.replaceChildren(conditionRow(tbody));
+          refreshRemoveButtons(tbody);
+        },
+      }),
+      el("button", {
+        id: "btnSaveSearchCond",
+        text: "Search",
+        onclick: () => {
+          popup.hidden = true;
+          runSearch({conditions: readConditions(tbody)});
+        },
+      }),
+    ]);
+    tbody.appendChild(conditionRow(tbody));
+    refreshRemoveButtons(tbody);
+    return popup;
+  }
+
+  function dropdownCell(options) {
+    const value = el("span", {class: "k-input-value"});
+    return el("td", {}, [
+      value,
+      el("button", {type: "button", text: "v", onclick: () => openListPopup(options, (text) => { value.textContent = text; })}),
+    ]);
+  }
+
+  function conditionRow(tbody) {
+    const row = el("tr", {}, [
+      dropdownCell(Object.keys(screen.search_labels)),
+      dropdownCell(["equals", "not equal to", "contains", "begins with", "in"]),
+      el("td", {}, [el("input", {type: "text"})]),
+      el("td", {}, [
+        el("button", {
+          id: "btnAddSearchCond",
+          type: "button",
+          text: "+",
+          onclick: () => {
+            row.after(conditionRow(tbody));
+            refreshRemoveButtons(tbody);
+          },
+        }),
+        el("button", {
+          id: "btnRemoveSearchCond",
+          type: "button",
+          text: "x",
+          onclick: () => {
+            row.remove();
+            refreshRemoveButtons(tbody);
+          },
+        }),
+      ]),
+    ]);
+    return row;
+  }
+
+  function refreshRemoveButtons(tbody) {
+    // the last remaining condition can't be removed
+    const single = tbody.querySelectorAll("tr").length <= 1;
+    tbody.querySelectorAll("[id=btnRemoveSearchCond]").forEach((button) => { button.disabled = single; });
+  }
+
+  function readConditions(tbody) {
+    return [...tbody.querySelectorAll("tr")].map((row) => {
+      const cells = row.querySelectorAll("td");
+      return {
+        field: screen.search_labels[cells[0].querySelector(".k-input-value").textContent],
+        operator: cells[1].querySelector(".k-input-value").textContent,
+        value: cells[2].querySelector("input").value,
+      };
+    }).filter((condition) => condition.field && condition.operator);
+  }
+
+  // maintenance form
+
+  async function openForm(key) {
+    clearToasts();
+    const spinner = showSpinner();
+    try {
+      const record = key === null
+        ? {fields: {}, tables: {}}
+        : await api("GET", `/erp/data/${screenId}/${encodeURIComponent(key)}`);
+      openKey = key;
+      renderForm(record);
+    } catch (error) {
+      toast(`Error: ${error.message}`);
+    } finally {
+      spinner.remove();
+    }
+  }
+
+  function panelId(title) {
+    return `${title.replace(/[^A-Za-z0-9]/g, "")}Panel`;
+  }
+
+  function panel(id, title, body, extraClass) {
+    const node = el("div", {id, class: `panel ${extraClass || ""}`.trim()}, [
+      el("div", {class: "panel-heading", text: title, onclick: () => node.classList.toggle("collapsed")}),
+      el("div", {class: "panel-body"}, body),
+    ]);
+    return node;
+  }
+
+  function fieldInput(name, value) {
+    if (screen.lists[name]) {
+      // kendo style drop down: hidden input, selected from a listbox
+      const input = el("input", {type: "hidden", name});
+      input.value = value;
+      const shown = el("span", {class: "k-input-value", text: value});
+      const listbox = el("ul", {role: "listbox", class: "k-list", hidden: ""});
+      listbox.replaceChildren(...screen.lists[name].map((option) => listItem(option, (text) => {
+        input.value = text;
+        shown.textContent = text;
+        listbox.hidden = true;
+      })));
+      const wrapper = el("span", {class: "k-dropdown", onclick: () => { listbox.hidden = !listbox.hidden; }}, [shown, input, listbox]);
+      return el("label", {}, [el("span", {text: `${name} `}), wrapper]);
+    }
+    const input = el("input", {type: "text", name});
+    input.value = value;
+    return el("label", {}, [el("span", {text: `${name} `}), input]);
+  }
+
+  function tableRow(columns, values, editing) {
+    const row = el("tr", {
+      onclick: () => {
+        row.parentNode.querySelectorAll("tr").forEach((other) => other.classList.remove("selected"));
+        row.classList.add("selected");
+      },
+    }, [
+      el("td", {class: "k-select-cell"}),
+      ...columns.map((column) => {
+        const cell = el("td", {class: `qFieldName-${column}`});
+        if (editing) {
+          cell.appendChild(el("input", {type: "text", name: column}));
+        } else {
+          cell.textContent = values[column] || "";
+        }
+        return cell;
+      }),
+    ]);
+    return row;
+  }
+
+  function finishEditing(tbody) {
+    // only the newest row has in-cell editors, as in kendo grids
+    tbody.querySelectorAll("td > input").forEach((input) => {
+      input.parentNode.textContent = input.value;
+    });
+  }
+
+  function tablePanel(id, columns, rows) {
+    const tbody = el("tbody", {}, rows.map((values) => tableRow(columns, values, false)));
+    const toolbar = el("div", {id: "qGridToolbar"}, [
+      el("button", {
+        type: "button",
+        text: "New",
+        onclick: () => {
+          finishEditing(tbody);
+          tbody.appendChild(tableRow(columns, {}, true));
+        },
+      }),
+      el("button", {
+        type: "button",
+        text: "Delete",
+        onclick: async () => {
+          const selected = tbody.querySelector("tr.selected");
+          if (selected) {
+            await confirmDialog();
+            selected.remove();
+          }
+        },
+      }),
+    ]);
+    const grid = el("div", {class: "k-grid"}, [
+      el("div", {class: "k-grid-toolbar"}, [toolbar]),
+      el("div", {class: "k-grid-content"}, [el("table", {}, [tbody])]),
+    ]);
+    return panel(id, id, [el("table", {}, [el("tbody", {}, [el("tr", {}, [el("td", {}, [grid])])])])], "table-panel collapsed");
+  }
+
+  function renderForm(record) {
+    const pane = document.getElementById("formPane");
+    // as in AUX, only the first section is open when a record is opened
+    pane.replaceChildren(
+      ...screen.sections.map(([title, fields], index) => panel(
+        panelId(title), title, fields.map((field) => fieldInput(field, record.fields[field] || "")),
+        index > 0 ? "collapsed" : "",
+      )),
+      ...Object.entries(screen.tables).map(([id, columns]) => tablePanel(id, columns, (record.tables || {})[id] || [])),
+    );
+    pane.hidden = false;
+    document.getElementById("browsePane").hidden = true;
+  }
+
+  function readForm(pane) {
+    const fields = {};
+    pane.querySelectorAll("[name]").forEach((input) => {
+      if (!input.closest(".table-panel")) {
+        fields[input.name] = input.value;
+      }
+    });
+    const tables = {};
+    for (const [id, columns] of Object.entries(screen.tables)) {
+      tables[id] = [...pane.querySelectorAll(`#${id} .k-grid-content tbody tr`)].map((row) => {
+        const values = {};
+        for (const column of columns) {
+          const cell = row.querySelector(`.qFieldName-${column}`);
+          const input = cell.querySelector("input");
+          values[column] = input ? input.value : cell.textContent;
+        }
+        return values;
+      });
+    }
+    return {fields, tables};
+  }
+
+  async function saveForm() {
+    clearToasts();
+    const pane = document.getElementById("formPane");
+    if (pane.hidden) {
+      return;
+    }
+    const path = openKey === null ? `/erp/data/${screenId}` : `/erp/data/${screenId}/${encodeURIComponent(openKey)}`;
+    try {
+      const data = await api("POST", path, readForm(pane));
+      openKey = data.record.key;
+      toast("Saved");
+    } catch (error) {
+      toast(`Error: ${error.message}`);
+    }
+  }
+
+  async function deleteRecord() {
+    clearToasts();
+    if (!document.getElementById("browsePane").hidden) {
+      await deleteSelectedRows();
+      return;
+    }
+    if (openKey === null) {
+      return;
+    }
+    await confirmDialog();
+    try {
+      await api("DELETE", `/erp/data/${screenId}/${encodeURIComponent(openKey)}`);
+      openKey = null;
+      toast("Deleted");
+    } catch (error) {
+      toast(`Error: ${error.message}`);
+    }
+  }
+
+  async function deleteSelectedRows() {
+    const keys = [...document.querySelectorAll("#qGridContent tbody tr.k-selected")].map((row) => row.dataset.key);
+    if (keys.length === 0) {
+      return;
+    }
+    await confirmDialog();
+    const failed = [];
+    for (const key of keys) {
+      try {
+        await api("DELETE", `/erp/data/${screenId}/${encodeURIComponent(key)}`);
+      } catch (error) {
+        failed.push(key);
+      }
+    }
+    toast(failed.length ? `Error: could not delete ${failed.join(", ")}` : "Deleted");
+    await runSearch(lastSearch);
+  }
+
+  // hash routing, as in qad-central
+
+  function route() {
+    const hash = location.hash;
+    if (hash.startsWith("#/view/qraview/hybridbrowse")) {
+      const params = new URLSearchParams(hash.split("?")[1] || "");
+      renderBrowse((params.get("viewMetaUri") || "").replace("urn:view:meta:", ""));
+    } else {
+      renderHome();
+    }
+  }
+
+  window.addEventListener("hashchange", route);
+  route();
+})();